@@ -0,0 +1,86 @@
+// eventos.js
+// Avisos de datos nuevos por server-sent events (/eventos). Los avisos son del
+// snapshot de un solo rango sin filtros, que el servidor anuncia al conectar:
+// solo una pestaña que muestra justo ese rango apaga el Interval y refresca con
+// cada versión nueva. Con otro rango o con filtros el sondeo sigue siendo el
+// mecanismo de refresco; si el flujo se cae (o el servidor lo desactiva o no
+// tiene lugar) vuelve el sondeo.
+(function () {
+    // conexión, rango del snapshot y lo que muestra la pestaña
+    var estado = {conectado: false, rango: null, vista: null, apagado: false};
+
+    function cubierta() {
+        var rango = estado.rango, vista = estado.vista;
+        if (!estado.conectado || !rango || !vista || vista.filtros) {
+            return false;
+        }
+        // sin fecha elegida el servidor usa el rango por defecto
+        return (vista.desde || rango.desde).slice(0, 10) === rango.desde &&
+            (vista.hasta || rango.hasta).slice(0, 10) === rango.hasta;
+    }
+
+    function fijar(props) {
+        window.dash_clientside.set_props("intervalo_refresco", props);
+    }
+
+    function aplicar() {
+        // solo cuando cambia: reactivar el Interval reinicia su temporizador
+        var apagar = cubierta();
+        if (apagar !== estado.apagado) {
+            estado.apagado = apagar;
+            fijar({disabled: apagar});
+        }
+    }
+
+    window.dash_clientside = window.dash_clientside || {};
+    window.dash_clientside.especiales = Object.assign({}, window.dash_clientside.especiales, {
+        // rango y filtros de la pestaña -> Interval apagado solo si el flujo la cubre
+        vista_eventos: function (desde, hasta, campanas, agentes) {
+            estado.vista = {
+                desde: desde,
+                hasta: hasta,
+                filtros: (campanas || []).length > 0 || (agentes || []).length > 0
+            };
+            var apagar = cubierta();
+            if (apagar === estado.apagado) {
+                return window.dash_clientside.no_update;
+            }
+            estado.apagado = apagar;
+            return apagar;
+        }
+    });
+
+    if (!window.EventSource) {
+        return;
+    }
+
+    function conectar() {
+        // esperar a que Dash haya pintado el layout
+        if (!window.dash_clientside.set_props || !document.getElementById("kpi_cards")) {
+            setTimeout(conectar, 500);
+            return;
+        }
+        var fuente = new EventSource("/eventos");
+        fuente.onopen = function () {
+            estado.conectado = true;
+            aplicar();
+        };
+        fuente.addEventListener("rango", function (evento) {
+            estado.rango = JSON.parse(evento.data);
+            aplicar();
+        });
+        fuente.addEventListener("version", function () {
+            if (cubierta()) {
+                // n_intervals distinto en cada aviso: los callbacks solo lo usan como disparador
+                fijar({n_intervals: Date.now()});
+            }
+        });
+        fuente.onerror = function () {
+            // EventSource reintenta solo; mientras tanto, sondeo
+            estado.conectado = false;
+            aplicar();
+        };
+    }
+
+    conectar();
+})();
@@ -0,0 +1,12 @@
+// graficas.js
+// Funciones para callbacks del lado del cliente (clientside_callback).
+window.dash_clientside = window.dash_clientside || {};
+window.dash_clientside.especiales = Object.assign({}, window.dash_clientside.especiales, {
+    // ancho en pixeles de una gráfica, para que el servidor reduzca la serie
+    // a los puntos que caben en pantalla
+    ancho_grafica: function (_figura, id) {
+        var nodo = document.getElementById(id);
+        var ancho = nodo ? Math.round(nodo.getBoundingClientRect().width) : 0;
+        return ancho > 0 ? ancho : window.dash_clientside.no_update;
+    }
+});
@@ -0,0 +1,66 @@
+// kpis.js
+// Tarjetas KPI armadas en el navegador. El servidor solo manda un arreglo de
+// números (dcc.Store "datos_kpis", en el orden de CAMPOS_KPI) o el texto de
+// "sin datos"; aquí se les da formato, color pastel por umbral y se construyen
+// los componentes.
+(function () {
+    var ESTILO = {
+        padding: "12px",
+        borderRadius: "12px",
+        textAlign: "center",
+        background: "white",
+        boxShadow: "0 1px 6px rgba(2,6,23,0.04)",
+        transition: "all 0.2s ease",
+        minWidth: "120px"
+    };
+    var VERDE = "#d1fae5", AMARILLO = "#fff7ed", ROJO = "#fee2e2";
+
+    // helpers colores (pasteles)
+    function colorSla(p) { return p >= 80 ? VERDE : p >= 70 ? AMARILLO : ROJO; }
+    function colorAbandono(p) { return p <= 5 ? VERDE : p <= 9.9 ? AMARILLO : ROJO; }
+    function colorAtencion(p) { return p >= 90 ? VERDE : p >= 80 ? AMARILLO : ROJO; }
+
+    function entero(v) { return Math.trunc(v).toLocaleString("en-US"); }
+    function porcentaje(v) { return v.toFixed(2) + "%"; }
+
+    function div(props, children) {
+        return {namespace: "dash_html_components", type: "Div", props: Object.assign({children: children}, props)};
+    }
+
+    function tarjeta(titulo, valor, fondo) {
+        var estilo = fondo ? Object.assign({}, ESTILO, {background: fondo}) : ESTILO;
+        // equivalente a dbc.Col(width="auto")
+        return div({className: "col-auto"}, div({className: "kpi-card", style: estilo}, [
+            div({className: "kpi-title"}, titulo),
+            div({className: "kpi-value"}, valor)
+        ]));
+    }
+
+    window.dash_clientside = window.dash_clientside || {};
+    window.dash_clientside.especiales = Object.assign({}, window.dash_clientside.especiales, {
+        tarjetas_kpi: function (datos) {
+            if (!datos) {
+                return window.dash_clientside.no_update;
+            }
+            if (typeof datos === "string") {
+                // sin datos (base no disponible): nunca mostrar ceros
+                return div({className: "col-12"}, div({style: {
+                    backgroundColor: ROJO, color: "#991b1b", padding: "12px 16px",
+                    borderRadius: "12px", textAlign: "center", fontWeight: "600"
+                }}, datos));
+            }
+            var rec = datos[0], con = datos[1], aba = datos[2], porcAba = datos[3],
+                porcAtencion = datos[4], porcSla = datos[5], asa = datos[6], aht = datos[7];
+            return [
+                tarjeta("Recibidas", entero(rec)),
+                tarjeta("Contestadas", entero(con)),
+                tarjeta("Abandonadas", entero(aba), colorAbandono(porcAba)),
+                tarjeta("% Abandono", porcentaje(porcAba), colorAbandono(porcAba)),
+                tarjeta("% Atención", porcentaje(porcAtencion), colorAtencion(porcAtencion)),
+                tarjeta("% SLA", porcentaje(porcSla), colorSla(porcSla)),
+                tarjeta("ASA (s)", entero(asa)),
+                tarjeta("AHT (s)", entero(aht))
+            ];
+        }
+    });
+})();
@@ -0,0 +1,334 @@
+# -*- coding: utf-8 -*-
+# benchmark_especiales.py
+# Benchmark del refresco del dashboard con llamadas sintéticas cargadas en una
+# base SQLite local que imita LLAMADAS_ESPECIALES_ECD. Mide cada etapa de
+# refresco del dashboard (consulta, post-proceso pandas, figuras, serialización
+# JSON) y la latencia con N pestañas simultáneas. El resultado es JSON.
+#
+# Uso:
+#   python benchmark_especiales.py --filas 10000 1000000 10000000 --pestanas 1 10 40 --salida bench.json
+
+import argparse
+import json
+import os
+import platform
+import sqlite3
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from datetime import date, datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from cache_consultas import CacheConsultas
+from motor_kpis import kpis_por
+
+# filas que el motor de KPIs procesa en pandas (etapa motor_kpis)
+MUESTRA_MOTOR = 1_000_000
+
+# SQLite guarda FECHA como texto ISO; los parámetros datetime deben compararse igual
+sqlite3.register_adapter(datetime, lambda d: d.isoformat(sep=" "))
+sqlite3.register_adapter(date, lambda d: d.isoformat())
+
+
+def generar_llamadas(n, desde, dias, semilla=0, campanas=None, agentes=None):
+    # filas realistas con las columnas que usan las consultas del dashboard
+    rng = np.random.default_rng(semilla)
+    campanas = list(campanas or {})
+    agentes = [str(a) for a in (agentes or [])]
+
+    dia = rng.integers(0, dias, n)
+    segundos = rng.integers(8 * 3600, 21 * 3600, n)  # horario de atención
+    fecha = pd.Timestamp(desde) + pd.to_timedelta(dia, unit="D") + pd.to_timedelta(segundos, unit="s")
+    media_hora = (segundos // 1800) * 1800
+    intervalo = pd.Series(
+        [f"{h:02d}:{m:02d}" for h, m in zip(media_hora // 3600, (media_hora % 3600) // 60)]
+    )
+
+    dnis = np.array(campanas + ["5559990000"], dtype=object)[
+        rng.integers(0, len(campanas) + 1, n)
+    ]
+    abandonada = rng.random(n) < 0.08
+    agente = np.where(
+        abandonada, None, np.array(agentes + ["99999"], dtype=object)[rng.integers(0, len(agentes) + 1, n)]
+    )
+    sub_categoria = np.array([None, "Consulta", "Aclaración", "Llamada de Prueba"], dtype=object)[
+        rng.choice(4, n, p=[0.5, 0.3, 0.19, 0.01])
+    ]
+    campana_origen = np.array(["ATC", "LIBERTAD", "ASSISTANCE", "HERDEZ"], dtype=object)[
+        rng.choice(4, n, p=[0.7, 0.1, 0.05, 0.15])
+    ]
+
+    return pd.DataFrame({
+        "FECHA": fecha.strftime("%Y-%m-%d %H:%M:%S"),
+        "INTERVALO": intervalo,
+        "DIRECCION": np.where(rng.random(n) < 0.95, "ENTRANTE", "SALIENTE"),
+        "DNIS": dnis,
+        "CAMPAÑA": campana_origen,
+        "FUERA_DE_HORARIO": np.where(rng.random(n) < 0.9, "Inside", "Outside"),
+        "SUB_CATEGORIA": sub_categoria,
+        "LLAMADA_ABANDONADA": np.where(abandonada, "SI", "NO"),
+        "TIEMPO_EN_IVR": np.where(rng.random(n) < 0.05, 0, rng.integers(5, 90, n)),
+        "TIEMPO_EN_COLA": rng.exponential(15, n).round().astype("int64"),
+        "TIEMPO_DE_TIMBRADO": rng.integers(0, 12, n),
+        "TIEMPO_DE_CONVERSACION": np.where(abandonada, 0, rng.gamma(2.0, 120, n).round().astype("int64")),
+        "TIEMPO_DE_TIPIFICACIÓN": np.where(abandonada, 0, rng.integers(5, 60, n)),
+        "ULTIMO_AGENTE": agente,
+    })
+
+
+def cargar_sqlite(ruta, n, desde, dias, campanas, agentes, lote=500_000):
+    from sqlalchemy import create_engine
+
+    if os.path.exists(ruta):
+        os.remove(ruta)
+    engine = create_engine(
+        f"sqlite:///{ruta}", connect_args={"check_same_thread": False}, pool_size=20, max_overflow=20
+    )
+    for inicio in range(0, n, lote):
+        df = generar_llamadas(min(lote, n - inicio), desde, dias, semilla=inicio, campanas=campanas, agentes=agentes)
+        df.to_sql("LLAMADAS_ESPECIALES_ECD", engine, if_exists="append", index=False, chunksize=50_000)
+    with engine.begin() as conn:
+        conn.exec_driver_sql("CREATE INDEX ix_llamadas_fecha ON LLAMADAS_ESPECIALES_ECD (FECHA)")
+    return engine
+
+
+def _resumen(etapa, filas, tiempos, **extra):
+    tiempos = sorted(tiempos)
+    return {
+        "etapa": etapa,
+        "filas": filas,
+        "n": len(tiempos),
+        "media_s": statistics.fmean(tiempos),
+        "p50_s": tiempos[len(tiempos) // 2],
+        "p95_s": tiempos[min(len(tiempos) - 1, int(round(0.95 * (len(tiempos) - 1))))],
+        "max_s": tiempos[-1],
+        **extra,
+    }
+
+
+def _medir(fn, repeticiones):
+    tiempos, resultado = [], None
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        resultado = fn()
+        tiempos.append(time.perf_counter() - inicio)
+    return tiempos, resultado
+
+
+class CacheApagado(CacheConsultas):
+    # misma interfaz que el cache del dashboard, sin guardar ni coalescer: cada
+    # llamada carga (la línea base de "sin cache")
+    def obtener(self, clave, cargar, ttl=None):
+        with self._lock:
+            self.estadisticas["fallos"] += 1
+        return cargar()
+
+    def guardar(self, clave, valor, ttl=None):
+        pass
+
+
+def refrescar_pestana(d, desde, hasta, huellas=None, campanas=None, agentes=None):
+    # lo que hace una pestaña en un tick: los callbacks de todos los componentes
+    huellas = huellas or {}
+    filtros = (campanas, agentes)
+    return {
+        "kpis": d.actualizar_kpis(0, desde, hasta, *filtros, huellas.get("kpis")),
+        "tabla": d.actualizar_tabla(0, desde, hasta, *filtros, 0, 10, [], "", huellas.get("tabla")),
+        "agentes": d.actualizar_agentes(0, desde, hasta, *filtros, huellas.get("agentes")),
+        "intervalos": d.actualizar_intervalos(0, desde, hasta, *filtros, "intervalo", None, None, huellas.get("intervalos")),
+        "campanas": d.actualizar_campanas(0, desde, hasta, *filtros, huellas.get("campanas")),
+        "personal": d.actualizar_personal(0, desde, hasta, *filtros, 100, 100, huellas.get("personal")),
+        "fecha": d.actualizar_fecha(0, desde, hasta, *filtros, None),
+    }
+
+
+def medir_etapas(d, filas, desde, hasta, repeticiones):
+    from plotly.io.json import to_json_plotly
+
+    resultados = []
+
+    def consulta_directa():
+        return d.obtener_agregados(desde, hasta)
+
+    def por_funcion():
+        return d.obtener_trafico(desde, hasta), d.obtener_resumen_campanas(desde, hasta), d.obtener_datos_agentes(desde, hasta)
+
+    tiempos, datos = _medir(consulta_directa, repeticiones)
+    resultados.append(_resumen("consulta_combinada", filas, tiempos))
+    tiempos, _ = _medir(por_funcion, repeticiones)
+    resultados.append(_resumen("consulta_por_funcion", filas, tiempos))
+    tiempos, _ = _medir(lambda: d.agregados_paralelos(desde, hasta), repeticiones)
+    resultados.append(_resumen("consulta_paralela", filas, tiempos))
+
+    tiempos, _ = _medir(lambda: d.agregados_rollup(desde, hasta), 1)
+    resultados.append(_resumen("rollup_frio", filas, tiempos))
+    tiempos, _ = _medir(lambda: d.agregados_rollup(desde, hasta), repeticiones)
+    resultados.append(_resumen("rollup_caliente", filas, tiempos))
+
+    # el mismo tráfico calculado en pandas por llamada, con el motor de KPIs, sobre
+    # una muestra acotada (la tabla completa de 10M filas no cabe cómoda en memoria)
+    muestra = min(filas, MUESTRA_MOTOR)
+    llamadas = pd.read_sql(f"SELECT * FROM LLAMADAS_ESPECIALES_ECD LIMIT {muestra}", d.obtener_conexion())
+    tiempos, _ = _medir(lambda: kpis_por(llamadas, ["INTERVALO"]), repeticiones)
+    resultados.append(_resumen("motor_kpis", filas, tiempos, muestra=len(llamadas)))
+    del llamadas
+
+    tiempos, df = _medir(lambda: d.preparar_trafico(datos["trafico"]), repeticiones)
+    t_tot, t = _medir(lambda: d.totales(df), repeticiones)
+    t_tab, registros = _medir(lambda: d.pagina_tabla(d.preparar_tabla(df), 0, 10), repeticiones)
+    resultados.append(_resumen("posproceso_pandas", filas, [a + b + c for a, b, c in zip(tiempos, t_tot, t_tab)]))
+
+    def figuras():
+        return (
+            d.resumen_kpis(t),
+            d.grafica_pie_agentes(df_ag=datos["agentes"]),
+            d.figura_intervalos(df),
+            d.figura_campanas(datos["campanas"]),
+        )
+
+    tiempos, (kpis, fig_ag, fig_int, fig_camp) = _medir(figuras, repeticiones)
+    resultados.append(_resumen("figuras", filas, tiempos))
+
+    salida = [kpis, registros, fig_ag, fig_int, fig_camp, "Última actualización"]
+    tiempos, texto = _medir(lambda: to_json_plotly(salida), repeticiones)
+    resultados.append(_resumen("serializacion_json", filas, tiempos, bytes=len(texto.encode("utf-8"))))
+
+    def callback_frio():
+        d.cache_consultas.invalidar()
+        return refrescar_pestana(d, desde, hasta)
+
+    tiempos, salidas = _medir(callback_frio, repeticiones)
+    resultados.append(_resumen("callbacks_total_frio", filas, tiempos))
+    tiempos, _ = _medir(lambda: refrescar_pestana(d, desde, hasta), repeticiones)
+    resultados.append(_resumen("callbacks_total_cache", filas, tiempos))
+
+    # tick sin cambios: cada componente compara su huella y responde no_update
+    huellas = {nombre: salida[-1] for nombre, salida in salidas.items() if nombre != "fecha"}
+    tiempos, _ = _medir(lambda: refrescar_pestana(d, desde, hasta, huellas), repeticiones)
+    resultados.append(_resumen("callbacks_sin_cambios", filas, tiempos))
+
+    tiempos, entrada = _medir(lambda: d.construir_cubo(desde, hasta), 1)
+    cubo = entrada["cubo"]
+    resultados.append(_resumen("cubo_construccion", filas, tiempos, bytes=cubo.memoria()))
+    campana = cubo.miembros("CAMPANA")[0]
+    tiempos, _ = _medir(lambda: cubo.rebanar(CAMPANA=[campana]).vistas(), repeticiones)
+    resultados.append(_resumen("cubo_filtro", filas, tiempos))
+
+    # serie de tiempo fina: consulta por cubeta y reducción al ancho de la gráfica
+    tiempos, serie = _medir(lambda: d.obtener_serie(desde, hasta, 5), 1)
+    resultados.append(_resumen("serie_consulta", filas, tiempos, puntos=len(serie)))
+    tiempos, fig = _medir(lambda: d.figura_serie(serie, d.objetivo_puntos(800)), repeticiones)
+    resultados.append(_resumen("serie_reduccion", filas, tiempos, bytes=len(to_json_plotly(fig))))
+
+    # Erlang C: rejilla completa de escenarios what-if y lectura de un escenario
+    perfil = d.perfil_demanda(datos["trafico"], desde, hasta)
+    tiempos, escenarios = _medir(lambda: d.escenarios_personal(perfil), repeticiones)
+    resultados.append(_resumen("erlang_escenarios", filas, tiempos, celdas=int(escenarios["agentes"].size)))
+    tiempos, _ = _medir(lambda: d.figura_personal(perfil, escenarios, d.indice_factor(120), d.indice_factor(90)), repeticiones)
+    resultados.append(_resumen("erlang_whatif", filas, tiempos))
+    return resultados
+
+
+def medir_concurrencia(d, filas, desde, hasta, pestanas):
+    # N pestañas refrescan todos sus componentes a la vez: con el cache compartido
+    # (single-flight) y con el cache apagado, el mismo trabajo en ambos modos
+    resultados = []
+    cache = d.cache_consultas
+    for modo in ("cache", "sin_cache"):
+        cache.invalidar()
+        d.cache_consultas = cache if modo == "cache" else CacheApagado()
+        barrera = threading.Barrier(pestanas)
+        latencias, errores = [], []
+        lock = threading.Lock()
+
+        def pestana():
+            barrera.wait()
+            inicio = time.perf_counter()
+            try:
+                refrescar_pestana(d, desde, hasta)
+            except Exception as e:
+                with lock:
+                    errores.append(repr(e))
+            with lock:
+                latencias.append(time.perf_counter() - inicio)
+
+        inicio = time.perf_counter()
+        hilos = [threading.Thread(target=pestana) for _ in range(pestanas)]
+        for h in hilos:
+            h.start()
+        for h in hilos:
+            h.join()
+        total = time.perf_counter() - inicio
+        resultados.append(_resumen(
+            f"concurrencia_{modo}", filas, latencias,
+            pestanas=pestanas, total_s=total, errores=len(errores),
+            cache=d.cache_consultas.estado(),
+        ))
+    d.cache_consultas = cache
+    return resultados
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark del dashboard de especiales sobre SQLite local")
+    parser.add_argument("--filas", type=int, nargs="+", default=[10_000, 1_000_000, 10_000_000])
+    parser.add_argument("--pestanas", type=int, nargs="+", default=[1, 10, 40])
+    parser.add_argument("--dias", type=int, default=8)
+    parser.add_argument("--repeticiones", type=int, default=3)
+    parser.add_argument("--directorio", default=tempfile.mkdtemp(prefix="bench_especiales_"))
+    parser.add_argument("--salida", default="-", help="archivo JSON de resultados ('-' = stdout)")
+    args = parser.parse_args(argv)
+
+    # archivos locales del dashboard aislados del despliegue real
+    os.environ["SNAPSHOT_DB"] = os.path.join(args.directorio, "snapshots.sqlite")
+    os.environ.setdefault("CACHE_TTL", "300")
+    import dashboard_especiales as d
+
+    hasta = date.today()
+    desde = hasta - timedelta(days=args.dias - 1)
+    agentes = d.CATALOGO_AGENTES["ID_CONEXION"]
+
+    resultados = []
+    for filas in args.filas:
+        print(f"[benchmark] {filas:,} filas: generando y cargando…", file=sys.stderr)
+        inicio = time.perf_counter()
+        engine = cargar_sqlite(
+            os.path.join(args.directorio, f"llamadas_{filas}.sqlite"), filas, desde, args.dias,
+            d.CAMPANAS_DNIS, agentes,
+        )
+        resultados.append({"etapa": "carga_sqlite", "filas": filas, "total_s": time.perf_counter() - inicio})
+
+        d.usar_engine(engine)
+        d.cache_consultas.invalidar()
+        d.almacen_rollup = d.AlmacenRollup(
+            d.obtener_medidas_diarias, ruta=os.path.join(args.directorio, f"rollup_{filas}.sqlite")
+        )
+
+        print(f"[benchmark] {filas:,} filas: etapas…", file=sys.stderr)
+        resultados.extend(medir_etapas(d, filas, desde.isoformat(), hasta.isoformat(), args.repeticiones))
+        for pestanas in args.pestanas:
+            print(f"[benchmark] {filas:,} filas: {pestanas} pestañas…", file=sys.stderr)
+            resultados.extend(medir_concurrencia(d, filas, desde.isoformat(), hasta.isoformat(), pestanas))
+        engine.dispose()
+
+    documento = {
+        "generado": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "plataforma": platform.platform(),
+        "rango": [desde.isoformat(), hasta.isoformat()],
+        "resultados": resultados,
+    }
+    texto = json.dumps(documento, indent=2, ensure_ascii=False, default=str)
+    if args.salida == "-":
+        print(texto)
+    else:
+        with open(args.salida, "w", encoding="utf-8") as f:
+            f.write(texto)
+
+
+if __name__ == "__main__":
+    main()
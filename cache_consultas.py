@@ -0,0 +1,167 @@
+# -*- coding: utf-8 -*-
+# cache_consultas.py
+# Cache TTL compartido por todos los callbacks del proceso, con memoria acotada
+# (LRU por número de entradas y por bytes) y carga single-flight: si varias
+# pestañas piden la misma clave a la vez, solo una ejecuta la consulta y las
+# demás esperan su resultado. Con 'obsoleto' > 0 es stale-while-revalidate: un
+# valor vencido se sigue sirviendo al instante mientras un hilo lo recarga, y si
+# la recarga falla se conserva el último valor bueno.
+
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+import pandas as pd
+
+
+def _tamano_aproximado(valor):
+    # objetos que conocen su tamaño (Cubo) lo dicen con memoria()
+    memoria = getattr(valor, "memoria", None)
+    if callable(memoria):
+        return int(memoria())
+    if isinstance(valor, pd.DataFrame):
+        return int(valor.memory_usage(index=True, deep=True).sum())
+    if isinstance(valor, (tuple, list)):
+        return sum(_tamano_aproximado(v) for v in valor)
+    if isinstance(valor, dict):
+        return sum(_tamano_aproximado(v) for v in valor.values())
+    return sys.getsizeof(valor)
+
+
+class _Vuelo:
+    # una carga en curso; los que llegan tarde esperan el evento
+    def __init__(self):
+        self.evento = threading.Event()
+        self.resultado = None
+        self.error = None
+
+
+class CacheConsultas:
+    def __init__(self, ttl=55, max_entradas=128, max_bytes=256 * 1024 * 1024, obsoleto=0):
+        self.ttl = ttl
+        self.obsoleto = obsoleto  # segundos que un valor vencido se sirve mientras se recarga
+        self.max_entradas = max_entradas
+        self.max_bytes = max_bytes
+        self._datos = OrderedDict()  # clave -> (expira, tamano, valor)
+        self._vuelos = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.estadisticas = {"aciertos": 0, "fallos": 0, "coalescidas": 0, "expulsiones": 0, "errores": 0, "obsoletas": 0}
+
+    def obtener(self, clave, cargar, ttl=None):
+        ahora = time.monotonic()
+        revalidar = False
+        with self._lock:
+            entrada = self._datos.get(clave)
+            if entrada is not None and entrada[0] > ahora:
+                self._datos.move_to_end(clave)
+                self.estadisticas["aciertos"] += 1
+                return entrada[2]
+
+            vuelo = self._vuelos.get(clave)
+            if entrada is not None and entrada[0] + self.obsoleto > ahora:
+                # vencido pero servible: se devuelve ya y se recarga en segundo plano
+                self._datos.move_to_end(clave)
+                self.estadisticas["obsoletas"] += 1
+                if vuelo is None:
+                    vuelo = _Vuelo()
+                    self._vuelos[clave] = vuelo
+                    revalidar = True
+                lider = None
+            elif vuelo is None:
+                vuelo = _Vuelo()
+                self._vuelos[clave] = vuelo
+                lider = True
+                self.estadisticas["fallos"] += 1
+            else:
+                lider = False
+                self.estadisticas["coalescidas"] += 1
+
+        if lider is None:
+            if revalidar:
+                threading.Thread(
+                    target=self._revalidar, args=(clave, cargar, ttl, vuelo), name="cache-revalidar", daemon=True
+                ).start()
+            return entrada[2]
+
+        if not lider:
+            vuelo.evento.wait()
+            if vuelo.error is not None:
+                raise vuelo.error
+            return vuelo.resultado
+
+        return self._cargar(clave, cargar, ttl, vuelo)
+
+    def _cargar(self, clave, cargar, ttl, vuelo):
+        try:
+            vuelo.resultado = cargar()
+        except Exception as e:
+            vuelo.error = e
+            with self._lock:
+                self.estadisticas["errores"] += 1
+            raise
+        else:
+            self.guardar(clave, vuelo.resultado, ttl)
+            return vuelo.resultado
+        finally:
+            with self._lock:
+                self._vuelos.pop(clave, None)
+            vuelo.evento.set()
+
+    def _revalidar(self, clave, cargar, ttl, vuelo):
+        # el error ya quedó contado; el valor obsoleto sigue en el cache
+        try:
+            self._cargar(clave, cargar, ttl, vuelo)
+        except Exception:
+            pass
+
+    def consultar(self, clave):
+        # valor vigente o None, sin cargar
+        with self._lock:
+            entrada = self._datos.get(clave)
+            if entrada is None or entrada[0] <= time.monotonic():
+                return None
+            self._datos.move_to_end(clave)
+            return entrada[2]
+
+    def guardar(self, clave, valor, ttl=None):
+        tamano = _tamano_aproximado(valor)
+        expira = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            anterior = self._datos.pop(clave, None)
+            if anterior is not None:
+                self._bytes -= anterior[1]
+            self._datos[clave] = (expira, tamano, valor)
+            self._bytes += tamano
+            self._expulsar()
+
+    def _expulsar(self):
+        # primero lo vencido (y ya no servible como obsoleto), luego lo menos usado
+        ahora = time.monotonic()
+        for clave in [c for c, (expira, _, _) in self._datos.items() if expira + self.obsoleto <= ahora]:
+            self._bytes -= self._datos.pop(clave)[1]
+            self.estadisticas["expulsiones"] += 1
+        while len(self._datos) > 1 and (len(self._datos) > self.max_entradas or self._bytes > self.max_bytes):
+            _, (_, tamano, _) = self._datos.popitem(last=False)
+            self._bytes -= tamano
+            self.estadisticas["expulsiones"] += 1
+
+    def invalidar(self, clave=None):
+        with self._lock:
+            if clave is None:
+                self._datos.clear()
+                self._bytes = 0
+            else:
+                entrada = self._datos.pop(clave, None)
+                if entrada is not None:
+                    self._bytes -= entrada[1]
+
+    def estado(self):
+        with self._lock:
+            estado = dict(self.estadisticas)
+            estado["entradas"] = len(self._datos)
+            estado["bytes"] = self._bytes
+        consultas = estado["aciertos"] + estado["fallos"] + estado["coalescidas"]
+        estado["ratio_aciertos"] = (estado["aciertos"] + estado["coalescidas"]) / consultas if consultas else 0.0
+        return estado
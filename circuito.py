@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+# circuito.py
+# Interruptor de circuito para la base de datos. Tras varias fallas seguidas de
+# conexión o de tiempo, el circuito se abre y las consultas se rechazan al
+# instante (sin tomar conexión ni bloquear el hilo del worker) durante un
+# enfriamiento; después una sola consulta de prueba decide si vuelve a cerrarse.
+# Mientras está abierto, el dashboard sirve el último dato bueno.
+
+import threading
+import time
+
+from sqlalchemy.exc import DBAPIError, ProgrammingError
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+
+from metricas import log, registro
+
+CERRADO, ABIERTO, SEMIABIERTO = "cerrado", "abierto", "semiabierto"
+
+
+class CircuitoAbierto(ConnectionError):
+    pass
+
+
+def es_falla_base(error):
+    # fallas que hablan de la salud del servidor (conexión, timeouts), no de la consulta
+    if isinstance(error, ProgrammingError):
+        return False
+    return isinstance(error, (DBAPIError, PoolTimeoutError, TimeoutError, ConnectionError))
+
+
+class Circuito:
+    def __init__(self, nombre, fallas=3, enfriamiento=30.0):
+        self.nombre = nombre
+        self.fallas = fallas              # fallas seguidas para abrir
+        self.enfriamiento = enfriamiento  # segundos abierto antes de probar
+        self.estado = CERRADO
+        self.fallas_seguidas = 0
+        self.abierto_desde = None
+        self._prueba_en_curso = False
+        self._lock = threading.Lock()
+
+    def permitir(self):
+        # lanza CircuitoAbierto si la consulta no debe salir
+        with self._lock:
+            if self.estado == CERRADO:
+                return
+            if self.estado == ABIERTO and time.monotonic() - self.abierto_desde >= self.enfriamiento:
+                self.estado = SEMIABIERTO
+            if self.estado == SEMIABIERTO and not self._prueba_en_curso:
+                self._prueba_en_curso = True  # solo una consulta de prueba a la vez
+                return
+        registro.contar("circuito_rechazos_total", ayuda="Consultas rechazadas con el circuito abierto", circuito=self.nombre)
+        raise CircuitoAbierto(f"circuito {self.nombre} abierto: base de datos no disponible")
+
+    def exito(self):
+        with self._lock:
+            if self.estado != CERRADO:
+                log.warning("Circuito %s cerrado: la base respondió", self.nombre)
+            self.estado = CERRADO
+            self.fallas_seguidas = 0
+            self.abierto_desde = None
+            self._prueba_en_curso = False
+
+    def falla(self, error):
+        if not es_falla_base(error):
+            # la consulta falló pero el servidor respondió
+            self.exito()
+            return
+        with self._lock:
+            self.fallas_seguidas += 1
+            self._prueba_en_curso = False
+            if self.estado == SEMIABIERTO or self.fallas_seguidas >= self.fallas:
+                if self.estado != ABIERTO:
+                    registro.contar("circuito_aperturas_total", ayuda="Veces que se abrió el circuito", circuito=self.nombre)
+                    log.warning("Circuito %s abierto tras %d fallas: %s", self.nombre, self.fallas_seguidas, error)
+                self.estado = ABIERTO
+                self.abierto_desde = time.monotonic()
+
+    def disponible(self):
+        # False mientras el circuito rechace consultas (no cambia el estado)
+        with self._lock:
+            return self.estado == CERRADO or (
+                self.estado == ABIERTO and time.monotonic() - self.abierto_desde >= self.enfriamiento
+            ) or (self.estado == SEMIABIERTO and not self._prueba_en_curso)
@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+# cubo.py
+# Cubo OLAP en memoria: medidas aditivas por día x INTERVALO x campaña x agente.
+# Dimensiones categóricas y medidas en el entero más chico que las contiene, para
+# que un rango de semanas quepa en pocos MB. Rebanar (slice/dice) y enrollar
+# (roll-up) se resuelven en memoria; las razones salen de motor_kpis con las
+# mismas fórmulas que las tarjetas.
+
+import numpy as np
+import pandas as pd
+
+from motor_kpis import MEDIDAS, vista_trafico
+
+DIMENSIONES = ["DIA", "INTERVALO", "CAMPANA", "AGENTE"]
+
+
+def _compactar_medida(serie):
+    valores = pd.to_numeric(serie, errors="coerce").fillna(0)
+    if np.all(np.mod(valores.to_numpy(dtype="float64"), 1) == 0):
+        return pd.to_numeric(valores.astype("int64"), downcast="integer")
+    return valores.astype("float64")
+
+
+def _descompactar(df, dimensiones):
+    # dimensiones de vuelta a su tipo original para graficar y serializar
+    for dim in dimensiones:
+        if isinstance(df[dim].dtype, pd.CategoricalDtype):
+            df[dim] = df[dim].astype(df[dim].cat.categories.dtype)
+    return df
+
+
+class Cubo:
+    # hechos: DataFrame con DIMENSIONES + MEDIDAS (filas repetidas se suman)
+    def __init__(self, hechos, dimensiones=DIMENSIONES, medidas=MEDIDAS):
+        self.dimensiones = list(dimensiones)
+        self.medidas = list(medidas)
+        if len(hechos):
+            hechos = hechos.groupby(self.dimensiones, dropna=False, observed=True, sort=False)[self.medidas].sum().reset_index()
+        compacto = {dim: hechos[dim].astype("category") for dim in self.dimensiones}
+        compacto.update({m: _compactar_medida(hechos[m]) for m in self.medidas})
+        self.hechos = pd.DataFrame(compacto).reset_index(drop=True)
+
+    @classmethod
+    def _de_hechos(cls, hechos, dimensiones, medidas):
+        # sin recompactar: los hechos ya vienen de otro cubo
+        cubo = cls.__new__(cls)
+        cubo.dimensiones = dimensiones
+        cubo.medidas = medidas
+        cubo.hechos = hechos
+        return cubo
+
+    def __len__(self):
+        return len(self.hechos)
+
+    def memoria(self):
+        return int(self.hechos.memory_usage(index=True, deep=True).sum())
+
+    def miembros(self, dimension):
+        # valores presentes en el cubo, ordenados (opciones de los filtros)
+        serie = self.hechos[dimension]
+        return sorted(serie.cat.categories[np.unique(serie.cat.codes[serie.cat.codes >= 0])].tolist())
+
+    def rebanar(self, **filtros):
+        # slice/dice: dimensión=valor o lista de valores; None o lista vacía no filtra
+        mascara = np.ones(len(self.hechos), dtype=bool)
+        for dimension, valores in filtros.items():
+            if valores is None or (isinstance(valores, (list, tuple, set)) and not valores):
+                continue
+            if not isinstance(valores, (list, tuple, set)):
+                valores = [valores]
+            mascara &= self.hechos[dimension].isin(list(valores)).to_numpy()
+        return Cubo._de_hechos(self.hechos[mascara], self.dimensiones, self.medidas)
+
+    def enrollar(self, por=()):
+        # roll-up: sumas por las dimensiones dadas; sin dimensiones, una fila de total
+        por = list(por)
+        if not por:
+            return self.hechos[self.medidas].sum().to_frame().T
+        sumas = self.hechos.groupby(por, dropna=False, observed=True, sort=True)[self.medidas].sum().reset_index()
+        return _descompactar(sumas, por)
+
+    def vistas(self):
+        # mismas tres vistas que las consultas, ya con nombres de campaña y agente
+        campanas = self.enrollar(["CAMPANA"])
+        campanas = campanas[campanas["INTERACCIONES"] > 0].sort_values("INTERACCIONES", ascending=True)
+        agentes = self.enrollar(["AGENTE"])[["AGENTE", "CONTESTADAS_AGENTE"]]
+        agentes = agentes.rename(columns={"AGENTE": "NOMBRE", "CONTESTADAS_AGENTE": "INTERACCIONES"})
+        agentes = agentes[agentes["INTERACCIONES"] > 0].sort_values("INTERACCIONES", ascending=False)
+        return {
+            "trafico": vista_trafico(self.enrollar(["INTERVALO"])),
+            "campanas": campanas[["CAMPANA", "INTERACCIONES"]].reset_index(drop=True),
+            "agentes": agentes[["NOMBRE", "INTERACCIONES"]].reset_index(drop=True),
+        }
@@ -3,23 +3,82 @@
 # Dashboard completo con CSS pastel animado, consultas SQL y gráficas transparentes.
 # Reemplaza "(contraseña)" o el PWD vacío con tu contraseña real antes de ejecutar.
 
+import hashlib
+import os
+import threading
+import time
 import urllib
-from sqlalchemy import create_engine
+
+_INICIO_IMPORTACION = time.perf_counter()  # arranque en frío: desde aquí se miden los imports pesados
+
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+import numpy as np
 import pandas as pd
-from datetime import datetime
+from datetime import date, datetime, timedelta
 
 import dash
-from dash import Dash, html, dcc, dash_table
-from dash.dependencies import Input, Output
+import flask
+from dash import Dash, html, dcc, dash_table, no_update, Patch, ctx
+from dash.dependencies import ClientsideFunction, Input, Output, State
+from dash.exceptions import MissingCallbackContextException
 import dash_bootstrap_components as dbc
 import plotly.graph_objects as go
 
+from cache_consultas import CacheConsultas
+from circuito import Circuito, CircuitoAbierto, es_falla_base
+from snapshots import AlmacenSnapshots, RefrescadorSnapshots
+from incremental import AcumuladorIncremental
+from motor_kpis import COLUMNAS_TRAFICO, MEDIDAS, a_fraccion, derivar_ratios, totales, vista_trafico, vista_campanas, vista_agentes, vistas_desde_sumas
+from rollup import AlmacenRollup
+from series_tiempo import CUBETAS_MINUTOS, objetivo_puntos, rango_zoom, reducir, ventana
+from cubo import Cubo
+from dimensiones import CAMPANAS_DNIS, CATALOGO_AGENTES, TABLA_AGENTES, TABLA_CAMPANAS, Dimension, origen_catalogo
+from ejecutor import Ejecutor
+from erlang import MINUTOS_INTERVALO, OBJETIVO_NIVEL, OBJETIVO_SEGUNDOS, dimensionar
+from exportacion import TIPOS_CONTENIDO, flujo, leer_en_trozos
+from eventos import PublicadorVersiones
+from metricas import etapa, registrar_arranque, registrar_conexion, registrar_consulta, registrar_error, registrar_respuesta, registro
+
 # --------------------------------------------------
 # CONEXIÓN SQL
 # --------------------------------------------------
-def obtener_conexion():
-    import os
+# Un solo engine (y un solo pool) por proceso de gunicorn, creado en el primer uso.
+# El tamaño del pool se ajusta por variables de entorno según el número de pestañas.
+POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", "5"))
+POOL_MAX_OVERFLOW = int(os.environ.get("DB_POOL_MAX_OVERFLOW", "5"))
+POOL_TIMEOUT = float(os.environ.get("DB_POOL_TIMEOUT", "30"))
+POOL_RECYCLE = int(os.environ.get("DB_POOL_RECYCLE", "1800"))
+POOL_PRE_PING = os.environ.get("DB_POOL_PRE_PING", "1") not in ("0", "false", "False", "")
+
+# tiempo máximo por consulta en el servidor (0: sin límite) y hilos para consultas en paralelo
+CONSULTA_TIMEOUT_S = int(os.environ.get("CONSULTA_TIMEOUT_S", "30"))
+CONEXION_TIMEOUT_S = int(os.environ.get("CONEXION_TIMEOUT_S", "5"))  # login ODBC a un servidor caído
+CONSULTAS_HILOS = int(os.environ.get("CONSULTAS_HILOS", str(POOL_SIZE)))
+
+_engine = None
+_engine_pid = None
+_engine_lock = threading.Lock()
+
+# contadores del pool, legibles en caliente con estado_pool()
+_metricas_pool = {
+    "conexiones_nuevas": 0,
+    "checkouts": 0,
+    "checkins": 0,
+    "timeouts": 0,
+    "espera_total_s": 0.0,
+    "espera_max_s": 0.0,
+    "overflow_max": 0,
+}
+_metricas_pool_lock = threading.Lock()
+
+
+def _sumar_metrica_pool(nombre, valor=1):
+    with _metricas_pool_lock:
+        _metricas_pool[nombre] += valor
+
 
+def _crear_engine():
     DB_PWD = os.environ.get("DB_PWD", "")  # Render, GitHub Actions o tu PC pondrán la contraseña
 
     params = urllib.parse.quote_plus(
@@ -30,166 +89,690 @@ def obtener_conexion():
         f"PWD={DB_PWD};"
     )
 
-    engine = create_engine(f"mssql+pyodbc:///?odbc_connect={params}")
+    engine = create_engine(
+        f"mssql+pyodbc:///?odbc_connect={params}",
+        pool_size=POOL_SIZE,
+        max_overflow=POOL_MAX_OVERFLOW,
+        pool_timeout=POOL_TIMEOUT,
+        pool_recycle=POOL_RECYCLE,
+        pool_pre_ping=POOL_PRE_PING,
+        connect_args={"timeout": CONEXION_TIMEOUT_S},
+    )
+
+    @event.listens_for(engine, "connect")
+    def _al_conectar(dbapi_conn, registro):
+        _sumar_metrica_pool("conexiones_nuevas")
+
+    @event.listens_for(engine, "checkout")
+    def _al_prestar(dbapi_conn, registro, proxy):
+        _sumar_metrica_pool("checkouts")
+        overflow = engine.pool.overflow() if hasattr(engine.pool, "overflow") else 0
+        with _metricas_pool_lock:
+            _metricas_pool["overflow_max"] = max(_metricas_pool["overflow_max"], overflow)
+
+    @event.listens_for(engine, "checkin")
+    def _al_devolver(dbapi_conn, registro):
+        _sumar_metrica_pool("checkins")
+
     return engine
 
 
+def obtener_conexion():
+    global _engine, _engine_pid
+
+    pid = os.getpid()
+    if _engine is None or _engine_pid != pid:
+        with _engine_lock:
+            if _engine is None or _engine_pid != pid:
+                if _engine is not None:
+                    # engine heredado del proceso padre tras un fork: no tocar sus sockets
+                    _engine.dispose(close=False)
+                _engine = _crear_engine()
+                _engine_pid = pid
+    return _engine
+
+
+# tras CIRCUITO_FALLAS fallas seguidas de conexión/timeout no se consulta durante
+# CIRCUITO_ENFRIAMIENTO_S: los callbacks responden al instante con el último dato bueno
+circuito = Circuito(
+    "sql_server",
+    fallas=int(os.environ.get("CIRCUITO_FALLAS", "3")),
+    enfriamiento=float(os.environ.get("CIRCUITO_ENFRIAMIENTO_S", "30")),
+)
+
+
+def leer_sql(query, params=None, nombre="leer_sql", timeout=CONSULTA_TIMEOUT_S):
+    # pide una conexión al pool midiendo la espera y ejecuta la consulta;
+    # los parámetros van ligados por nombre (:param) para reutilizar el plan.
+    # nombre: función que consulta, para las métricas y el log de lentas
+    circuito.permitir()
+    inicio = time.perf_counter()
+    try:
+        # crear el engine también cuenta: si falla (driver ausente, URL mala) la
+        # consulta de prueba del circuito debe liberarse igual
+        conn = obtener_conexion().connect()
+    except PoolTimeoutError as e:
+        _sumar_metrica_pool("timeouts")
+        circuito.falla(e)
+        raise
+    except Exception as e:
+        circuito.falla(e)
+        raise
+    espera = time.perf_counter() - inicio
+    with _metricas_pool_lock:
+        _metricas_pool["espera_total_s"] += espera
+        _metricas_pool["espera_max_s"] = max(_metricas_pool["espera_max_s"], espera)
+    registrar_conexion(espera)
+
+    inicio = time.perf_counter()
+    try:
+        with conn:
+            if conn.dialect.name == "mssql":
+                # timeout de la consulta en pyodbc (SQL_ATTR_QUERY_TIMEOUT); se fija
+                # siempre porque la conexión vuelve al pool con el último valor
+                conn.connection.driver_connection.timeout = int(timeout or 0)
+            df = pd.read_sql(text(query), conn, params=params)
+    except Exception as e:
+        registro.contar("consulta_errores_total", ayuda="Consultas SQL que fallaron", funcion=nombre)
+        circuito.falla(e)
+        raise
+    circuito.exito()
+    registrar_consulta(nombre, time.perf_counter() - inicio, len(df), query)
+    return df
+
+
+def reiniciar_engine():
+    # tras el fork de gunicorn: el worker olvida el engine del master (si lo hubo)
+    # sin cerrar sus sockets; obtener_conexion() crea uno propio en el primer uso
+    global _engine, _engine_pid
+    with _engine_lock:
+        if _engine is not None and _engine_pid != os.getpid():
+            _engine.dispose(close=False)
+            _engine = None
+            _engine_pid = None
+
+
+def usar_engine(engine):
+    # sustituye el engine del proceso (benchmark y pruebas contra una base local)
+    global _engine, _engine_pid
+    with _engine_lock:
+        _engine = engine
+        _engine_pid = os.getpid()
+
+
+def dialecto():
+    return obtener_conexion().dialect.name
+
+
+def estado_pool():
+    with _metricas_pool_lock:
+        estado = dict(_metricas_pool)
+    estado["espera_promedio_s"] = (
+        estado["espera_total_s"] / estado["checkouts"] if estado["checkouts"] else 0.0
+    )
+
+    pool = _engine.pool if _engine is not None and _engine_pid == os.getpid() else None
+    estado["pool_size"] = POOL_SIZE
+    estado["max_overflow"] = POOL_MAX_OVERFLOW
+    estado["en_uso"] = pool.checkedout() if pool is not None else 0
+    estado["disponibles"] = pool.checkedin() if pool is not None else 0
+    estado["overflow"] = pool.overflow() if pool is not None else 0
+    return estado
+
+
 # --------------------------------------------------
 # CONSULTAS Y FUNCIONES
 # --------------------------------------------------
-def obtener_trafico():
-    query = """
-    ;WITH BASE AS (
-        SELECT *,
-            CASE 
-                WHEN DNIS = '5550059224' THEN 'HERDEZ FOOD IVR'
-                WHEN DNIS = '5550059285' THEN 'HERDEZ CORPORATIVO'
-                WHEN DNIS = '5550059213' THEN 'HERDEZ CONFIANZA'
-                WHEN DNIS = '5547372149' THEN 'CRUZ AZUL'
-                WHEN DNIS = '5550059273' THEN 'CONFIANZA LIBERTAD'
-                WHEN DNIS = '5550059281' THEN 'HOY COBRO'
-                WHEN DNIS = '524427463582' THEN 'LIBERTAD REVOLVENTE 360'
-                WHEN DNIS = '5542112905' THEN 'EGLOBAL'
-                WHEN DNIS = '524429198123' THEN 'LIBERTAD'
-                WHEN DNIS = '4429198246' THEN 'LIBERTAD ATC'
-                WHEN DNIS = '524427463439' THEN 'LIBERTAD INVERSION'
-                ELSE 'SIN CAMPAÑA'
-            END AS CAMPANA_ASIGNADA,
-            CASE WHEN DIRECCION = 'ENTRANTE' THEN 1 ELSE 0 END AS RECIBIDAS,
-            CASE WHEN DIRECCION = 'ENTRANTE' AND LLAMADA_ABANDONADA = 'NO' THEN 1 ELSE 0 END AS CONTESTADAS,
-            CASE WHEN DIRECCION = 'ENTRANTE' AND LLAMADA_ABANDONADA = 'SI' THEN 1 ELSE 0 END AS ABANDONADAS,
-            (ISNULL(TIEMPO_EN_COLA,0) + ISNULL(TIEMPO_DE_TIMBRADO,0)) AS ASA_BRUTO,
-            (ISNULL(TIEMPO_DE_CONVERSACION,0) + ISNULL(TIEMPO_DE_TIPIFICACIÓN,0)) AS AHT_BRUTO
-        FROM LLAMADAS_ESPECIALES_ECD
-        WHERE CAST(FECHA AS DATE) BETWEEN '2025-12-01' AND '2025-12-08'
-            AND DIRECCION = 'ENTRANTE'
-            AND FUERA_DE_HORARIO = 'Inside'
-            AND (SUB_CATEGORIA NOT LIKE '%Llamada de Prueba%' OR SUB_CATEGORIA IS NULL)
-            AND CAMPAÑA NOT IN ('LIBERTAD', 'EGLOBAL', 'ASSISTANCE')
-            AND ISNULL(TIEMPO_EN_IVR,0) <> 0
-            AND DNIS <> '5542112905'  -- filtro en SQL para omitir EGLOBAL
-    )
+# rango por defecto (inclusivo); el usuario lo cambia con el selector de fechas
+FECHA_DESDE = os.environ.get("FECHA_DESDE", "2025-12-01")
+FECHA_HASTA = os.environ.get("FECHA_HASTA", "2025-12-08")
+
+# rango semiabierto sobre FECHA sin CAST: permite seek en el índice y un solo plan
+FILTRO_FECHAS = "FECHA >= :fecha_desde AND FECHA < :fecha_hasta"
+
+def normalizar_fecha(valor):
+    # acepta 'YYYY-MM-DD', 'YYYY-MM-DDTHH:MM:SS', date o datetime
+    return pd.Timestamp(valor).date().isoformat()
+
+def parametros_fechas(desde, hasta):
+    inicio = datetime.combine(date.fromisoformat(normalizar_fecha(desde)), datetime.min.time())
+    fin = datetime.combine(date.fromisoformat(normalizar_fecha(hasta)), datetime.min.time()) + timedelta(days=1)
+    return {"fecha_desde": inicio, "fecha_hasta": fin}
+
+# catálogos DNIS -> campaña y agente -> nombre: se aplican después de agregar,
+# SQL solo agrupa por los códigos crudos
+campanas = Dimension("campanas", origen_catalogo("campanas", CAMPANAS_DNIS, TABLA_CAMPANAS, leer_sql))
+agentes = Dimension(
+    "agentes",
+    origen_catalogo(
+        "agentes", dict(zip(CATALOGO_AGENTES["ID_CONEXION"], CATALOGO_AGENTES["NOMBRE"])), TABLA_AGENTES, leer_sql
+    ),
+)
+
+def nombrar_campanas(df):
+    # DNIS -> CAMPANA; seguridad extra: nunca mostrar EGLOBAL
+    df = df.copy()
+    df["CAMPANA"] = campanas.mapear(df["DNIS"], defecto="SIN CAMPAÑA")
+    df = df[~df["CAMPANA"].astype(str).str.upper().str.contains("EGLOBAL", na=False)]
+    return df[["CAMPANA", "INTERACCIONES"]].reset_index(drop=True)
+
+def nombrar_agentes(df):
+    df = df.copy()
+    df["NOMBRE"] = agentes.mapear(df["ULTIMO_AGENTE"]).fillna("SIN AGENTE")
+    return df[["NOMBRE", "INTERACCIONES"]]
+
+def nombrar_vistas(vistas):
+    return {**vistas, "campanas": nombrar_campanas(vistas["campanas"]), "agentes": nombrar_agentes(vistas["agentes"])}
+
+# filtros comunes a las tres vistas (DNIS 5542112905 = EGLOBAL) y los extra de tráfico
+FILTRO_BASE = """DIRECCION = 'ENTRANTE'
+      AND COALESCE(TIEMPO_EN_IVR,0) <> 0
+      AND DNIS <> '5542112905'"""
+
+FILTRO_TRAFICO = """FUERA_DE_HORARIO = 'Inside'
+      AND (SUB_CATEGORIA NOT LIKE '%Llamada de Prueba%' OR SUB_CATEGORIA IS NULL)
+      AND CAMPAÑA NOT IN ('LIBERTAD', 'EGLOBAL', 'ASSISTANCE')"""
+
+ASA_BRUTO_SQL = "(COALESCE(TIEMPO_EN_COLA,0) + COALESCE(TIEMPO_DE_TIMBRADO,0))"
+AHT_BRUTO_SQL = "(COALESCE(TIEMPO_DE_CONVERSACION,0) + COALESCE(TIEMPO_DE_TIPIFICACIÓN,0))"
+
+def obtener_trafico(desde=FECHA_DESDE, hasta=FECHA_HASTA):
+    # solo sumas aditivas en SQL; las razones (ASA, AHT, %ABA, %SLA) salen de
+    # motor_kpis.derivar_ratios, igual que en los demás caminos
+    query = f"""
     SELECT INTERVALO,
-           SUM(RECIBIDAS) AS RECIBIDAS,
-           SUM(CONTESTADAS) AS CONTESTADAS,
-           SUM(ABANDONADAS) AS ABANDONADAS,
-           CASE WHEN SUM(CONTESTADAS) > 0 THEN SUM(CASE WHEN CONTESTADAS = 1 THEN ASA_BRUTO ELSE 0 END) * 1.0 / SUM(CONTESTADAS) END AS ASA,
-           CASE WHEN SUM(CONTESTADAS) > 0 THEN SUM(AHT_BRUTO) * 1.0 / SUM(CONTESTADAS) END AS AHT,
-           SUM(CASE WHEN CONTESTADAS = 1 AND ASA_BRUTO <= 20 THEN 1 ELSE 0 END) AS ATENDIDAS_20S,
-           CASE WHEN SUM(RECIBIDAS) > 0 THEN SUM(ABANDONADAS) * 1.0 / SUM(RECIBIDAS) END AS PORC_ABA,
-           CASE WHEN SUM(CONTESTADAS) > 0 THEN SUM(CASE WHEN ASA_BRUTO <= 20 THEN 1 ELSE 0 END) * 1.0 / SUM(CONTESTADAS) END AS PORC_SLA
-    FROM BASE
+        COUNT(*) AS RECIBIDAS,
+        SUM(CASE WHEN LLAMADA_ABANDONADA = 'NO' THEN 1 ELSE 0 END) AS CONTESTADAS,
+        SUM(CASE WHEN LLAMADA_ABANDONADA = 'SI' THEN 1 ELSE 0 END) AS ABANDONADAS,
+        SUM(CASE WHEN LLAMADA_ABANDONADA = 'NO' THEN {ASA_BRUTO_SQL} ELSE 0 END) AS ASA_BRUTO,
+        SUM({AHT_BRUTO_SQL}) AS AHT_BRUTO,
+        SUM(CASE WHEN LLAMADA_ABANDONADA = 'NO' AND {ASA_BRUTO_SQL} <= 20 THEN 1 ELSE 0 END) AS ATENDIDAS_20S
+    FROM LLAMADAS_ESPECIALES_ECD
+    WHERE {FILTRO_FECHAS}
+      AND {FILTRO_BASE}
+      AND {FILTRO_TRAFICO}
     GROUP BY INTERVALO
     ORDER BY INTERVALO;
     """
-    try:
-        engine = obtener_conexion()
-        df = pd.read_sql(query, engine)
-
-        # Refuerzo en Python: si por alguna razón no filtró en SQL, eliminar DNIS = '5542112905'
-        if "DNIS" in df.columns:
-            df = df[df["DNIS"].astype(str) != "5542112905"]
-        # también eliminar cualquier fila cuyo CAMPANA_ASIGNADA sea 'EGLOBAL' por seguridad
-        if "CAMPANA_ASIGNADA" in df.columns:
-            df = df[~df["CAMPANA_ASIGNADA"].astype(str).str.upper().str.contains("EGLOBAL", na=False)]
-
-        return df
-    except Exception as e:
-        print("Error obtener_trafico():", e)
-        cols = ["INTERVALO","RECIBIDAS","CONTESTADAS","ABANDONADAS","ASA","AHT","ATENDIDAS_20S","PORC_ABA","PORC_SLA"]
-        return pd.DataFrame(columns=cols)
+    # los errores suben: una vista vacía se vería como tráfico en cero
+    df = leer_sql(query, parametros_fechas(desde, hasta), "obtener_trafico")
+    columnas = ["RECIBIDAS","CONTESTADAS","ABANDONADAS","ASA_BRUTO","AHT_BRUTO","ATENDIDAS_20S"]
+    df[columnas] = df[columnas].apply(pd.to_numeric, errors="coerce").fillna(0)
+    return vista_trafico(df)
 
-def obtener_resumen_campanas():
-    query = """
+def obtener_resumen_campanas(desde=FECHA_DESDE, hasta=FECHA_HASTA):
+    query = f"""
     SELECT 
-        CASE 
-            WHEN DNIS = '5550059224' THEN 'HERDEZ FOOD IVR'
-            WHEN DNIS = '5550059285' THEN 'HERDEZ CORPORATIVO'
-            WHEN DNIS = '5550059213' THEN 'HERDEZ CONFIANZA'
-            WHEN DNIS = '5547372149' THEN 'CRUZ AZUL'
-            WHEN DNIS = '5550059273' THEN 'CONFIANZA LIBERTAD'
-            WHEN DNIS = '5550059281' THEN 'HOY COBRO'
-            WHEN DNIS = '524427463582' THEN 'LIBERTAD REVOLVENTE 360'
-            WHEN DNIS = '5542112905' THEN 'EGLOBAL'
-            WHEN DNIS = '524429198123' THEN 'LIBERTAD'
-            WHEN DNIS = '4429198246' THEN 'LIBERTAD ATC'
-            WHEN DNIS = '524427463439' THEN 'LIBERTAD INVERSION'
-            ELSE 'SIN CAMPAÑA'
-        END AS CAMPANA,
+        DNIS,
         COUNT(*) AS INTERACCIONES
     FROM LLAMADAS_ESPECIALES_ECD
-   WHERE CAST(FECHA AS DATE) BETWEEN '2025-12-01' AND '2025-12-08'
+   WHERE {FILTRO_FECHAS}
       AND DIRECCION = 'ENTRANTE'
-      AND ISNULL(TIEMPO_EN_IVR,0) <> 0
+      AND COALESCE(TIEMPO_EN_IVR,0) <> 0
       AND DNIS <> '5542112905'  -- filtro en SQL para omitir EGLOBAL
     GROUP BY DNIS
     ORDER BY INTERACCIONES ASC;
     """
-    try:
-        engine = obtener_conexion()
-        df = pd.read_sql(query, engine)
-
-        # seguridad extra en Python
-        if "CAMPANA" in df.columns:
-            df = df[~df["CAMPANA"].astype(str).str.upper().str.contains("EGLOBAL", na=False)]
-
-        return df
-    except Exception as e:
-        print("Error obtener_resumen_campanas():", e)
-        return pd.DataFrame(columns=["CAMPANA","INTERACCIONES"])
+    df = leer_sql(query, parametros_fechas(desde, hasta), "obtener_resumen_campanas")
+    return nombrar_campanas(df)
 
-def obtener_datos_agentes():
-    query = """
+def obtener_datos_agentes(desde=FECHA_DESDE, hasta=FECHA_HASTA):
+    query = f"""
     SELECT ULTIMO_AGENTE, COUNT(*) AS INTERACCIONES
     FROM LLAMADAS_ESPECIALES_ECD
-   WHERE CAST(FECHA AS DATE) BETWEEN '2025-12-01' AND '2025-12-08'
+   WHERE {FILTRO_FECHAS}
       AND DIRECCION = 'ENTRANTE'
       AND LLAMADA_ABANDONADA = 'NO'
-      AND ISNULL(TIEMPO_EN_IVR,0) <> 0
+      AND COALESCE(TIEMPO_EN_IVR,0) <> 0
       AND DNIS <> '5542112905'  -- filtro en SQL para omitir EGLOBAL
     GROUP BY ULTIMO_AGENTE
     ORDER BY INTERACCIONES DESC;
     """
+    df = leer_sql(query, parametros_fechas(desde, hasta), "obtener_datos_agentes")
+    return nombrar_agentes(df)
+
+# medidas aditivas; cada una aplica los filtros de la vista a la que alimenta
+# (tráfico: FILTRO_TRAFICO; campañas: todas; agentes: solo contestadas)
+MEDIDAS_SQL = f"""SUM(CASE WHEN {FILTRO_TRAFICO} THEN 1 ELSE 0 END) AS RECIBIDAS,
+        SUM(CASE WHEN {FILTRO_TRAFICO} AND LLAMADA_ABANDONADA = 'NO' THEN 1 ELSE 0 END) AS CONTESTADAS,
+        SUM(CASE WHEN {FILTRO_TRAFICO} AND LLAMADA_ABANDONADA = 'SI' THEN 1 ELSE 0 END) AS ABANDONADAS,
+        SUM(CASE WHEN {FILTRO_TRAFICO} AND LLAMADA_ABANDONADA = 'NO' THEN {ASA_BRUTO_SQL} ELSE 0 END) AS ASA_BRUTO,
+        SUM(CASE WHEN {FILTRO_TRAFICO} THEN {AHT_BRUTO_SQL} ELSE 0 END) AS AHT_BRUTO,
+        SUM(CASE WHEN {FILTRO_TRAFICO} AND LLAMADA_ABANDONADA = 'NO' AND {ASA_BRUTO_SQL} <= 20 THEN 1 ELSE 0 END) AS ATENDIDAS_20S,
+        COUNT(*) AS INTERACCIONES,
+        SUM(CASE WHEN LLAMADA_ABANDONADA = 'NO' THEN 1 ELSE 0 END) AS CONTESTADAS_AGENTE"""
+
+def obtener_agregados(desde=FECHA_DESDE, hasta=FECHA_HASTA):
+    # una sola lectura de la tabla con GROUPING SETS para las tres vistas
+    if dialecto() != "mssql":
+        return agregados_desde_medidas(desde, hasta)
+
+    query = f"""
+    SELECT GROUPING(INTERVALO) AS G_INTERVALO,
+           GROUPING(DNIS) AS G_DNIS,
+           GROUPING(ULTIMO_AGENTE) AS G_AGENTE,
+           INTERVALO, DNIS, ULTIMO_AGENTE,
+        {MEDIDAS_SQL}
+    FROM LLAMADAS_ESPECIALES_ECD
+    WHERE {FILTRO_FECHAS}
+      AND {FILTRO_BASE}
+    GROUP BY GROUPING SETS ((INTERVALO), (DNIS), (ULTIMO_AGENTE));
+    """
+    df = leer_sql(query, parametros_fechas(desde, hasta), "obtener_agregados")
+    df[MEDIDAS] = df[MEDIDAS].apply(pd.to_numeric, errors="coerce").fillna(0)
+
+    return nombrar_vistas({
+        "trafico": vista_trafico(df[df["G_INTERVALO"] == 0]),
+        "campanas": vista_campanas(df[df["G_DNIS"] == 0]),
+        "agentes": vista_agentes(df[df["G_AGENTE"] == 0]),
+    })
+
+def agregados_desde_medidas(desde=FECHA_DESDE, hasta=FECHA_HASTA):
+    # bases sin GROUPING SETS (SQLite del benchmark): mismas vistas desde las medidas diarias
+    sumas = obtener_medidas_diarias(desde, hasta)
+    sumas[MEDIDAS] = sumas[MEDIDAS].apply(pd.to_numeric, errors="coerce").fillna(0)
+    return nombrar_vistas(vistas_desde_sumas(sumas))
+
+def vistas_vacias():
+    # estructura de las vistas sin filas (solo para tipos/columnas; no para tapar errores)
+    return {
+        "trafico": pd.DataFrame(columns=["INTERVALO","RECIBIDAS","CONTESTADAS","ABANDONADAS","ASA","AHT","ATENDIDAS_20S","PORC_ABA","PORC_SLA"]),
+        "campanas": pd.DataFrame(columns=["CAMPANA","INTERACCIONES"]),
+        "agentes": pd.DataFrame(columns=["NOMBRE","INTERACCIONES"]),
+    }
+
+def consultar_medidas_delta(desde, hasta, corte=None, congelar=None):
+    # sumas aditivas por INTERVALO x DNIS x agente de las llamadas con FECHA >= corte,
+    # separadas en CONGELADA (FECHA < congelar) y cola reciente. La marca va en una
+    # tabla derivada: SQL Server no acepta el mismo parámetro en SELECT y GROUP BY
+    filtro_corte = "AND FECHA >= :corte" if corte is not None else ""
+    congelada = "CASE WHEN FECHA < :congelar THEN 1 ELSE 0 END" if congelar is not None else "0"
+    query = f"""
+    SELECT INTERVALO, DNIS, ULTIMO_AGENTE, CONGELADA,
+        {MEDIDAS_SQL},
+        MAX(FECHA) AS FECHA_MAX
+    FROM (
+        SELECT *, {congelada} AS CONGELADA
+        FROM LLAMADAS_ESPECIALES_ECD
+        WHERE {FILTRO_FECHAS}
+          AND {FILTRO_BASE}
+          {filtro_corte}
+    ) AS recientes
+    GROUP BY INTERVALO, DNIS, ULTIMO_AGENTE, CONGELADA;
+    """
+    params = parametros_fechas(desde, hasta)
+    if corte is not None:
+        params["corte"] = corte
+    if congelar is not None:
+        params["congelar"] = congelar
+    return leer_sql(query, params, "consultar_medidas_delta")
+
+def obtener_medidas_diarias(desde, hasta):
+    # medidas aditivas por día x INTERVALO x DNIS x agente (alimenta el rollup local)
+    dia = "CAST(FECHA AS DATE)" if dialecto() == "mssql" else "DATE(FECHA)"
+    query = f"""
+    SELECT {dia} AS DIA, INTERVALO, DNIS, ULTIMO_AGENTE,
+        {MEDIDAS_SQL}
+    FROM LLAMADAS_ESPECIALES_ECD
+    WHERE {FILTRO_FECHAS}
+      AND {FILTRO_BASE}
+    GROUP BY {dia}, INTERVALO, DNIS, ULTIMO_AGENTE;
+    """
+    return leer_sql(query, parametros_fechas(desde, hasta), "obtener_medidas_diarias")
+
+# columnas del detalle exportable (sin SELECT *)
+COLUMNAS_DETALLE = [
+    "FECHA", "INTERVALO", "DNIS", "CAMPAÑA", "DIRECCION", "FUERA_DE_HORARIO", "SUB_CATEGORIA",
+    "LLAMADA_ABANDONADA", "ULTIMO_AGENTE", "TIEMPO_EN_IVR", "TIEMPO_EN_COLA", "TIEMPO_DE_TIMBRADO",
+    "TIEMPO_DE_CONVERSACION", "TIEMPO_DE_TIPIFICACIÓN",
+]
+
+def _lista_sql(prefijo, valores, params):
+    # IN (:p_0, :p_1, ...) con parámetros ligados
+    nombres = []
+    for i, valor in enumerate(valores):
+        params[f"{prefijo}_{i}"] = valor
+        nombres.append(f":{prefijo}_{i}")
+    return ", ".join(nombres)
+
+def condiciones_seleccion(sel_campanas, sel_agentes, params):
+    # filtros de campaña y agente elegidos por nombre, traducidos a códigos con
+    # los catálogos; agrega los parámetros ligados a params
+    condiciones = []
+    if sel_campanas:
+        catalogo = campanas.catalogo()
+        opciones = []
+        codigos = catalogo.index[catalogo.isin(sel_campanas)].tolist()
+        if codigos:
+            opciones.append(f"DNIS IN ({_lista_sql('dnis', codigos, params)})")
+        if "SIN CAMPAÑA" in sel_campanas and len(catalogo):
+            opciones.append(f"DNIS NOT IN ({_lista_sql('dnis_cat', catalogo.index.tolist(), params)})")
+        condiciones.append("(" + " OR ".join(opciones or ["1 = 0"]) + ")")
+
+    if sel_agentes:
+        catalogo = agentes.catalogo()
+        opciones = []
+        # nombres del catálogo y, para agentes sin nombre, el propio código mostrado
+        codigos = catalogo.index[catalogo.isin(sel_agentes)].tolist()
+        codigos += [a for a in sel_agentes if a != "SIN AGENTE" and a not in catalogo.values]
+        if codigos:
+            opciones.append(f"CAST(ULTIMO_AGENTE AS VARCHAR(20)) IN ({_lista_sql('agente', codigos, params)})")
+        if "SIN AGENTE" in sel_agentes:
+            opciones.append("ULTIMO_AGENTE IS NULL")
+        condiciones.append("(" + " OR ".join(opciones or ["1 = 0"]) + ")")
+    return condiciones
+
+def consulta_detalle(desde, hasta, sel_campanas=None, sel_agentes=None, solo_trafico=False):
+    # llamadas individuales con los mismos filtros de exclusión que las vistas
+    params = parametros_fechas(desde, hasta)
+    condiciones = [FILTRO_FECHAS, FILTRO_BASE]
+    if solo_trafico:
+        condiciones.append(FILTRO_TRAFICO)
+    condiciones += condiciones_seleccion(sel_campanas, sel_agentes, params)
+
+    query = f"""
+    SELECT {", ".join(COLUMNAS_DETALLE)}
+    FROM LLAMADAS_ESPECIALES_ECD
+    WHERE {" AND ".join(condiciones)}
+    ORDER BY FECHA;
+    """
+    return query, params
+
+def nombrar_detalle(df):
+    # nombres de campaña y agente por trozo, con el mismo mapeo que las vistas
+    return df.assign(
+        CAMPANA=campanas.mapear(df["DNIS"], defecto="SIN CAMPAÑA"),
+        NOMBRE_AGENTE=agentes.mapear(df["ULTIMO_AGENTE"]).fillna("SIN AGENTE"),
+    )
+
+def obtener_serie(desde, hasta, minutos, sel_campanas=None, sel_agentes=None):
+    # medidas por cubeta de 'minutos' sobre FECHA (serie de tiempo fina, no perfil por INTERVALO)
+    minutos = int(minutos)
+    if minutos not in CUBETAS_MINUTOS:
+        raise ValueError(f"cubeta no soportada: {minutos}")
+    if dialecto() == "mssql":
+        cubeta = f"DATEADD(MINUTE, (DATEDIFF(MINUTE, 0, FECHA) / {minutos}) * {minutos}, 0)"
+    else:
+        cubeta = f"datetime((CAST(strftime('%s', FECHA) AS INTEGER) / {minutos * 60}) * {minutos * 60}, 'unixepoch')"
+
+    params = parametros_fechas(desde, hasta)
+    condiciones = [FILTRO_FECHAS, FILTRO_BASE] + condiciones_seleccion(sel_campanas, sel_agentes, params)
+    query = f"""
+    SELECT {cubeta} AS CUBETA,
+        {MEDIDAS_SQL}
+    FROM LLAMADAS_ESPECIALES_ECD
+    WHERE {" AND ".join(condiciones)}
+    GROUP BY {cubeta}
+    ORDER BY CUBETA;
+    """
+    df = leer_sql(query, params, "obtener_serie")
+    df["CUBETA"] = pd.to_datetime(df["CUBETA"])
+    df[MEDIDAS] = df[MEDIDAS].apply(pd.to_numeric, errors="coerce").fillna(0)
+    df = derivar_ratios(df[df["RECIBIDAS"] > 0])
+    return df.reset_index(drop=True)
+
+# --------------------------------------------------
+# ROLLUP LOCAL DE DÍAS CERRADOS
+# --------------------------------------------------
+ROLLUP_HABILITADO = os.environ.get("ROLLUP_HABILITADO", "1") not in ("0", "false", "False", "")
+
+# sin rollup: tres consultas por vista en paralelo en lugar de la combinada
+CONSULTAS_PARALELAS = os.environ.get("CONSULTAS_PARALELAS", "0") not in ("0", "false", "False", "")
+
+# el plazo del lote deja un margen sobre el timeout de cada consulta en el driver
+ejecutor = Ejecutor(max_hilos=CONSULTAS_HILOS, timeout=CONSULTA_TIMEOUT_S + 5 if CONSULTA_TIMEOUT_S else None)
+
+almacen_rollup = AlmacenRollup(
+    obtener_medidas_diarias, margen_cierre=timedelta(minutes=float(os.environ.get("ROLLUP_MARGEN_MIN", "60"))),
+    ejecutor=ejecutor,
+)
+
+def agregados_rollup(desde=FECHA_DESDE, hasta=FECHA_HASTA):
+    sumas = almacen_rollup.medidas(
+        date.fromisoformat(normalizar_fecha(desde)), date.fromisoformat(normalizar_fecha(hasta))
+    )
+    return nombrar_vistas(vistas_desde_sumas(sumas))
+
+@etapa("datos")
+def agregados_paralelos(desde=FECHA_DESDE, hasta=FECHA_HASTA):
+    # una consulta por vista, las tres a la vez: la latencia es la de la más lenta.
+    # Si falla campañas o agentes solo su panel queda vacío; sin tráfico no hay
+    # KPIs y el error sube (se sirve el último dato bueno)
+    resultados = ejecutor.ejecutar({
+        "trafico": lambda: obtener_trafico(desde, hasta),
+        "campanas": lambda: obtener_resumen_campanas(desde, hasta),
+        "agentes": lambda: obtener_datos_agentes(desde, hasta),
+    })
+    if isinstance(resultados["trafico"], Exception):
+        raise resultados["trafico"]
+    vistas = vistas_vacias()
+    for vista, resultado in resultados.items():
+        if isinstance(resultado, Exception):
+            registrar_error(f"agregados_paralelos.{vista}", resultado)
+        else:
+            vistas[vista] = resultado
+    return vistas
+
+@etapa("datos")
+def cargar_agregados(desde=FECHA_DESDE, hasta=FECHA_HASTA):
+    # días cerrados del rollup local + hoy en vivo, tres consultas en paralelo
+    # o una sola lectura con GROUPING SETS
+    if ROLLUP_HABILITADO:
+        return agregados_rollup(desde, hasta)
+    if CONSULTAS_PARALELAS:
+        return agregados_paralelos(desde, hasta)
+    return obtener_agregados(desde, hasta)
+
+# --------------------------------------------------
+# CACHE COMPARTIDO
+# --------------------------------------------------
+# Todas las pestañas ven los mismos datos: una consulta por clave y TTL,
+# sin importar cuántos callbacks lleguen a la vez.
+cache_consultas = CacheConsultas(
+    ttl=float(os.environ.get("CACHE_TTL", "55")),
+    max_entradas=int(os.environ.get("CACHE_MAX_ENTRADAS", "128")),
+    max_bytes=int(os.environ.get("CACHE_MAX_MB", "256")) * 1024 * 1024,
+    # stale-while-revalidate: lo vencido se sirve hasta este tiempo mientras se recarga
+    obsoleto=float(os.environ.get("CACHE_OBSOLETO_S", "1800")),
+)
+
+def serie_cacheada(desde, hasta, minutos, sel_campanas=None, sel_agentes=None):
+    clave = ("serie", normalizar_fecha(desde), normalizar_fecha(hasta), int(minutos),
+             tuple(sorted(sel_campanas or [])), tuple(sorted(sel_agentes or [])))
+    return cache_consultas.obtener(clave, lambda: obtener_serie(desde, hasta, minutos, sel_campanas, sel_agentes))
+
+def agregados_cacheados(desde=FECHA_DESDE, hasta=FECHA_HASTA):
+    # guarda también cuándo se generaron los datos
+    return cache_consultas.obtener(
+        ("agregados", normalizar_fecha(desde), normalizar_fecha(hasta)),
+        lambda: {**cargar_agregados(desde, hasta), "generado": datetime.now()},
+    )
+
+# --------------------------------------------------
+# SNAPSHOTS EN SEGUNDO PLANO
+# --------------------------------------------------
+# Un solo proceso (el que tiene el candado) consulta SQL Server cada intervalo y
+# publica un snapshot versionado; los callbacks de todos los workers solo lo leen.
+SNAPSHOT_INTERVALO = float(os.environ.get("SNAPSHOT_INTERVALO", "60"))
+SNAPSHOT_VIGENCIA = float(os.environ.get("SNAPSHOT_VIGENCIA", str(3 * SNAPSHOT_INTERVALO)))
+
+# modo incremental: el líder solo trae las llamadas recientes (desde la última marca
+# menos un margen para las filas que se escriben tarde)
+SNAPSHOT_INCREMENTAL = os.environ.get("SNAPSHOT_INCREMENTAL", "1") not in ("0", "false", "False", "")
+acumulador = AcumuladorIncremental(
+    consultar_medidas_delta,
+    resincronizar_cada=float(os.environ.get("INCREMENTAL_RESYNC", "1800")),
+    margen_minutos=float(os.environ.get("INCREMENTAL_MARGEN_MIN", "60")),
+)
+
+@etapa("snapshot")
+def construir_snapshot(desde, hasta):
+    if SNAPSHOT_INCREMENTAL:
+        return nombrar_vistas(acumulador.actualizar(desde, hasta))
+
+    return cargar_agregados(desde, hasta)
+
+almacen_snapshots = AlmacenSnapshots()
+refrescador = RefrescadorSnapshots(
+    almacen_snapshots, construir_snapshot,
+    normalizar_fecha(FECHA_DESDE), normalizar_fecha(FECHA_HASTA), intervalo=SNAPSHOT_INTERVALO
+)
+
+# avisos por SSE: cada worker vigila la versión publicada y avisa a sus clientes;
+# solo cubren el rango del refrescador sin filtros (las demás vistas sondean)
+EVENTOS_HABILITADO = os.environ.get("EVENTOS_HABILITADO", "1") not in ("0", "false", "False", "")
+# cada flujo ocupa un hilo de gunicorn: por defecto, la mitad de los hilos del worker
+EVENTOS_MAX_CONEXIONES = int(os.environ.get(
+    "EVENTOS_MAX_CONEXIONES", max(1, int(os.environ.get("GUNICORN_THREADS", "16")) // 2)
+))
+publicador = PublicadorVersiones(
+    almacen_snapshots.version_actual,
+    (normalizar_fecha(FECHA_DESDE), normalizar_fecha(FECHA_HASTA)),
+    intervalo=float(os.environ.get("EVENTOS_INTERVALO", "1")),
+    duracion=float(os.environ.get("EVENTOS_DURACION", "300")),
+    max_conexiones=EVENTOS_MAX_CONEXIONES,
+)
+
+def sin_datos():
+    # no hay dato bueno que mostrar: las vistas van vacías y marcadas, para que
+    # la pantalla diga "sin datos" en lugar de pintar ceros
+    return {**vistas_vacias(), "generado": None, "version": None, "sin_datos": True}
+
+def datos_dashboard(desde=FECHA_DESDE, hasta=FECHA_HASTA):
+    # snapshot vigente si cubre el rango; si no, consulta vía cache compartido
+    # (que sirve lo vencido mientras recarga); si la base falla, el último
+    # snapshot del rango aunque sea viejo
+    snap = almacen_snapshots.leer_ultimo()
+    if snap is not None and (snap.desde, snap.hasta) != (normalizar_fecha(desde), normalizar_fecha(hasta)):
+        snap = None
+    if snap is not None and (datetime.now() - snap.generado).total_seconds() <= SNAPSHOT_VIGENCIA:
+        return {**snap.tablas, "generado": snap.generado, "version": snap.version}
+
     try:
-        engine = obtener_conexion()
-        df = pd.read_sql(query, engine)
-
-        df["ULTIMO_AGENTE"] = df["ULTIMO_AGENTE"].astype(str)
-
-        catalogo_agentes = pd.DataFrame({
-            "ID_CONEXION": [4245,6873,10009,11757,11810,11914,12584,12620,14264,14494,15339,16834,16939,17852,50604,80102,90088],
-            "NOMBRE": [
-                "DOMINGUEZ GONZALEZ AMELLALY ANDREA",
-                "MARIN PEÑARANDA KELLY YUREINNY",
-                "ALCALA BARRERA ELIZABETH",
-                "FUENTES OSNAYA MAGALY JOCELINE",
-                "MIRANDA SANTIAGO NORMA ANGELICA",
-                "GALICIA GARCIA KARLA CLAUDIA",
-                "CARRASCO JUAN ALEYDA MONSERRAT",
-                "CASTILLO GARCIA LIZBETH",
-                "AVILES MARTINEZ LETICIA",
-                "CADENA RUIZ ESPARZA MARIA DE LOURDES",
-                "LOPEZ MALAGON MITZI AMARILLIS",
-                "TRUJILLO LUNA OSCAR",
-                "RUIZ ZAVALA JESSICA MARGARITA",
-                "BERDEJO FLORES PATRICIA",
-                "MENDEZ DE LA LUZ MARIA FERNANDA",
-                "AGUIRRE NAVA KENIA ANGELICA",
-                "TROVAMALA VILLAVICENCIO ISABEL"
-            ]
-        })
-        catalogo_agentes["ID_CONEXION"] = catalogo_agentes["ID_CONEXION"].astype(str)
-
-        df = df.merge(catalogo_agentes, left_on="ULTIMO_AGENTE", right_on="ID_CONEXION", how="left")
-        df["NOMBRE"].fillna(df["ULTIMO_AGENTE"], inplace=True)
-
-        return df[["NOMBRE", "INTERACCIONES"]]
+        return {**agregados_cacheados(desde, hasta), "version": None}
     except Exception as e:
-        print("Error obtener_datos_agentes():", e)
-        return pd.DataFrame(columns=["NOMBRE","INTERACCIONES"])
+        if not isinstance(e, CircuitoAbierto):
+            registrar_error("datos_dashboard", e)
+        if snap is not None:
+            return {**snap.tablas, "generado": snap.generado, "version": snap.version}
+        return sin_datos()
+
+# --------------------------------------------------
+# CUBO EN MEMORIA (FILTROS POR CAMPAÑA Y AGENTE)
+# --------------------------------------------------
+# Se arma una vez por rango y TTL de las medidas diarias (rollup + hoy en vivo);
+# cada cambio de filtro se resuelve en memoria sin consultar SQL Server.
+def construir_cubo(desde=FECHA_DESDE, hasta=FECHA_HASTA):
+    if ROLLUP_HABILITADO:
+        sumas = almacen_rollup.medidas(
+            date.fromisoformat(normalizar_fecha(desde)), date.fromisoformat(normalizar_fecha(hasta))
+        )
+    else:
+        sumas = obtener_medidas_diarias(desde, hasta)
+    sumas = sumas.assign(
+        CAMPANA=campanas.mapear(sumas["DNIS"], defecto="SIN CAMPAÑA"),
+        AGENTE=agentes.mapear(sumas["ULTIMO_AGENTE"]).fillna("SIN AGENTE"),
+    )
+    return {"cubo": Cubo(sumas), "generado": datetime.now()}
+
+def cubo_cacheado(desde=FECHA_DESDE, hasta=FECHA_HASTA):
+    return cache_consultas.obtener(
+        ("cubo", normalizar_fecha(desde), normalizar_fecha(hasta)), lambda: construir_cubo(desde, hasta)
+    )
+
+def datos_filtrados(desde, hasta, sel_campanas=None, sel_agentes=None):
+    # sin filtros, el camino normal (snapshot / cache); con filtros, el cubo
+    if not sel_campanas and not sel_agentes:
+        return datos_dashboard(desde, hasta)
+    try:
+        entrada = cubo_cacheado(desde, hasta)
+        vistas = entrada["cubo"].rebanar(CAMPANA=sel_campanas, AGENTE=sel_agentes).vistas()
+        return {**vistas, "generado": entrada["generado"], "version": None}
+    except Exception as e:
+        if not isinstance(e, CircuitoAbierto):
+            registrar_error("datos_filtrados", e)
+        return sin_datos()
+
+# --------------------------------------------------
+# DIMENSIONAMIENTO (ERLANG C) Y ESCENARIOS WHAT-IF
+# --------------------------------------------------
+# Demanda de un día típico por INTERVALO (volumen del rango / días) con su AHT.
+# La rejilla completa de escenarios (factor de volumen x factor de AHT) se
+# resuelve de una vez con Erlang C vectorizado y queda en el cache: mover los
+# sliders solo elige una celda de la rejilla.
+FACTORES_WHATIF = np.round(np.arange(0.5, 2.0 + 1e-9, 0.05), 2)
+
+def perfil_demanda(trafico, desde, hasta):
+    dias = (date.fromisoformat(normalizar_fecha(hasta)) - date.fromisoformat(normalizar_fecha(desde))).days + 1
+    recibidas = pd.to_numeric(trafico["RECIBIDAS"], errors="coerce").fillna(0)
+    contestadas = pd.to_numeric(trafico["CONTESTADAS"], errors="coerce").fillna(0)
+    aht = pd.to_numeric(trafico["AHT"], errors="coerce")
+    # intervalos sin contestadas: AHT ponderado del rango
+    aht_global = (aht.fillna(0) * contestadas).sum() / contestadas.sum() if contestadas.sum() > 0 else 0.0
+    return pd.DataFrame({
+        "INTERVALO": trafico["INTERVALO"].astype(str).to_numpy(),
+        "VOLUMEN": (recibidas / max(1, dias)).to_numpy(),
+        "AHT": aht.where(aht > 0).fillna(aht_global).to_numpy(),
+    })
+
+@etapa("erlang")
+def escenarios_personal(perfil):
+    # arreglos (volumen x AHT x intervalo) con agentes, nivel de servicio, ASA...
+    volumen = FACTORES_WHATIF[:, None, None] * perfil["VOLUMEN"].to_numpy()[None, None, :]
+    aht = FACTORES_WHATIF[None, :, None] * perfil["AHT"].to_numpy()[None, None, :]
+    return dimensionar(volumen, aht)
+
+def escenarios_cacheados(trafico, desde, hasta, h):
+    def cargar():
+        perfil = perfil_demanda(trafico, desde, hasta)
+        return {"perfil": perfil, "escenarios": escenarios_personal(perfil)}
+    return cache_consultas.obtener(("personal", h, normalizar_fecha(desde), normalizar_fecha(hasta)), cargar)
+
+def indice_factor(porcentaje):
+    return int(np.abs(FACTORES_WHATIF - (porcentaje or 100) / 100).argmin())
+
+@etapa("figuras")
+def figura_personal(perfil, escenarios, i_vol, i_aht):
+    base = indice_factor(100)
+    x = perfil["INTERVALO"]
+    fig = go.Figure()
+    fig.add_trace(go.Bar(
+        x=x, y=escenarios["agentes"][base, base], name="Base",
+        marker_color="#C4B5FD", texttemplate="%{y}", textposition="auto",
+    ))
+    # detalle del escenario en el hover (nivel de servicio, ASA, ocupación)
+    detalle = np.stack([
+        escenarios["nivel_servicio"][i_vol, i_aht],
+        escenarios["asa"][i_vol, i_aht],
+        escenarios["ocupacion"][i_vol, i_aht],
+    ], axis=-1)
+    fig.add_trace(go.Scatter(
+        x=x, y=escenarios["agentes"][i_vol, i_aht], name="Escenario",
+        mode="lines+markers", marker=dict(size=7, color="#6B46C1"), customdata=detalle,
+        hovertemplate="%{x}<br>Agentes: %{y}<br>Nivel de servicio: %{customdata[0]:.1%}"
+                      "<br>ASA: %{customdata[1]:.0f} s<br>Ocupación: %{customdata[2]:.0%}<extra></extra>",
+    ))
+    fig.update_layout(
+        title=f"Agentes requeridos por intervalo (Erlang C, {OBJETIVO_NIVEL:.0%} en {OBJETIVO_SEGUNDOS} s)",
+        yaxis_title="Agentes",
+        legend=dict(x=0.01, y=0.99),
+        plot_bgcolor="rgba(0,0,0,0)",
+        paper_bgcolor="rgba(0,0,0,0)",
+        margin=dict(t=60)
+    )
+    return fig
+
+def resumen_personal(escenarios, i_vol, i_aht):
+    base = indice_factor(100)
+    horas = escenarios["agentes"][i_vol, i_aht].sum() * MINUTOS_INTERVALO / 60
+    horas_base = escenarios["agentes"][base, base].sum() * MINUTOS_INTERVALO / 60
+    return [
+        html.Div(f"Pico: {int(escenarios['agentes'][i_vol, i_aht].max(initial=0))} agentes"),
+        html.Div(f"{horas:,.1f} horas-agente por día (base {horas_base:,.1f})"),
+    ]
 
-def grafica_pie_agentes():
-    df_ag = obtener_datos_agentes()
+@etapa("figuras")
+def grafica_pie_agentes(df_ag):
     if df_ag.empty:
         fig = go.Figure()
         fig.update_layout(title="Sin datos de agentes", paper_bgcolor='rgba(0,0,0,0)', plot_bgcolor='rgba(0,0,0,0)')
@@ -214,6 +797,136 @@ def grafica_pie_agentes():
 # DASH APP
 # --------------------------------------------------
 app = Dash(__name__, external_stylesheets=[dbc.themes.BOOTSTRAP])
+server = app.server  # punto de entrada WSGI para gunicorn
+
+@app.server.before_request
+def _iniciar_refrescador():
+    # arranca el hilo en cada worker ya bifurcado (no en el master de gunicorn)
+    refrescador.iniciar()
+    flask.g.inicio_peticion = time.perf_counter()
+
+@app.server.after_request
+def _medir_respuesta(respuesta):
+    # tiempo total y tamaño de cada respuesta de callback, por salida de Dash;
+    # la diferencia con etapa_segundos{etapa="callback"} es la serialización
+    if flask.request.path.endswith("_dash-update-component") and "inicio_peticion" in flask.g:
+        cuerpo = flask.request.get_json(silent=True) or {}
+        tamano = respuesta.calculate_content_length()
+        registrar_respuesta(
+            cuerpo.get("output", "desconocida"),
+            time.perf_counter() - flask.g.inicio_peticion,
+            tamano if tamano is not None else 0,
+        )
+    return respuesta
+
+@registro.recolector
+def _metricas_cache_y_pool():
+    cache = cache_consultas.estado()
+    pool = estado_pool()
+    return [
+        ("counter", "cache_consultas_total", cache["aciertos"], {"resultado": "acierto"}, "Consultas al cache compartido"),
+        ("counter", "cache_consultas_total", cache["fallos"], {"resultado": "fallo"}, "Consultas al cache compartido"),
+        ("counter", "cache_consultas_total", cache["coalescidas"], {"resultado": "coalescida"}, "Consultas al cache compartido"),
+        ("counter", "cache_expulsiones_total", cache["expulsiones"], {}, "Entradas expulsadas del cache"),
+        ("gauge", "cache_ratio_aciertos", cache["ratio_aciertos"], {}, "Aciertos (incluye coalescidas) / consultas"),
+        ("gauge", "cache_entradas", cache["entradas"], {}, "Entradas vigentes en el cache"),
+        ("gauge", "cache_bytes", cache["bytes"], {}, "Memoria aproximada del cache"),
+        ("counter", "pool_conexiones_nuevas_total", pool["conexiones_nuevas"], {}, "Conexiones ODBC abiertas"),
+        ("counter", "pool_timeouts_total", pool["timeouts"], {}, "Esperas del pool que vencieron"),
+        ("gauge", "pool_en_uso", pool["en_uso"], {}, "Conexiones prestadas"),
+        ("gauge", "pool_disponibles", pool["disponibles"], {}, "Conexiones libres en el pool"),
+        ("gauge", "pool_overflow", pool["overflow"], {}, "Conexiones por encima de pool_size"),
+        ("gauge", "eventos_conexiones", publicador.conexiones, {}, "Flujos SSE abiertos en este worker"),
+        ("counter", "cache_obsoletas_total", cache["obsoletas"], {}, "Valores vencidos servidos mientras se recargaban"),
+        ("gauge", "circuito_abierto", 0 if circuito.estado == "cerrado" else 1, {"circuito": circuito.nombre}, "1 si el circuito hacia la base no está cerrado"),
+    ]
+
+@app.server.route("/metrics")
+def metricas_prometheus():
+    return flask.Response(registro.exponer(), content_type="text/plain; version=0.0.4; charset=utf-8")
+
+@app.server.route("/eventos")
+def eventos():
+    # flujo SSE de versiones nuevas; 204 (desactivado) o 503 (tope de flujos del
+    # worker lleno) hacen que el navegador no reintente y se quede con el Interval
+    if not EVENTOS_HABILITADO:
+        return flask.Response(status=204)
+    if not publicador.reservar():
+        return flask.Response(status=503)
+    vista = flask.request.headers.get("Last-Event-ID")
+    vista = int(vista) if vista and vista.isdigit() else None
+    respuesta = flask.Response(
+        publicador.flujo(vista),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+    # al cerrar la respuesta, aunque el flujo no haya llegado a empezar
+    respuesta.call_on_close(publicador.liberar)
+    return respuesta
+
+# exportaciones en flujo: /exportar/intervalos.csv, /exportar/llamadas.parquet, ...
+# parámetros: desde, hasta, campana (repetible), agente (repetible), solo_trafico=1
+EXPORTACION_TIMEOUT_S = int(os.environ.get("EXPORTACION_TIMEOUT_S", "600"))
+
+def seguir_trozos(primero, lector):
+    # resto de la descarga ya en streaming: una falla a media exportación también
+    # cuenta para el circuito (la respuesta se corta, el 200 ya salió)
+    if primero is None:
+        return
+    yield primero
+    try:
+        yield from lector
+    except Exception as e:
+        registro.contar("consulta_errores_total", ayuda="Consultas SQL que fallaron", funcion="exportar")
+        circuito.falla(e)
+        raise
+
+@app.server.route("/exportar/<vista>.<formato>")
+def exportar(vista, formato):
+    if vista not in ("intervalos", "llamadas") or formato not in TIPOS_CONTENIDO:
+        flask.abort(404)
+    args = flask.request.args
+    try:
+        desde = normalizar_fecha(args.get("desde", FECHA_DESDE))
+        hasta = normalizar_fecha(args.get("hasta", FECHA_HASTA))
+    except ValueError:
+        flask.abort(400)
+    sel_campanas, sel_agentes = args.getlist("campana"), args.getlist("agente")
+
+    if vista == "intervalos":
+        # agregados ya calculados (snapshot, cache o cubo): un solo trozo pequeño
+        datos = datos_filtrados(desde, hasta, sel_campanas, sel_agentes)
+        if datos.get("sin_datos"):
+            return flask.Response(TEXTO_SIN_DATOS, status=503, mimetype="text/plain")
+        trozos = [preparar_trafico(datos["trafico"])]
+    else:
+        # el detalle siempre va a la base, con la misma contabilidad del circuito
+        # que leer_sql: el primer trozo se lee aquí para responder 503 si falla
+        query, params = consulta_detalle(desde, hasta, sel_campanas, sel_agentes, args.get("solo_trafico") == "1")
+        try:
+            circuito.permitir()
+        except CircuitoAbierto:
+            return flask.Response(TEXTO_SIN_DATOS, status=503, mimetype="text/plain", headers={"Retry-After": "30"})
+        try:
+            lector = leer_en_trozos(obtener_conexion(), query, params, timeout=EXPORTACION_TIMEOUT_S)
+            primero = next(lector, None)
+        except Exception as e:
+            registro.contar("consulta_errores_total", ayuda="Consultas SQL que fallaron", funcion="exportar")
+            circuito.falla(e)
+            if not es_falla_base(e):
+                raise
+            return flask.Response(TEXTO_SIN_DATOS, status=503, mimetype="text/plain", headers={"Retry-After": "30"})
+        circuito.exito()
+        trozos = (nombrar_detalle(trozo) for trozo in seguir_trozos(primero, lector))
+
+    return flask.Response(
+        flujo(trozos, formato, vista),
+        content_type=TIPOS_CONTENIDO[formato],
+        headers={
+            "Content-Disposition": f'attachment; filename="{vista}_{desde}_{hasta}.{formato}"',
+            "X-Accel-Buffering": "no",
+        },
+    )
 
 # CSS pastel animado y tarjetas; gráficas transparentes
 app.index_string = """
@@ -303,118 +1016,16 @@ app.index_string = """
 
 # estilos inline para layout de Dash
 bg = {"backgroundColor": "transparent", "padding": "6px", "minHeight": "100vh"}
-kpi_style = {
-    "padding":"12px",
-    "borderRadius":"12px",
-    "textAlign":"center",
-    "background":"white",
-    "boxShadow":"0 1px 6px rgba(2,6,23,0.04)",
-    "transition": "all 0.2s ease",
-    "minWidth": "120px"
-}
-
-# helpers colores (pasteles)
-def color_sla(p):
-    try:
-        p = float(p)
-    except:
-        p = 0
-    if p >= 80: return "#d1fae5"  # pastel green
-    elif p >= 70: return "#fff7ed"  # pastel yellow
-    else: return "#fee2e2"  # pastel red
-
-def color_abandono(p):
-    try:
-        p = float(p)
-    except:
-        p = 0
-    if p <= 5: return "#d1fae5"
-    elif p <= 9.9: return "#fff7ed"
-    else: return "#fee2e2"
-
-def color_atencion(p):
-    try:
-        p = float(p)
-    except:
-        p = 0
-    if p >= 90: return "#d1fae5"
-    elif p >= 80: return "#fff7ed"
-    else: return "#fee2e2"
-
-# --------------------------------------------------
-# LAYOUT
-# --------------------------------------------------
-app.layout = html.Div(id="main-container", style=bg, children=[
-
-    html.H1("Dashboard de Tráfico Mensual Especiales ATC", style={"textAlign":"center","color":"#4b3fbd","marginBottom":"6px"}),
-    html.Div(id="ultima_actualizacion", style={"textAlign":"center","fontStyle":"italic","marginBottom":"12px","color":"#475569"}),
-
-    # KPIs
-    dbc.Row(id="kpi_cards", className="mb-3", justify="around"),
-
-    # tabla + pastel pie
-    dbc.Row([
-        dbc.Col(
-            html.Div(
-                dash_table.DataTable(
-                    id="tabla_intervalos", columns=[], data=[], page_size=10,
-                    style_table={"overflowX":"auto"},
-                    style_cell={"textAlign":"center","padding":"6px"}
-                ), className="dash-table-container"
-            ), width=8),
-
-        dbc.Col(dcc.Graph(id="grafico_agentes", style={"height":"380px"}), width=4)
-    ], className="mb-3"),
-
-    # graficas principales
-    dbc.Row([
-        dbc.Col(dcc.Graph(id="grafico_intervalos", style={"height":"420px"}), width=6),
-        dbc.Col(dcc.Graph(id="grafico_campanas", style={"height":"420px"}), width=6)
-    ], className="mb-3"),
-
-    dcc.Interval(id="intervalo_refresco", interval=60*1000, n_intervals=0)
-])
 
 # --------------------------------------------------
-# CALLBACK (completo y funcional)
+# COMPONENTES (tarjetas, tabla y figuras)
 # --------------------------------------------------
-@app.callback(
-    [
-        Output("kpi_cards", "children"),
-        Output("tabla_intervalos", "columns"),
-        Output("tabla_intervalos", "data"),
-        Output("grafico_agentes", "figure"),
-        Output("grafico_intervalos", "figure"),
-        Output("grafico_campanas", "figure"),
-        Output("ultima_actualizacion", "children")
-    ],
-    [Input("intervalo_refresco", "n_intervals")]
-)
-def actualizar_dashboard(n):
-    # obtener datos
-    df = obtener_trafico()
-    df_camp = obtener_resumen_campanas()
-    fig_agentes = grafica_pie_agentes()
-
-    # si no hay datos, devolvemos placeholders
-    if df is None or df.empty:
-        empty_cols = []
-        empty_data = []
-        empty_fig = go.Figure()
-        empty_fig.update_layout(paper_bgcolor='rgba(0,0,0,0)', plot_bgcolor='rgba(0,0,0,0)')
-        kpis = [
-            dbc.Col(html.Div([html.Div("Recibidas", className="kpi-title"), html.Div("0", className="kpi-value")], style=kpi_style, className="kpi-card"), width="auto"),
-            dbc.Col(html.Div([html.Div("Contestadas", className="kpi-title"), html.Div("0", className="kpi-value")], style=kpi_style, className="kpi-card"), width="auto"),
-            dbc.Col(html.Div([html.Div("Abandonadas", className="kpi-title"), html.Div("0", className="kpi-value")], style={**kpi_style, "background": color_abandono(0)}, className="kpi-card"), width="auto"),
-            dbc.Col(html.Div([html.Div("% Abandono", className="kpi-title"), html.Div("0.00%", className="kpi-value")], style={**kpi_style, "background": color_abandono(0)}, className="kpi-card"), width="auto"),
-            dbc.Col(html.Div([html.Div("% Atención", className="kpi-title"), html.Div("0.00%", className="kpi-value")], style={**kpi_style, "background": color_atencion(0)}, className="kpi-card"), width="auto"),
-            dbc.Col(html.Div([html.Div("% SLA", className="kpi-title"), html.Div("0.00%", className="kpi-value")], style={**kpi_style, "background": color_sla(0)}, className="kpi-card"), width="auto"),
-            dbc.Col(html.Div([html.Div("ASA (s)", className="kpi-title"), html.Div("0", className="kpi-value")], style=kpi_style, className="kpi-card"), width="auto"),
-            dbc.Col(html.Div([html.Div("AHT (s)", className="kpi-title"), html.Div("0", className="kpi-value")], style=kpi_style, className="kpi-card"), width="auto"),
-        ]
-        return kpis, empty_cols, empty_data, empty_fig, empty_fig, empty_fig, f"Última actualización: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"
-
-    # Normaliza columnas numéricas
+@etapa("pandas")
+def preparar_trafico(trafico):
+    # copia con columnas numéricas normalizadas (no altera el snapshot/cache compartido)
+    if trafico is None:
+        trafico = vistas_vacias()["trafico"]
+    df = trafico.copy()
     for col in ["RECIBIDAS","CONTESTADAS","ABANDONADAS","ATENDIDAS_20S","ASA","AHT","PORC_ABA","PORC_SLA"]:
         if col in df.columns:
             df[col] = pd.to_numeric(df[col], errors="coerce").fillna(0)
@@ -423,69 +1034,96 @@ def actualizar_dashboard(n):
 
     df["ASA"] = df["ASA"].round(0)
     df["AHT"] = df["AHT"].round(0)
+    return df
 
-    total_rec = int(df["RECIBIDAS"].sum())
-    total_con = int(df["CONTESTADAS"].sum())
-    total_aba = int(df["ABANDONADAS"].sum())
-    total_20 = int(df["ATENDIDAS_20S"].sum())
-
-    porc_aba = (total_aba / total_rec) * 100 if total_rec > 0 else 0
-    porc_atencion = (total_con / total_rec) * 100 if total_rec > 0 else 0
-    porc_sla = (total_20 / total_con) * 100 if total_con > 0 else 0
+# orden del arreglo que viaja a la pestaña; assets/kpis.js arma las tarjetas,
+# los colores por umbral y el formato de cada valor
+CAMPOS_KPI = ["recibidas", "contestadas", "abandonadas", "porc_aba", "porc_atencion", "porc_sla", "asa", "aht"]
 
-    try:
-        if df["CONTESTADAS"].sum() > 0:
-            asa_prom = (df["ASA"] * df["CONTESTADAS"]).sum() / df["CONTESTADAS"].sum()
-            aht_prom = (df["AHT"] * df["CONTESTADAS"]).sum() / df["CONTESTADAS"].sum()
-        else:
-            asa_prom = 0
-            aht_prom = 0
-    except Exception:
-        asa_prom = 0
-        aht_prom = 0
-
-    asa_prom = round(asa_prom, 0)
-    aht_prom = round(aht_prom, 0)
-
-    # KPI cards
-    kpis = [
-        dbc.Col(html.Div([html.Div("Recibidas", className="kpi-title"), html.Div(f"{total_rec:,}", className="kpi-value")], style=kpi_style, className="kpi-card"), width="auto"),
-        dbc.Col(html.Div([html.Div("Contestadas", className="kpi-title"), html.Div(f"{total_con:,}", className="kpi-value")], style=kpi_style, className="kpi-card"), width="auto"),
-        dbc.Col(html.Div([html.Div("Abandonadas", className="kpi-title"), html.Div(f"{total_aba:,}", className="kpi-value")], style={**kpi_style, "background": color_abandono(porc_aba)}, className="kpi-card"), width="auto"),
-        dbc.Col(html.Div([html.Div("% Abandono", className="kpi-title"), html.Div(f"{porc_aba:.2f}%", className="kpi-value")], style={**kpi_style, "background": color_abandono(porc_aba)}, className="kpi-card"), width="auto"),
-        dbc.Col(html.Div([html.Div("% Atención", className="kpi-title"), html.Div(f"{porc_atencion:.2f}%", className="kpi-value")], style={**kpi_style, "background": color_atencion(porc_atencion)}, className="kpi-card"), width="auto"),
-        dbc.Col(html.Div([html.Div("% SLA", className="kpi-title"), html.Div(f"{porc_sla:.2f}%", className="kpi-value")], style={**kpi_style, "background": color_sla(porc_sla)}, className="kpi-card"), width="auto"),
-        dbc.Col(html.Div([html.Div("ASA (s)", className="kpi-title"), html.Div(f"{int(asa_prom):,}", className="kpi-value")], style=kpi_style, className="kpi-card"), width="auto"),
-        dbc.Col(html.Div([html.Div("AHT (s)", className="kpi-title"), html.Div(f"{int(aht_prom):,}", className="kpi-value")], style=kpi_style, className="kpi-card"), width="auto"),
-    ]
+@etapa("pandas")
+def resumen_kpis(t):
+    # totales como arreglo numérico compacto: porcentajes (0..100) con 2 decimales, el resto entero
+    return [round(float(t[c]), 2) if c.startswith("porc_") else int(t[c]) for c in CAMPOS_KPI]
 
-    # tabla
+@etapa("pandas")
+def preparar_tabla(df):
     df_tabla = df.copy()
     if "ASA" in df_tabla.columns:
         df_tabla["ASA"] = df_tabla["ASA"].astype(int)
     if "AHT" in df_tabla.columns:
         df_tabla["AHT"] = df_tabla["AHT"].astype(int)
+    return df_tabla
 
-    columnas_int = [{"name": c, "id": c} for c in df_tabla.columns]
-    datos_int = df_tabla.to_dict("records")
+# filtros de DataTable (filter_query) -> operaciones pandas
+OPERADORES_FILTRO = [
+    ["ge ", ">="], ["le ", "<="], ["lt ", "<"], ["gt ", ">"],
+    ["ne ", "!="], ["eq ", "="], ["contains "], ["datestartswith "],
+]
 
-    # parseo seguro para porcentajes (0..1)
-    def parse_pct_value(x):
-        try:
-            if x is None:
-                return 0.0
-            if isinstance(x, (int, float)):
-                return float(x)
-            s = str(x).strip()
-            if s.endswith("%"):
-                s = s.replace("%","")
-                return float(s)/100.0
-            return float(s)
-        except Exception:
-            return 0.0
-
-    porc_aba_list = [parse_pct_value(x) for x in df.get("PORC_ABA", [0]*len(df))]
-    porc_sla_list = [parse_pct_value(x) for x in df.get("PORC_SLA", [0]*len(df))]
+def separar_filtro(parte):
+    # (columna, operador, valor) con el valor como texto; el tipo lo decide la columna
+    for operadores in OPERADORES_FILTRO:
+        for operador in operadores:
+            if operador not in parte:
+                continue
+            nombre, valor = parte.split(operador, 1)
+            nombre = nombre[nombre.find("{") + 1: nombre.rfind("}")]
+            valor = valor.strip()
+            if valor and valor[0] == valor[-1] and valor[0] in ("'", '"', "`"):
+                valor = valor[1:-1].replace("\\" + valor[0], valor[0])
+            return nombre, operadores[0].strip(), valor
+    return None, None, None
+
+def filtrar_tabla(df, filter_query):
+    for parte in (filter_query or "").split(" && "):
+        columna, operador, valor = separar_filtro(parte)
+        if columna not in df.columns:
+            continue
+        serie = df[columna]
+        if operador in ("eq", "ne", "lt", "le", "gt", "ge"):
+            if pd.api.types.is_numeric_dtype(serie):
+                try:
+                    valor = float(valor)
+                except ValueError:
+                    continue  # texto contra columna numérica: la cláusula se ignora
+            try:
+                df = df.loc[getattr(serie, operador)(valor)]
+            except TypeError:
+                continue
+        elif operador == "contains":
+            df = df.loc[serie.astype(str).str.contains(valor, regex=False, na=False)]
+        elif operador == "datestartswith":
+            df = df.loc[serie.astype(str).str.startswith(valor, na=False)]
+    return df
+
+def ordenar_tabla(df, sort_by):
+    sort_by = [c for c in (sort_by or []) if c["column_id"] in df.columns]
+    if not sort_by:
+        return df
+    return df.sort_values(
+        [c["column_id"] for c in sort_by],
+        ascending=[c["direction"] == "asc" for c in sort_by],
+        kind="mergesort",
+    )
+
+def pagina_tabla(df, pagina, tamano):
+    inicio = pagina * tamano
+    return df.iloc[inicio: inicio + tamano].to_dict("records")
+
+def figura_vacia(titulo=None):
+    empty_fig = go.Figure()
+    empty_fig.update_layout(paper_bgcolor='rgba(0,0,0,0)', plot_bgcolor='rgba(0,0,0,0)')
+    if titulo:
+        empty_fig.update_layout(title=titulo, xaxis_visible=False, yaxis_visible=False)
+    return empty_fig
+
+TEXTO_SIN_DATOS = "Sin datos: la base de datos no responde"
+
+@etapa("figuras")
+def figura_intervalos(df):
+    # porcentajes como fracción (0..1), vectorizado
+    porc_aba_list = a_fraccion(df["PORC_ABA"]).tolist()
+    porc_sla_list = a_fraccion(df["PORC_SLA"]).tolist()
 
     # gráficos intervalos (transparentes)
     x_inter = df["INTERVALO"] if "INTERVALO" in df.columns else list(range(len(df)))
@@ -496,20 +1134,20 @@ def actualizar_dashboard(n):
     fig_int.add_trace(go.Bar(
         x=x_inter, y=y_cont,
         name="Contestadas",
-        text=y_cont, textposition="auto",
+        texttemplate="%{y}", textposition="auto",
         marker_color="#6B46C1"
     ))
     fig_int.add_trace(go.Bar(
         x=x_inter, y=y_aban,
         name="Abandonadas",
-        text=y_aban, textposition="auto",
+        texttemplate="%{y}", textposition="auto",
         marker_color="#FB7185"
     ))
     fig_int.add_trace(go.Scatter(
         x=x_inter, y=porc_aba_list,
         name="% Abandono",
         mode="lines+markers+text",
-        text=[f"{v*100:.1f}%" for v in porc_aba_list],
+        texttemplate="%{y:.1%}",  # etiqueta formateada por plotly.js, no en el servidor
         textposition="top center",
         marker=dict(size=7),
         yaxis="y2"
@@ -518,7 +1156,7 @@ def actualizar_dashboard(n):
         x=x_inter, y=porc_sla_list,
         name="% SLA",
         mode="lines+markers+text",
-        text=[f"{v*100:.1f}%" for v in porc_sla_list],
+        texttemplate="%{y:.1%}",
         textposition="top center",
         marker=dict(size=7),
         yaxis="y2"
@@ -534,7 +1172,43 @@ def actualizar_dashboard(n):
         paper_bgcolor="rgba(0,0,0,0)",
         margin=dict(t=60)
     )
+    return fig_int
+
+@etapa("figuras")
+def figura_serie(df, objetivo, rango=None, revision="serie"):
+    # serie de tiempo reducida a ~objetivo puntos por traza (sin etiquetas por punto);
+    # conteos con min-max (conserva picos), porcentajes con LTTB
+    df = ventana(df, "CUBETA", rango)
+    fig = go.Figure()
+    trazas = [
+        ("Contestadas", "CONTESTADAS", "min_max", "y", "#6B46C1", "%{y:,.0f}"),
+        ("Abandonadas", "ABANDONADAS", "min_max", "y", "#FB7185", "%{y:,.0f}"),
+        ("% Abandono", "PORC_ABA", "lttb", "y2", None, "%{y:.1%}"),
+        ("% SLA", "PORC_SLA", "lttb", "y2", None, "%{y:.1%}"),
+    ]
+    for nombre, columna, metodo, eje, color, formato in trazas:
+        valores = a_fraccion(df[columna]) if eje == "y2" else df[columna]
+        x, y = reducir(df["CUBETA"], valores, objetivo, metodo)
+        fig.add_trace(go.Scatter(
+            x=x, y=y, name=nombre, mode="lines", yaxis=eje,
+            line=dict(color=color) if color else None,
+            hovertemplate=f"%{{x}}<br>{nombre}: {formato}<extra></extra>",
+        ))
+
+    fig.update_layout(
+        title=f"Tráfico y KPIs en el tiempo ({len(df):,} cubetas, {objetivo} puntos máx. por traza)",
+        yaxis_title="Cantidad de llamadas",
+        yaxis2=dict(title="Porcentaje", overlaying="y", side="right", tickformat=".0%"),
+        legend=dict(x=0.01, y=0.99),
+        uirevision=revision,  # conserva el zoom al recibir la ventana en resolución completa
+        plot_bgcolor="rgba(0,0,0,0)",
+        paper_bgcolor="rgba(0,0,0,0)",
+        margin=dict(t=60)
+    )
+    return fig
 
+@etapa("figuras")
+def figura_campanas(df_camp):
     # gráfica campañas (transparent)
     if not df_camp.empty:
         df_camp_sorted = df_camp.sort_values("INTERACCIONES", ascending=True)
@@ -542,7 +1216,7 @@ def actualizar_dashboard(n):
             x=df_camp_sorted["INTERACCIONES"],
             y=df_camp_sorted["CAMPANA"],
             orientation="h",
-            text=df_camp_sorted["INTERACCIONES"],
+            texttemplate="%{x}",
             textposition="outside",
             marker_color="#A78BFA"
         ))
@@ -554,10 +1228,477 @@ def actualizar_dashboard(n):
     else:
         fig_camp = go.Figure()
         fig_camp.update_layout(title="Sin datos de campaña", plot_bgcolor="rgba(0,0,0,0)", paper_bgcolor="rgba(0,0,0,0)")
+    return fig_camp
+
+# --------------------------------------------------
+# LAYOUT
+# --------------------------------------------------
+app.layout = html.Div(id="main-container", style=bg, children=[
+
+    html.H1("Dashboard de Tráfico Mensual Especiales ATC", style={"textAlign":"center","color":"#4b3fbd","marginBottom":"6px"}),
+    html.Div(id="ultima_actualizacion", style={"textAlign":"center","fontStyle":"italic","marginBottom":"12px","color":"#475569"}),
+
+    # rango de fechas consultado
+    html.Div(
+        dcc.DatePickerRange(
+            id="rango_fechas",
+            start_date=normalizar_fecha(FECHA_DESDE),
+            end_date=normalizar_fecha(FECHA_HASTA),
+            display_format="YYYY-MM-DD",
+            first_day_of_week=1,
+        ), style={"textAlign":"center","marginBottom":"12px"}
+    ),
+
+    # filtros por campaña y agente (se resuelven con el cubo en memoria)
+    dbc.Row([
+        dbc.Col(dcc.Dropdown(id="filtro_campanas", multi=True, placeholder="Todas las campañas"), width=4),
+        dbc.Col(dcc.Dropdown(id="filtro_agentes", multi=True, placeholder="Todos los agentes"), width=4),
+    ], className="mb-3", justify="center"),
+
+    # KPIs
+    dbc.Row(id="kpi_cards", className="mb-3", justify="around"),
+
+    # tabla + pastel pie
+    dbc.Row([
+        dbc.Col(
+            html.Div(
+                [
+                    # paginado, orden y filtro del lado del servidor: solo viaja la página visible
+                    dash_table.DataTable(
+                        id="tabla_intervalos",
+                        columns=[
+                            {"name": c, "id": c, "type": "text" if c == "INTERVALO" else "numeric"}
+                            for c in COLUMNAS_TRAFICO
+                        ],
+                        data=[], page_size=10, page_current=0, page_count=0,
+                        page_action="custom", sort_action="custom", sort_mode="multi",
+                        filter_action="custom", filter_query="", sort_by=[],
+                        style_table={"overflowX":"auto"},
+                        style_cell={"textAlign":"center","padding":"6px"}
+                    ),
+                    html.Div(id="tabla_total", style={"textAlign":"right","fontSize":"0.8rem","color":"#475569"}),
+                    html.Div(id="enlaces_exportacion", style={"textAlign":"right","fontSize":"0.8rem"}),
+                ], className="dash-table-container"
+            ), width=8),
+
+        dbc.Col(dcc.Graph(id="grafico_agentes", style={"height":"380px"}), width=4)
+    ], className="mb-3"),
+
+    # graficas principales
+    dbc.Row([
+        dbc.Col([
+            # perfil por INTERVALO o serie de tiempo fina reducida al ancho de la gráfica
+            dcc.RadioItems(
+                id="cubeta_intervalos",
+                options=[{"label": "Perfil por intervalo", "value": "intervalo"}] + [
+                    {"label": f"{m} min" if m < 1440 else "Día", "value": str(m)} for m in CUBETAS_MINUTOS
+                ],
+                value="intervalo", inline=True,
+                inputStyle={"marginRight":"4px"}, labelStyle={"marginRight":"12px","fontSize":"0.8rem"},
+            ),
+            dcc.Graph(id="grafico_intervalos", style={"height":"420px"}),
+        ], width=6),
+        dbc.Col(dcc.Graph(id="grafico_campanas", style={"height":"420px"}), width=6)
+    ], className="mb-3"),
+
+    # dimensionamiento Erlang C con escenarios what-if de volumen y AHT
+    dbc.Row([
+        dbc.Col([
+            html.Div("Volumen (%)", className="kpi-title"),
+            dcc.Slider(id="whatif_volumen", min=50, max=200, step=5, value=100, updatemode="drag",
+                       marks={v: f"{v}%" for v in (50, 100, 150, 200)}),
+            html.Div("AHT (%)", className="kpi-title"),
+            dcc.Slider(id="whatif_aht", min=50, max=200, step=5, value=100, updatemode="drag",
+                       marks={v: f"{v}%" for v in (50, 100, 150, 200)}),
+            html.Div(id="resumen_personal", style={"fontSize":"0.9rem","color":"#334155","marginTop":"12px"}),
+        ], width=3),
+        dbc.Col(dcc.Graph(id="grafico_personal", style={"height":"420px"}), width=9),
+    ], className="mb-3"),
+
+    # huellas de lo último enviado a cada componente (por pestaña)
+    dcc.Store(id="datos_kpis"),  # totales compactos; assets/kpis.js dibuja las tarjetas
+    dcc.Store(id="huella_kpis"),
+    dcc.Store(id="huella_tabla"),
+    dcc.Store(id="huella_agentes"),
+    dcc.Store(id="huella_intervalos"),
+    dcc.Store(id="huella_campanas"),
+    dcc.Store(id="huella_personal"),
+    dcc.Store(id="ancho_intervalos"),
+
+    # sondeo de respaldo; assets/eventos.js lo apaga mientras el flujo SSE cubre la vista
+    dcc.Interval(id="intervalo_refresco", interval=60*1000, n_intervals=0)
+])
+
+# --------------------------------------------------
+# CALLBACKS (uno por componente, solo envían lo que cambió)
+# --------------------------------------------------
+ENTRADAS_REFRESCO = [
+    Input("intervalo_refresco", "n_intervals"),
+    Input("rango_fechas", "start_date"),
+    Input("rango_fechas", "end_date"),
+    Input("filtro_campanas", "value"),
+    Input("filtro_agentes", "value"),
+]
+
+def huella(*dfs):
+    # resumen estable del contenido de uno o más DataFrames
+    h = hashlib.blake2b(digest_size=16)
+    for df in dfs:
+        if df is None:
+            h.update(b"-")
+            continue
+        h.update(repr(list(df.columns)).encode("utf-8"))
+        h.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return h.hexdigest()
+
+def disparador():
+    # id del Input que disparó el callback; None fuera de una petición de Dash (benchmark).
+    # En hilos sin el contexto de Dash la variable de contexto no existe: LookupError
+    try:
+        return ctx.triggered_id
+    except (MissingCallbackContextException, LookupError):
+        return None
+
+
+def _datos(desde, hasta, sel_campanas=None, sel_agentes=None):
+    return datos_filtrados(desde or FECHA_DESDE, hasta or FECHA_HASTA, sel_campanas, sel_agentes)
+
+def huella_vista(datos, vista):
+    # "sin datos" no comparte huella con una vista vacía de verdad
+    return "sin_datos" if datos.get("sin_datos") else huella(datos[vista])
+
+@app.callback(
+    Output("filtro_campanas", "options"),
+    Output("filtro_agentes", "options"),
+    *ENTRADAS_REFRESCO[:3],
+)
+@etapa("callback")
+def actualizar_opciones_filtros(n, desde, hasta):
+    # opciones desde las vistas sin filtrar, que ya están en memoria
+    datos = _datos(desde, hasta)
+    opciones_campanas = sorted(datos["campanas"]["CAMPANA"].dropna().astype(str).unique())
+    opciones_agentes = sorted(datos["agentes"]["NOMBRE"].dropna().astype(str).unique())
+    return opciones_campanas, opciones_agentes
+
+app.clientside_callback(
+    ClientsideFunction(namespace="especiales", function_name="tarjetas_kpi"),
+    Output("kpi_cards", "children"),
+    Input("datos_kpis", "data"),
+)
+
+# el flujo SSE solo avisa del rango del refrescador sin filtros: fuera de eso la
+# pestaña sigue sondeando (assets/eventos.js)
+app.clientside_callback(
+    ClientsideFunction(namespace="especiales", function_name="vista_eventos"),
+    Output("intervalo_refresco", "disabled"),
+    *ENTRADAS_REFRESCO[1:],
+)
+
+@app.callback(
+    Output("datos_kpis", "data"),
+    Output("huella_kpis", "data"),
+    *ENTRADAS_REFRESCO,
+    State("huella_kpis", "data"),
+)
+@etapa("callback")
+def actualizar_kpis(n, desde, hasta, sel_campanas, sel_agentes, huella_previa):
+    datos = _datos(desde, hasta, sel_campanas, sel_agentes)
+    h = huella_vista(datos, "trafico")
+    if h == huella_previa:
+        return no_update, no_update
+    if datos.get("sin_datos"):
+        return TEXTO_SIN_DATOS, h
+    return resumen_kpis(totales(preparar_trafico(datos["trafico"]))), h
+
+def tabla_cacheada(trafico, h):
+    # tabla ya preparada, compartida por todas las páginas/pestañas con los mismos datos
+    return cache_consultas.obtener(("tabla", h), lambda: preparar_tabla(preparar_trafico(trafico)))
+
+@app.callback(
+    Output("tabla_intervalos", "data"),
+    Output("tabla_intervalos", "page_count"),
+    Output("tabla_intervalos", "page_current"),
+    Output("tabla_total", "children"),
+    Output("huella_tabla", "data"),
+    *ENTRADAS_REFRESCO,
+    Input("tabla_intervalos", "page_current"),
+    Input("tabla_intervalos", "page_size"),
+    Input("tabla_intervalos", "sort_by"),
+    Input("tabla_intervalos", "filter_query"),
+    State("huella_tabla", "data"),
+)
+@etapa("callback")
+def actualizar_tabla(n, desde, hasta, sel_campanas, sel_agentes, pagina, tamano, sort_by, filter_query, huella_previa):
+    datos = _datos(desde, hasta, sel_campanas, sel_agentes)
+    trafico = datos["trafico"]
+    pagina, tamano = pagina or 0, tamano or 10
+    h = huella_vista(datos, "trafico") + repr((pagina, tamano, sort_by, filter_query))
+    if h == huella_previa:
+        return no_update, no_update, no_update, no_update, no_update
+    if datos.get("sin_datos"):
+        return [], 0, 0, TEXTO_SIN_DATOS, h
+    if trafico is None or trafico.empty:
+        return [], 0, 0, "0 intervalos", h
 
-    actualizacion = f"Última actualización: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"
+    df = ordenar_tabla(filtrar_tabla(tabla_cacheada(trafico, huella(trafico)), filter_query), sort_by)
+    total = len(df)
+    paginas = max(1, -(-total // tamano))
+    # un filtro que achica el resultado deja la página fuera de rango: el paginador
+    # vuelve a la última página que existe
+    visible = min(pagina, paginas - 1)
+    return (
+        pagina_tabla(df, visible, tamano), paginas, visible if visible != pagina else no_update,
+        f"{total:,} intervalos", h,
+    )
+
+@app.callback(
+    Output("enlaces_exportacion", "children"),
+    *ENTRADAS_REFRESCO[1:],
+)
+def actualizar_enlaces(desde, hasta, sel_campanas, sel_agentes):
+    # descargas con el mismo rango y filtros que se ven en pantalla
+    consulta = urllib.parse.urlencode(
+        {"desde": desde or FECHA_DESDE, "hasta": hasta or FECHA_HASTA,
+         "campana": sel_campanas or [], "agente": sel_agentes or []},
+        doseq=True,
+    )
+    enlaces = ["Descargar: "]
+    for vista, texto in (("intervalos", "intervalos"), ("llamadas", "detalle de llamadas")):
+        for formato in ("csv", "parquet"):
+            enlaces += [html.A(f"{texto} ({formato.upper()})", href=f"/exportar/{vista}.{formato}?{consulta}"), " · "]
+    return enlaces[:-1]
+
+@app.callback(
+    Output("grafico_agentes", "figure"),
+    Output("huella_agentes", "data"),
+    *ENTRADAS_REFRESCO,
+    State("huella_agentes", "data"),
+)
+@etapa("callback")
+def actualizar_agentes(n, desde, hasta, sel_campanas, sel_agentes, huella_previa):
+    datos = _datos(desde, hasta, sel_campanas, sel_agentes)
+    h = huella_vista(datos, "agentes")
+    if h == huella_previa:
+        return no_update, no_update
+    if datos.get("sin_datos"):
+        return figura_vacia(TEXTO_SIN_DATOS), h
+    return grafica_pie_agentes(df_ag=datos["agentes"]), h
+
+@app.callback(
+    Output("grafico_campanas", "figure"),
+    Output("huella_campanas", "data"),
+    *ENTRADAS_REFRESCO,
+    State("huella_campanas", "data"),
+)
+@etapa("callback")
+def actualizar_campanas(n, desde, hasta, sel_campanas, sel_agentes, huella_previa):
+    datos = _datos(desde, hasta, sel_campanas, sel_agentes)
+    h = huella_vista(datos, "campanas")
+    if h == huella_previa:
+        return no_update, no_update
+    if datos.get("sin_datos"):
+        return figura_vacia(TEXTO_SIN_DATOS), h
+    return figura_campanas(datos["campanas"]), h
+
+@app.callback(
+    Output("grafico_personal", "figure"),
+    Output("resumen_personal", "children"),
+    Output("huella_personal", "data"),
+    *ENTRADAS_REFRESCO,
+    Input("whatif_volumen", "value"),
+    Input("whatif_aht", "value"),
+    State("huella_personal", "data"),
+)
+@etapa("callback")
+def actualizar_personal(n, desde, hasta, sel_campanas, sel_agentes, volumen, aht, huella_previa):
+    datos = _datos(desde, hasta, sel_campanas, sel_agentes)
+    h_datos = huella_vista(datos, "trafico")
+    i_vol, i_aht = indice_factor(volumen), indice_factor(aht)
+    h = f"{h_datos}:{i_vol}:{i_aht}"
+    if h == huella_previa:
+        return no_update, no_update, no_update
+    if datos.get("sin_datos"):
+        return figura_vacia(TEXTO_SIN_DATOS), TEXTO_SIN_DATOS, h
+    if datos["trafico"] is None or datos["trafico"].empty:
+        return figura_vacia("Sin tráfico para dimensionar"), "", h
+
+    entrada = escenarios_cacheados(datos["trafico"], desde or FECHA_DESDE, hasta or FECHA_HASTA, h_datos)
+    escenarios = entrada["escenarios"]
+    return figura_personal(entrada["perfil"], escenarios, i_vol, i_aht), resumen_personal(escenarios, i_vol, i_aht), h
+
+def series_intervalos(df):
+    # lo que se grafica por traza (mismo orden que figura_intervalos)
+    return {
+        "x": df["INTERVALO"].astype(str).tolist(),
+        "y": [
+            df["CONTESTADAS"].tolist(),
+            df["ABANDONADAS"].tolist(),
+            a_fraccion(df["PORC_ABA"]).tolist(),
+            a_fraccion(df["PORC_SLA"]).tolist(),
+        ],
+    }
+
+def parche_intervalos(anterior, nuevo):
+    # Patch con solo los puntos modificados o agregados al final (las etiquetas
+    # salen de texttemplate); None si el eje x cambió y hay que mandar la figura completa
+    xa, xn = anterior["x"], nuevo["x"]
+    if len(xn) < len(xa) or xn[:len(xa)] != xa or len(anterior["y"]) != len(nuevo["y"]):
+        return None
+
+    parche = Patch()
+    for traza, (ya, yn) in enumerate(zip(anterior["y"], nuevo["y"])):
+        for j in range(len(xa)):
+            if ya[j] != yn[j]:
+                parche["data"][traza]["y"][j] = yn[j]
+        for j in range(len(xa), len(xn)):
+            parche["data"][traza]["x"].append(xn[j])
+            parche["data"][traza]["y"].append(yn[j])
+    return parche
+
+app.clientside_callback(
+    ClientsideFunction(namespace="especiales", function_name="ancho_grafica"),
+    Output("ancho_intervalos", "data"),
+    Input("grafico_intervalos", "figure"),
+    State("grafico_intervalos", "id"),
+)
+
+@app.callback(
+    Output("grafico_intervalos", "figure"),
+    Output("huella_intervalos", "data"),
+    *ENTRADAS_REFRESCO,
+    Input("cubeta_intervalos", "value"),
+    Input("grafico_intervalos", "relayoutData"),
+    Input("ancho_intervalos", "data"),
+    State("huella_intervalos", "data"),
+)
+@etapa("callback")
+def actualizar_intervalos(n, desde, hasta, sel_campanas, sel_agentes, cubeta="intervalo", relayout=None, ancho=None, huella_previa=None):
+    if cubeta and cubeta != "intervalo":
+        return _serie_intervalos(desde, hasta, sel_campanas, sel_agentes, int(cubeta), relayout, ancho, huella_previa)
+
+    if disparador() in ("grafico_intervalos", "ancho_intervalos"):
+        # zoom y ancho solo importan a la serie de tiempo
+        return no_update, no_update
+    datos = _datos(desde, hasta, sel_campanas, sel_agentes)
+    trafico = datos["trafico"]
+    h = huella_vista(datos, "trafico")
+    if h == huella_previa:
+        return no_update, no_update
+    if datos.get("sin_datos"):
+        return figura_vacia(TEXTO_SIN_DATOS), h
+    if trafico is None or trafico.empty:
+        return figura_vacia(), h
+
+    # las series enviadas quedan en el cache del servidor bajo su huella; la
+    # pestaña solo guarda la huella y recibe un Patch con las diferencias
+    df = preparar_trafico(trafico)
+    series = series_intervalos(df)
+    cache_consultas.guardar(("series_intervalos", h), series, ttl=10 * SNAPSHOT_INTERVALO)
+    previas = cache_consultas.consultar(("series_intervalos", huella_previa)) if huella_previa else None
+    parche = parche_intervalos(previas, series) if previas is not None else None
+    return (parche if parche is not None else figura_intervalos(df)), h
+
+def _serie_intervalos(desde, hasta, sel_campanas, sel_agentes, minutos, relayout, ancho, huella_previa):
+    # serie fina: al navegador van ~1 punto por pixel; con zoom se reduce solo la
+    # ventana visible, que llega a resolución completa cuando cabe en el ancho
+    if disparador() == "grafico_intervalos" and not (
+        rango_zoom(relayout) or (relayout or {}).get("xaxis.autorange")
+    ):
+        return no_update, no_update  # relayout sin cambio de eje x (leyenda, hover, tamaño)
+    # el zoom vigente se conserva en los refrescos; otro rango de fechas o cubeta lo reinicia
+    rango = None if disparador() in ("rango_fechas", "cubeta_intervalos") else rango_zoom(relayout)
+
+    try:
+        serie = serie_cacheada(desde or FECHA_DESDE, hasta or FECHA_HASTA, minutos, sel_campanas, sel_agentes)
+    except Exception as e:
+        if not isinstance(e, CircuitoAbierto):
+            registrar_error("serie_intervalos", e)
+        return (no_update, no_update) if huella_previa == "sin_datos" else (figura_vacia(TEXTO_SIN_DATOS), "sin_datos")
+    objetivo = objetivo_puntos(ancho)
+    h = huella(serie) + f":{minutos}:{objetivo}:{rango}"
+    if h == huella_previa:
+        return no_update, no_update
+    if serie.empty:
+        return figura_vacia(), h
+    return figura_serie(serie, objetivo, rango, revision=f"{desde}|{hasta}|{minutos}"), h
+
+@app.callback(
+    Output("ultima_actualizacion", "children"),
+    *ENTRADAS_REFRESCO,
+    State("ultima_actualizacion", "children"),
+)
+@etapa("callback")
+def actualizar_fecha(n, desde, hasta, sel_campanas, sel_agentes, actual):
+    # antigüedad visible: con la base caída se sigue mostrando el último dato bueno
+    datos = _datos(desde, hasta, sel_campanas, sel_agentes)
+    actualizacion = texto_actualizacion(datos.get("generado"), circuito.disponible())
+    return no_update if actualizacion == actual else actualizacion
 
-    return kpis, columnas_int, datos_int, fig_agentes, fig_int, fig_camp, actualizacion
+def texto_actualizacion(generado, base_disponible=True, ahora=None):
+    if generado is None:
+        return TEXTO_SIN_DATOS
+    minutos = int(((ahora or datetime.now()) - generado).total_seconds() // 60)
+    edad = "hace menos de 1 min" if minutos < 1 else f"hace {minutos} min"
+    texto = f"Datos al {generado.strftime('%Y-%m-%d %H:%M:%S')} ({edad})"
+    if not base_disponible:
+        texto += " · base de datos no disponible, se muestra el último dato bueno"
+    elif minutos * 60 > SNAPSHOT_VIGENCIA:
+        texto += " · datos desfasados"
+    return texto
+
+# --------------------------------------------------
+# ARRANQUE EN FRÍO (PRECARGA Y CALENTAMIENTO)
+# --------------------------------------------------
+# Con preload_app (gunicorn.conf.py) los imports y la precarga se pagan una vez
+# en el master y los workers los heredan por fork; cada worker se calienta
+# antes de aceptar tráfico, así el primer visitante no paga consultas ni figuras.
+CALENTAMIENTO_HABILITADO = os.environ.get("CALENTAMIENTO_HABILITADO", "1") not in ("0", "false", "False", "")
+
+registrar_arranque("importacion", time.perf_counter() - _INICIO_IMPORTACION)
+
+def precargar():
+    # sin base de datos (se ejecuta en el master, antes del fork): figuras vacías
+    # de cada tipo para cargar los validadores de plotly y la serialización
+    inicio = time.perf_counter()
+    vacias = vistas_vacias()
+    try:
+        figura_vacia()
+        figura_intervalos(preparar_trafico(vacias["trafico"]))
+        figura_campanas(vacias["campanas"])
+        grafica_pie_agentes(df_ag=vacias["agentes"])
+        resumen_kpis(totales(preparar_trafico(vacias["trafico"])))
+        app.layout.to_plotly_json()
+    except Exception as e:
+        registrar_error("precargar", e)
+    registrar_arranque("precarga", time.perf_counter() - inicio)
+
+def calentar(desde=FECHA_DESDE, hasta=FECHA_HASTA):
+    # en cada worker, antes de aceptar tráfico: hilos de fondo, catálogos y lo
+    # que pide una pestaña nueva con el rango por defecto (vistas, tabla, figuras, cubo).
+    # Un paso que falla se registra y el worker arranca igual
+    inicio = time.perf_counter()
+    refrescador.iniciar()
+    if EVENTOS_HABILITADO:
+        publicador.iniciar()
+    if not CALENTAMIENTO_HABILITADO:
+        return
+    pasos = [
+        ("dimensiones", lambda: (campanas.catalogo(), agentes.catalogo())),
+        ("filtros", lambda: actualizar_opciones_filtros(0, desde, hasta)),
+        ("kpis", lambda: actualizar_kpis(0, desde, hasta, None, None, None)),
+        ("tabla", lambda: actualizar_tabla(0, desde, hasta, None, None, 0, 10, [], "", None)),
+        ("agentes", lambda: actualizar_agentes(0, desde, hasta, None, None, None)),
+        ("intervalos", lambda: actualizar_intervalos(0, desde, hasta, None, None, "intervalo", None, None, None)),
+        ("campanas", lambda: actualizar_campanas(0, desde, hasta, None, None, None)),
+        ("personal", lambda: actualizar_personal(0, desde, hasta, None, None, 100, 100, None)),
+        ("cubo", lambda: cubo_cacheado(desde, hasta)),
+    ]
+    for nombre, paso in pasos:
+        try:
+            paso()
+        except Exception as e:
+            registrar_error(f"calentar_{nombre}", e)
+    registrar_arranque("calentamiento", time.perf_counter() - inicio)
 
 # --------------------------------------------------
 # EJECUTAR
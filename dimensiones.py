@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+# dimensiones.py
+# Catálogos de campañas (DNIS -> campaña) y agentes (ID de conexión -> nombre),
+# cargados una vez desde un JSON de configuración, una tabla de la base o los
+# valores por defecto, y recargados por TTL. SQL agrupa solo por los códigos
+# crudos; los nombres se ponen después de agregar, con un mapeo vectorizado
+# sobre las categorías (pocas) y no sobre cada fila.
+
+import json
+import os
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from metricas import registrar_error
+
+RUTA_DIMENSIONES = os.environ.get("DIMENSIONES_JSON", "")
+DIMENSIONES_TTL = float(os.environ.get("DIMENSIONES_TTL", "600"))
+
+# tablas opcionales en la base: dos columnas, código y nombre
+TABLA_CAMPANAS = os.environ.get("DIMENSIONES_TABLA_CAMPANAS", "")
+TABLA_AGENTES = os.environ.get("DIMENSIONES_TABLA_AGENTES", "")
+
+# valores por defecto (los que estaban en el código)
+CAMPANAS_DNIS = {
+    "5550059224": "HERDEZ FOOD IVR",
+    "5550059285": "HERDEZ CORPORATIVO",
+    "5550059213": "HERDEZ CONFIANZA",
+    "5547372149": "CRUZ AZUL",
+    "5550059273": "CONFIANZA LIBERTAD",
+    "5550059281": "HOY COBRO",
+    "524427463582": "LIBERTAD REVOLVENTE 360",
+    "5542112905": "EGLOBAL",
+    "524429198123": "LIBERTAD",
+    "4429198246": "LIBERTAD ATC",
+    "524427463439": "LIBERTAD INVERSION",
+}
+
+CATALOGO_AGENTES = {
+    "ID_CONEXION": [4245,6873,10009,11757,11810,11914,12584,12620,14264,14494,15339,16834,16939,17852,50604,80102,90088],
+    "NOMBRE": [
+        "DOMINGUEZ GONZALEZ AMELLALY ANDREA",
+        "MARIN PEÑARANDA KELLY YUREINNY",
+        "ALCALA BARRERA ELIZABETH",
+        "FUENTES OSNAYA MAGALY JOCELINE",
+        "MIRANDA SANTIAGO NORMA ANGELICA",
+        "GALICIA GARCIA KARLA CLAUDIA",
+        "CARRASCO JUAN ALEYDA MONSERRAT",
+        "CASTILLO GARCIA LIZBETH",
+        "AVILES MARTINEZ LETICIA",
+        "CADENA RUIZ ESPARZA MARIA DE LOURDES",
+        "LOPEZ MALAGON MITZI AMARILLIS",
+        "TRUJILLO LUNA OSCAR",
+        "RUIZ ZAVALA JESSICA MARGARITA",
+        "BERDEJO FLORES PATRICIA",
+        "MENDEZ DE LA LUZ MARIA FERNANDA",
+        "AGUIRRE NAVA KENIA ANGELICA",
+        "TROVAMALA VILLAVICENCIO ISABEL"
+    ]
+}
+
+
+def codigos_texto(serie):
+    # códigos como texto comparable: 4245, 4245.0 y "4245" son el mismo agente
+    texto = pd.Series(serie, copy=False).astype("string").str.strip()
+    return texto.str.replace(r"\.0+$", "", regex=True)
+
+
+def _catalogo_tabla(leer_sql, tabla):
+    df = leer_sql(f"SELECT * FROM {tabla}", nombre=f"dimension_{tabla}")
+    return dict(zip(df.iloc[:, 0], df.iloc[:, 1]))
+
+
+def origen_catalogo(clave, por_defecto, tabla="", leer_sql=None, ruta=RUTA_DIMENSIONES):
+    # JSON de configuración si trae la clave, si no la tabla de la base, si no los valores por defecto
+    def cargar():
+        if ruta and os.path.exists(ruta):
+            with open(ruta, encoding="utf-8") as f:
+                datos = json.load(f)
+            if clave in datos:
+                return datos[clave]
+        if tabla and leer_sql is not None:
+            return _catalogo_tabla(leer_sql, tabla)
+        return por_defecto
+    return cargar
+
+
+class Dimension:
+    # cargar() -> dict código -> nombre
+    def __init__(self, nombre, cargar, ttl=DIMENSIONES_TTL):
+        self.nombre = nombre
+        self.cargar = cargar
+        self.ttl = ttl
+        self._catalogo = None
+        self._expira = 0.0
+        self._lock = threading.Lock()
+
+    def catalogo(self):
+        if self._catalogo is not None and time.monotonic() < self._expira:
+            return self._catalogo
+        with self._lock:
+            if self._catalogo is None or time.monotonic() >= self._expira:
+                try:
+                    datos = self.cargar()
+                    catalogo = pd.Series(list(datos.values()), index=codigos_texto(list(datos.keys())), dtype="object")
+                    self._catalogo = catalogo[~catalogo.index.duplicated(keep="last")]
+                except Exception as e:
+                    # se conserva el último catálogo bueno; vacío si nunca cargó
+                    registrar_error(f"dimension_{self.nombre}", e)
+                    if self._catalogo is None:
+                        self._catalogo = pd.Series(dtype="object")
+                self._expira = time.monotonic() + self.ttl
+        return self._catalogo
+
+    def mapear(self, codigos, defecto=None):
+        # nombres para una columna de códigos; sin nombre -> defecto (o el propio código)
+        codigos = codigos_texto(codigos)
+        categorias = codigos.astype("category")
+        nombres = categorias.cat.categories.to_series().map(self.catalogo()).to_numpy(dtype="object")
+        posiciones = categorias.cat.codes.to_numpy()
+        valores = np.where(posiciones >= 0, nombres[posiciones] if len(nombres) else None, None)
+        resultado = pd.Series(valores, index=codigos.index, dtype="object")
+        return resultado.fillna(codigos if defecto is None else defecto)
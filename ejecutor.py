@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+# ejecutor.py
+# Consultas independientes en paralelo sobre un pool de hilos acotado; los hilos
+# comparten el engine (y su pool de conexiones) del proceso. Cada tarea devuelve
+# su propio resultado o su error, así una consulta que falla o se vence solo
+# afecta a quien la pidió. Al vencer el plazo se cancelan las que no empezaron.
+
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from metricas import registro
+
+
+class ConsultaVencida(TimeoutError):
+    pass
+
+
+class Ejecutor:
+    def __init__(self, max_hilos=4, timeout=None):
+        self.max_hilos = max_hilos
+        self.timeout = timeout  # segundos para el lote completo (None: sin límite)
+        self._pool = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def _obtener_pool(self):
+        # un pool por proceso: los hilos no sobreviven al fork de gunicorn
+        pid = os.getpid()
+        if self._pool is None or self._pid != pid:
+            with self._lock:
+                if self._pool is None or self._pid != pid:
+                    self._pool = ThreadPoolExecutor(max_workers=self.max_hilos, thread_name_prefix="consultas")
+                    self._pid = pid
+        return self._pool
+
+    def ejecutar(self, tareas, timeout=None):
+        # tareas: {nombre: función sin argumentos} -> {nombre: resultado o excepción}
+        timeout = self.timeout if timeout is None else timeout
+        futuros = {self._obtener_pool().submit(funcion): nombre for nombre, funcion in tareas.items()}
+        _, pendientes = wait(futuros, timeout=timeout)
+
+        resultados = {}
+        for futuro, nombre in futuros.items():
+            if futuro in pendientes:
+                # las que no empezaron se cancelan; las que corren las corta el
+                # timeout de la consulta en el driver
+                futuro.cancel()
+                registro.contar("consultas_vencidas_total", ayuda="Tareas que no terminaron en plazo", funcion=nombre)
+                resultados[nombre] = ConsultaVencida(f"{nombre} no terminó en {timeout} s")
+                continue
+            try:
+                resultados[nombre] = futuro.result()
+            except Exception as e:
+                resultados[nombre] = e
+        return resultados
+
+    def cerrar(self):
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
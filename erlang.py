@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+# erlang.py
+# Dimensionamiento con Erlang C, vectorizado: volumen y AHT llegan como arreglos
+# (escenarios x intervalos, o cualquier forma que numpy pueda difundir) y todas
+# las celdas se resuelven a la vez. El único ciclo en Python es sobre el número
+# de agentes (decenas), no sobre intervalos ni escenarios.
+
+import os
+
+import numpy as np
+
+MINUTOS_INTERVALO = int(os.environ.get("MINUTOS_INTERVALO", "30"))
+OBJETIVO_SEGUNDOS = 20       # el mismo umbral que ATENDIDAS_20S / PORC_SLA
+OBJETIVO_NIVEL = float(os.environ.get("OBJETIVO_NIVEL_SERVICIO", "0.8"))
+
+
+def carga_erlangs(volumen, aht, minutos=MINUTOS_INTERVALO):
+    # tráfico ofrecido A = llamadas x AHT / duración del intervalo
+    volumen = np.asarray(volumen, dtype="float64")
+    aht = np.asarray(aht, dtype="float64")
+    return np.nan_to_num(volumen * aht / (minutos * 60.0))
+
+
+def _tope_agentes(carga):
+    # suficiente para cualquier nivel de servicio razonable: A + 10·sqrt(A) + 10
+    maximo = float(np.max(carga)) if np.size(carga) else 0.0
+    return int(np.ceil(maximo + 10 * np.sqrt(maximo) + 10))
+
+
+def _espera_con_b(carga, n, b):
+    # Erlang C a partir de Erlang B con n agentes; 1 donde n <= A (la cola no se estabiliza)
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        return np.where(n > carga, n * b / (n - carga * (1 - b)), 1.0)
+
+
+def _nivel_servicio(espera, carga, agentes, aht, objetivo_segundos):
+    # fracción atendida antes de objetivo_segundos: 1 - C·e^(-(N-A)·t/AHT)
+    with np.errstate(over="ignore", invalid="ignore"):
+        return np.where(agentes > carga, 1 - espera * np.exp(-(agentes - carga) * objetivo_segundos / aht), 0.0)
+
+
+def erlang_c(carga, agentes):
+    # probabilidad de espera para N agentes (N entero, arreglo difundible con la carga);
+    # Erlang B por recurrencia estable B(n) = A·B(n-1) / (n + A·B(n-1)), luego C
+    carga = np.asarray(carga, dtype="float64")
+    agentes = np.asarray(agentes, dtype="int64")
+    carga, agentes = np.broadcast_arrays(carga, agentes)
+    b = np.ones(carga.shape)
+    resultado = np.ones(carga.shape)
+    for n in range(1, int(agentes.max(initial=0)) + 1):
+        b = carga * b / (n + carga * b)
+        en_n = agentes == n
+        resultado[en_n] = _espera_con_b(carga[en_n], n, b[en_n])
+    return np.where(carga > 0, resultado, 0.0)
+
+
+def dimensionar(volumen, aht, minutos=MINUTOS_INTERVALO, objetivo_segundos=OBJETIVO_SEGUNDOS,
+                objetivo_nivel=OBJETIVO_NIVEL):
+    # agentes mínimos por celda para atender objetivo_nivel de las llamadas en
+    # objetivo_segundos, con el nivel de servicio, ASA, probabilidad de espera y
+    # ocupación que predice Erlang C con esa dotación
+    volumen, aht = np.broadcast_arrays(np.asarray(volumen, dtype="float64"), np.asarray(aht, dtype="float64"))
+    carga = carga_erlangs(volumen, aht, minutos)
+    aht = np.where(aht > 0, aht, 1.0)
+
+    # búsqueda: la misma recurrencia que erlang_c, deteniéndose en el primer N que cumple
+    agentes = np.zeros(carga.shape, dtype="int64")
+    listo = carga <= 0
+    b = np.ones(carga.shape)
+    tope = _tope_agentes(carga)
+    for n in range(1, tope + 1):
+        if listo.all():
+            break
+        b = carga * b / (n + carga * b)
+        sl = _nivel_servicio(_espera_con_b(carga, n, b), carga, n, aht, objetivo_segundos)
+        nuevo = ~listo & (sl >= objetivo_nivel)
+        agentes[nuevo] = n
+        listo |= nuevo
+
+    # celdas que no llegaron al objetivo ni con el tope (no debería pasar): se marca el tope
+    agentes[~listo] = tope
+    espera = erlang_c(carga, agentes)
+    nivel = np.where(carga > 0, _nivel_servicio(espera, carga, agentes, aht, objetivo_segundos), 1.0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        asa = np.where(agentes > carga, espera * aht / (agentes - carga), np.where(carga > 0, np.inf, 0.0))
+        ocupacion = np.where(agentes > 0, carga / np.maximum(agentes, 1), 0.0)
+    return {
+        "carga": carga,
+        "agentes": agentes,
+        "nivel_servicio": nivel,
+        "asa": asa,
+        "probabilidad_espera": espera,
+        "ocupacion": ocupacion,
+    }
@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+# eventos.py
+# Avisos de datos nuevos por server-sent events. Un hilo por proceso vigila la
+# versión del snapshot publicado y, cuando cambia, despierta de una vez a todas
+# las conexiones abiertas (Condition); cada navegador recibe un mensaje pequeño
+# con la versión y solo entonces pide los datos. Las pestañas inactivas no hacen
+# peticiones; si el flujo se cae, el cliente vuelve al Interval.
+# Cada flujo abierto ocupa un hilo del worker (gthread) hasta 'duracion': por eso
+# hay un tope de flujos por proceso, por debajo de los hilos, para que siempre
+# queden hilos para los callbacks. Con el tope lleno el cliente sondea.
+# La versión es la del snapshot de un solo rango (sin filtros): el flujo anuncia
+# ese rango al conectar y el cliente solo deja de sondear si muestra justo eso.
+
+import json
+import os
+import threading
+import time
+
+from metricas import registrar_error, registro
+
+
+class PublicadorVersiones:
+    # leer_version() -> versión vigente (o None); barata, se consulta cada intervalo.
+    # rango: (desde, hasta) ISO del snapshot que versiona leer_version
+    def __init__(self, leer_version, rango, intervalo=1.0, latido=15.0, duracion=300.0, reconexion=5.0,
+                 max_conexiones=8):
+        self.leer_version = leer_version
+        self.rango = rango
+        self.intervalo = intervalo
+        self.latido = latido          # comentario periódico para que proxies no corten
+        self.duracion = duracion      # el flujo se cierra y el cliente reconecta (libera el hilo)
+        self.reconexion = reconexion  # espera del navegador antes de reconectar
+        self.max_conexiones = max_conexiones  # flujos abiertos a la vez en el proceso
+        self.version = None
+        self._condicion = threading.Condition()
+        self._pid = None
+        self._lock = threading.Lock()
+        self.conexiones = 0
+
+    def iniciar(self):
+        # idempotente y seguro tras fork: un hilo por proceso
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            try:
+                self.version = self.leer_version()
+            except Exception as e:
+                registrar_error("publicador_versiones", e)
+            threading.Thread(target=self._ciclo, name="publicador-versiones", daemon=True).start()
+
+    def _ciclo(self):
+        while True:
+            try:
+                version = self.leer_version()
+            except Exception as e:
+                registrar_error("publicador_versiones", e)
+                version = self.version
+            if version != self.version:
+                with self._condicion:
+                    self.version = version
+                    self._condicion.notify_all()
+                registro.contar("eventos_publicados_total", ayuda="Versiones nuevas avisadas a los clientes")
+            time.sleep(self.intervalo)
+
+    def esperar(self, vista, timeout):
+        # versión nueva respecto a 'vista', o None si vence el plazo
+        with self._condicion:
+            self._condicion.wait_for(lambda: self.version != vista, timeout=timeout)
+            return self.version if self.version != vista else None
+
+    def reservar(self):
+        # True si hay lugar para un flujo más; quien reserva llama a liberar() al cerrar
+        with self._lock:
+            if self.conexiones >= self.max_conexiones:
+                registro.contar("eventos_rechazados_total", ayuda="Flujos SSE rechazados por el tope de conexiones")
+                return False
+            self.conexiones += 1
+            return True
+
+    def liberar(self):
+        with self._lock:
+            self.conexiones -= 1
+
+    def flujo(self, vista=None):
+        # generador de texto text/event-stream para una conexión ya reservada
+        self.iniciar()
+        fin = time.monotonic() + self.duracion
+        yield f"retry: {int(self.reconexion * 1000)}\n\n"
+        desde, hasta = self.rango
+        yield f"event: rango\ndata: {json.dumps({'desde': desde, 'hasta': hasta})}\n\n"
+        if vista is None:
+            # conexión nueva: la página recién cargada ya trae la versión vigente
+            vista = self.version
+        elif self.version is not None and vista != self.version:
+            # reconexión tras perder avisos
+            vista = self.version
+            yield self._mensaje(vista)
+        while time.monotonic() < fin:
+            version = self.esperar(vista, min(self.latido, max(0.0, fin - time.monotonic())))
+            if version is None:
+                yield ": latido\n\n"
+                continue
+            vista = version
+            yield self._mensaje(vista)
+
+    @staticmethod
+    def _mensaje(version):
+        return f"id: {version}\nevent: version\ndata: {json.dumps({'version': version})}\n\n"
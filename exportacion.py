@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+# exportacion.py
+# Exportaciones en flujo con memoria acotada: las filas se leen en trozos con un
+# cursor del lado del servidor (stream_results) y cada trozo se escribe en la
+# respuesta como CSV o como un row group de Parquet, sin juntar todo en un solo
+# DataFrame. La memoria depende del tamaño del trozo, no del de la exportación.
+
+import os
+
+import pandas as pd
+from sqlalchemy import text
+
+from metricas import registro
+
+FILAS_POR_TROZO = int(os.environ.get("EXPORTACION_FILAS_TROZO", "50000"))
+
+TIPOS_CONTENIDO = {
+    "csv": "text/csv; charset=utf-8",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+
+def leer_en_trozos(engine, query, params=None, filas=FILAS_POR_TROZO, timeout=0):
+    # genera DataFrames de hasta 'filas' filas; la conexión queda tomada mientras
+    # se consume el generador y vuelve al pool al terminar (o al cortarse la descarga)
+    with engine.connect() as conn:
+        conn = conn.execution_options(stream_results=True, max_row_buffer=filas)
+        if conn.dialect.name == "mssql":
+            conn.connection.driver_connection.timeout = int(timeout or 0)
+        for trozo in pd.read_sql(text(query), conn, params=params, chunksize=filas):
+            yield trozo
+
+
+def _normalizar_trozo(df):
+    # tipos estables entre trozos (un trozo sin NULL no debe traer int y otro float)
+    df = df.copy()
+    for col in df.columns:
+        if pd.api.types.is_bool_dtype(df[col]) or pd.api.types.is_datetime64_any_dtype(df[col]):
+            continue
+        if pd.api.types.is_numeric_dtype(df[col]):
+            df[col] = df[col].astype("float64")
+        else:
+            df[col] = df[col].astype("string")
+    return df
+
+
+def flujo_csv(trozos, nombre="exportacion"):
+    # encabezado solo en el primer trozo; BOM para que Excel respete los acentos
+    primero = True
+    for trozo in trozos:
+        texto = trozo.to_csv(index=False, header=primero, lineterminator="\r\n")
+        datos = (("\ufeff" if primero else "") + texto).encode("utf-8")
+        primero = False
+        registro.contar("exportacion_filas_total", len(trozo), ayuda="Filas exportadas", vista=nombre, formato="csv")
+        registro.contar("exportacion_bytes_total", len(datos), ayuda="Bytes exportados", vista=nombre, formato="csv")
+        yield datos
+
+
+class _Sumidero:
+    # archivo de solo escritura para pyarrow: guarda lo escrito desde la última
+    # entrega y lleva la posición (tell) que el escritor de Parquet necesita
+    def __init__(self):
+        self._partes = []
+        self._posicion = 0
+        self.closed = False
+
+    def write(self, datos):
+        datos = bytes(datos)
+        self._partes.append(datos)
+        self._posicion += len(datos)
+        return len(datos)
+
+    def tell(self):
+        return self._posicion
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def writable(self):
+        return True
+
+    def seekable(self):
+        return False
+
+    def entregar(self):
+        datos = b"".join(self._partes)
+        self._partes = []
+        return datos
+
+
+def flujo_parquet(trozos, nombre="exportacion"):
+    # un row group por trozo; el esquema lo fija el primero
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    sumidero = _Sumidero()
+    escritor = None
+    try:
+        for trozo in trozos:
+            trozo = _normalizar_trozo(trozo)
+            if escritor is None:
+                tabla = pa.Table.from_pandas(trozo, preserve_index=False)
+                escritor = pq.ParquetWriter(pa.PythonFile(sumidero, mode="w"), tabla.schema, compression="snappy")
+            else:
+                tabla = pa.Table.from_pandas(trozo, schema=escritor.schema, preserve_index=False)
+            escritor.write_table(tabla)
+            registro.contar("exportacion_filas_total", len(trozo), ayuda="Filas exportadas", vista=nombre, formato="parquet")
+            datos = sumidero.entregar()
+            if datos:
+                registro.contar("exportacion_bytes_total", len(datos), ayuda="Bytes exportados", vista=nombre, formato="parquet")
+                yield datos
+        if escritor is None:
+            # sin filas: archivo válido sin columnas
+            escritor = pq.ParquetWriter(pa.PythonFile(sumidero, mode="w"), pa.schema([]))
+    finally:
+        if escritor is not None:
+            escritor.close()
+    datos = sumidero.entregar()  # pie del archivo (metadatos)
+    if datos:
+        registro.contar("exportacion_bytes_total", len(datos), ayuda="Bytes exportados", vista=nombre, formato="parquet")
+        yield datos
+
+
+def flujo(trozos, formato, nombre="exportacion"):
+    if formato == "parquet":
+        return flujo_parquet(trozos, nombre)
+    return flujo_csv(trozos, nombre)
@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+# gunicorn.conf.py
+# Arranque en frío: la app se importa una vez en el master (preload_app) y los
+# workers la heredan por fork ya cargada; cada worker descarta el engine
+# heredado y se calienta (consultas, cache, figuras) antes de recibir tráfico.
+# Los tiempos quedan en /metrics como arranque_segundos{fase=...}. Al salir, cada
+# worker cierra su pool de consultas paralelas.
+
+import os
+import time
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+workers = int(os.environ.get("WEB_CONCURRENCY", "2"))
+worker_class = "gthread"
+threads = int(os.environ.get("GUNICORN_THREADS", "16"))
+# /eventos (SSE) retiene un hilo por pestaña abierta durante EVENTOS_DURACION; el
+# dashboard acepta a lo sumo EVENTOS_MAX_CONEXIONES flujos por worker (por defecto
+# threads // 2) y al resto le responde 503 para que sondee con el Interval. Con
+# muchas pantallas, subir threads o workers, no el tope por encima de threads.
+preload_app = True
+# el calentamiento corre antes del primer latido del worker: margen para las consultas
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", "120"))
+
+_inicio_master = time.perf_counter()
+_inicio_worker = None
+
+
+def when_ready(server):
+    # master listo (app ya importada): precarga sin base de datos, compartida por fork
+    import dashboard_especiales
+    from metricas import registrar_arranque
+
+    dashboard_especiales.precargar()
+    registrar_arranque("master", time.perf_counter() - _inicio_master)
+
+
+def post_fork(server, worker):
+    global _inicio_worker
+    _inicio_worker = time.perf_counter()
+    import dashboard_especiales
+
+    dashboard_especiales.reiniciar_engine()
+
+
+def post_worker_init(worker):
+    # antes de que el worker acepte conexiones
+    import dashboard_especiales
+    from metricas import registrar_arranque
+
+    dashboard_especiales.calentar()
+    registrar_arranque("worker", time.perf_counter() - (_inicio_worker or _inicio_master))
+
+
+def worker_exit(server, worker):
+    # al salir el worker: el pool de consultas paralelas se cierra sin esperar a las que corren
+    import dashboard_especiales
+
+    dashboard_especiales.ejecutor.cerrar()
@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+# incremental.py
+# Ingesta incremental por marca de agua: en cada refresco solo se consultan las
+# llamadas recientes y se combinan con los acumulados por INTERVALO x DNIS x
+# agente. Las razones (ASA, AHT, % abandono, % SLA) se derivan de las sumas, así
+# el costo del refresco no depende del largo de la ventana.
+#
+# Una fila puede escribirse después de otra con FECHA posterior (llamadas largas
+# que terminan tras otras cortas, empates en el mismo segundo). Por eso la cola
+# reciente (FECHA >= corte, con corte = marca - margen) se vuelve a consultar en
+# cada refresco y reemplaza a la anterior en lugar de sumarse; solo lo anterior
+# al corte queda congelado en la base. Una fila que llega con más de 'margen' de
+# atraso la recoge la resincronización periódica.
+
+import threading
+import time
+from datetime import timedelta
+
+import pandas as pd
+
+from motor_kpis import LLAVES, MEDIDAS, vistas_desde_sumas
+
+
+def _sumar(*partes):
+    partes = [p for p in partes if not p.empty]
+    if not partes:
+        return pd.DataFrame(columns=LLAVES + MEDIDAS)
+    df = pd.concat(partes, ignore_index=True) if len(partes) > 1 else partes[0]
+    return df.groupby(LLAVES, dropna=False, sort=False)[MEDIDAS].sum().reset_index()
+
+
+class AcumuladorIncremental:
+    # consultar(desde, hasta, corte, congelar) -> DataFrame con LLAVES + MEDIDAS +
+    # CONGELADA + FECHA_MAX de las llamadas con FECHA >= corte (todas si corte es
+    # None); CONGELADA = 1 para FECHA < congelar (ninguna si congelar es None)
+    def __init__(self, consultar, resincronizar_cada=1800, margen_minutos=60):
+        self.consultar = consultar
+        self.resincronizar_cada = resincronizar_cada
+        self.margen = timedelta(minutes=margen_minutos)
+        self.rango = None
+        self.marca = None
+        self.corte = None
+        self.base = pd.DataFrame(columns=LLAVES + MEDIDAS)  # FECHA < corte
+        self.cola = pd.DataFrame(columns=LLAVES + MEDIDAS)  # FECHA >= corte, se reemplaza
+        self.sumas = pd.DataFrame(columns=LLAVES + MEDIDAS)
+        self._ultima_completa = 0.0
+        self._lock = threading.Lock()
+
+    def reiniciar(self, desde=None, hasta=None):
+        self.rango = (desde, hasta)
+        self.marca = None
+        self.corte = None
+        self.base = pd.DataFrame(columns=LLAVES + MEDIDAS)
+        self.cola = pd.DataFrame(columns=LLAVES + MEDIDAS)
+        self.sumas = pd.DataFrame(columns=LLAVES + MEDIDAS)
+
+    def actualizar(self, desde, hasta):
+        with self._lock:
+            # cambio de ventana o resincronización periódica: se vuelve a cargar la ventana completa
+            if self.rango != (desde, hasta) or time.monotonic() - self._ultima_completa >= self.resincronizar_cada:
+                self.reiniciar(desde, hasta)
+
+            # lo que quede antes de 'congelar' ya no se vuelve a consultar
+            congelar = None
+            if self.marca is not None:
+                congelar = self.marca - self.margen
+                if self.corte is not None:
+                    congelar = max(congelar, self.corte)
+
+            filas = self.consultar(desde, hasta, self.corte, congelar)
+            if self.corte is None:
+                self._ultima_completa = time.monotonic()
+
+            if not filas.empty:
+                marca_filas = pd.to_datetime(filas["FECHA_MAX"]).max()
+                if pd.notna(marca_filas):
+                    marca_filas = marca_filas.to_pydatetime()
+                    self.marca = marca_filas if self.marca is None else max(self.marca, marca_filas)
+
+            filas = filas.copy()
+            filas[MEDIDAS] = filas[MEDIDAS].apply(pd.to_numeric, errors="coerce").fillna(0)
+            congeladas = pd.to_numeric(filas["CONGELADA"], errors="coerce").fillna(0) == 1
+            if congeladas.any():
+                self.base = _sumar(self.base, filas.loc[congeladas, LLAVES + MEDIDAS])
+            self.cola = _sumar(filas.loc[~congeladas, LLAVES + MEDIDAS])
+            if congelar is not None:
+                self.corte = congelar
+
+            self.sumas = _sumar(self.base, self.cola)
+            return vistas_desde_sumas(self.sumas)
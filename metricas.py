@@ -0,0 +1,188 @@
+# -*- coding: utf-8 -*-
+# metricas.py
+# Instrumentación del dashboard: contadores, medidores e histogramas con
+# etiquetas, guardados en memoria y expuestos en formato de texto de Prometheus
+# (ruta /metrics). Cada worker de gunicorn lleva sus propias métricas. Las
+# consultas que pasan del umbral se registran en el log de consultas lentas.
+
+import functools
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+PREFIJO = "dashboard_especiales"
+UMBRAL_CONSULTA_LENTA_S = float(os.environ.get("SLOW_QUERY_S", "2"))
+
+CUBETAS_SEGUNDOS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+CUBETAS_FILAS = (1, 10, 100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000)
+CUBETAS_BYTES = (1_000, 10_000, 100_000, 500_000, 1_000_000, 5_000_000, 20_000_000)
+
+log = logging.getLogger("dashboard_especiales")
+log_lentas = logging.getLogger("dashboard_especiales.consultas_lentas")
+
+
+def _etiquetas(etiquetas):
+    return tuple(sorted((k, str(v)) for k, v in etiquetas.items()))
+
+
+def _formato_etiquetas(etiquetas, extra=()):
+    pares = list(etiquetas) + list(extra)
+    if not pares:
+        return ""
+    texto = ",".join(
+        '{}="{}"'.format(k, v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")) for k, v in pares
+    )
+    return "{" + texto + "}"
+
+
+def _numero(valor):
+    if valor == float("inf"):
+        return "+Inf"
+    return repr(float(valor)) if isinstance(valor, float) else str(valor)
+
+
+class Registro:
+    def __init__(self, prefijo=PREFIJO):
+        self.prefijo = prefijo
+        self._lock = threading.Lock()
+        self._tipos = {}        # nombre -> counter | gauge | histogram
+        self._ayudas = {}
+        self._cubetas = {}      # nombre -> límites del histograma
+        self._valores = {}      # nombre -> {etiquetas: valor | [conteos, suma, total]}
+        self._recolectores = []  # funciones leídas al exponer (cache, pool)
+
+    def _serie(self, nombre, tipo, ayuda):
+        if nombre not in self._tipos:
+            self._tipos[nombre] = tipo
+            self._ayudas[nombre] = ayuda or nombre
+            self._valores[nombre] = {}
+        return self._valores[nombre]
+
+    def contar(self, nombre, valor=1, ayuda=None, **etiquetas):
+        with self._lock:
+            serie = self._serie(nombre, "counter", ayuda)
+            clave = _etiquetas(etiquetas)
+            serie[clave] = serie.get(clave, 0) + valor
+
+    def fijar(self, nombre, valor, ayuda=None, **etiquetas):
+        with self._lock:
+            self._serie(nombre, "gauge", ayuda)[_etiquetas(etiquetas)] = valor
+
+    def observar(self, nombre, valor, cubetas=CUBETAS_SEGUNDOS, ayuda=None, **etiquetas):
+        with self._lock:
+            serie = self._serie(nombre, "histogram", ayuda)
+            cubetas = self._cubetas.setdefault(nombre, tuple(cubetas))
+            clave = _etiquetas(etiquetas)
+            datos = serie.get(clave)
+            if datos is None:
+                datos = serie[clave] = [[0] * len(cubetas), 0.0, 0]
+            i = bisect_left(cubetas, valor)
+            if i < len(cubetas):
+                datos[0][i] += 1
+            datos[1] += valor
+            datos[2] += 1
+
+    @contextmanager
+    def medir(self, nombre, ayuda=None, **etiquetas):
+        # duración del bloque en segundos, también si termina con excepción
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observar(nombre, time.perf_counter() - inicio, ayuda=ayuda, **etiquetas)
+
+    def recolector(self, funcion):
+        # funcion() -> [(tipo, nombre, valor, etiquetas, ayuda), ...]
+        self._recolectores.append(funcion)
+        return funcion
+
+    def exponer(self):
+        # copia bajo el candado; el texto se arma fuera
+        with self._lock:
+            series = []
+            for nombre, tipo in self._tipos.items():
+                valores = {
+                    k: (list(v[0]), v[1], v[2]) if tipo == "histogram" else v
+                    for k, v in self._valores[nombre].items()
+                }
+                series.append((nombre, tipo, self._ayudas[nombre], self._cubetas.get(nombre), valores))
+
+        externas = {}
+        for funcion in self._recolectores:
+            try:
+                for tipo, nombre, valor, etiquetas, ayuda in funcion():
+                    entrada = externas.setdefault(nombre, (tipo, ayuda, {}))
+                    entrada[2][_etiquetas(etiquetas)] = valor
+            except Exception as e:
+                log.warning("Error en recolector de métricas %s: %s", getattr(funcion, "__name__", funcion), e)
+        series += [(n, t, a, None, s) for n, (t, a, s) in externas.items()]
+
+        lineas = []
+        for nombre, tipo, ayuda, cubetas, valores in series:
+            completo = f"{self.prefijo}_{nombre}"
+            lineas.append(f"# HELP {completo} {ayuda}")
+            lineas.append(f"# TYPE {completo} {tipo}")
+            for etiquetas, valor in sorted(valores.items()):
+                if tipo != "histogram":
+                    lineas.append(f"{completo}{_formato_etiquetas(etiquetas)} {_numero(valor)}")
+                    continue
+                conteos, suma, total = valor
+                acumulado = 0
+                for limite, conteo in zip(cubetas, conteos):
+                    acumulado += conteo
+                    lineas.append(f"{completo}_bucket{_formato_etiquetas(etiquetas, [('le', _numero(limite))])} {acumulado}")
+                lineas.append(f"{completo}_bucket{_formato_etiquetas(etiquetas, [('le', '+Inf')])} {total}")
+                lineas.append(f"{completo}_sum{_formato_etiquetas(etiquetas)} {_numero(suma)}")
+                lineas.append(f"{completo}_count{_formato_etiquetas(etiquetas)} {total}")
+        return "\n".join(lineas) + "\n"
+
+
+registro = Registro()
+
+
+def etapa(nombre_etapa):
+    # decorador: tiempo de la función bajo etapa_segundos{etapa, funcion}
+    def decorador(funcion):
+        @functools.wraps(funcion)
+        def envoltura(*args, **kwargs):
+            with registro.medir(
+                "etapa_segundos", ayuda="Duración por etapa (pandas, figuras, callbacks...)",
+                etapa=nombre_etapa, funcion=funcion.__name__,
+            ):
+                return funcion(*args, **kwargs)
+        return envoltura
+    return decorador
+
+
+def registrar_conexion(segundos):
+    registro.observar("conexion_segundos", segundos, ayuda="Espera para obtener una conexión del pool")
+
+
+def registrar_consulta(funcion, segundos, filas, query=None):
+    registro.observar("consulta_segundos", segundos, ayuda="Duración de cada consulta SQL", funcion=funcion)
+    registro.observar("consulta_filas", filas, cubetas=CUBETAS_FILAS, ayuda="Filas devueltas por consulta", funcion=funcion)
+    if segundos >= UMBRAL_CONSULTA_LENTA_S:
+        texto = " ".join((query or "").split())
+        log_lentas.warning("Consulta lenta %s(): %.2f s, %d filas: %s", funcion, segundos, filas, texto[:500])
+
+
+def registrar_error(funcion, error):
+    # reemplaza los print de los except: cuenta por función y tipo, y deja traza en el log
+    registro.contar(
+        "errores_total", ayuda="Errores capturados por función", funcion=funcion, tipo=type(error).__name__
+    )
+    log.error("Error %s(): %s", funcion, error)
+
+
+def registrar_arranque(fase, segundos):
+    # arranque en frío: importación (master), precarga, calentamiento y worker listo
+    registro.fijar("arranque_segundos", segundos, ayuda="Duración del arranque en frío por fase", fase=fase)
+    log.info("Arranque %s: %.2f s", fase, segundos)
+
+
+def registrar_respuesta(salida, segundos, tamano):
+    registro.observar("peticion_segundos", segundos, ayuda="Duración total de la petición (callback + serialización)", salida=salida)
+    registro.observar("respuesta_bytes", tamano, cubetas=CUBETAS_BYTES, ayuda="Tamaño de la respuesta enviada al navegador", salida=salida)
@@ -0,0 +1,171 @@
+# -*- coding: utf-8 -*-
+# motor_kpis.py
+# Cálculo vectorizado (NumPy/pandas) de los KPIs del dashboard. Parte de registros
+# de llamadas o de sumas aditivas y sirve igual para SQL, cache, rollup y pruebas:
+# las razones siempre se derivan de las sumas con las mismas fórmulas.
+
+import numpy as np
+import pandas as pd
+
+UMBRAL_SLA_S = 20
+DNIS_EXCLUIDO = "5542112905"  # EGLOBAL
+CAMPANAS_EXCLUIDAS_TRAFICO = ("LIBERTAD", "EGLOBAL", "ASSISTANCE")
+
+# códigos crudos; los nombres de campaña y agente se ponen después (dimensiones.py)
+LLAVES = ["INTERVALO", "DNIS", "ULTIMO_AGENTE"]
+MEDIDAS = [
+    "RECIBIDAS", "CONTESTADAS", "ABANDONADAS", "ASA_BRUTO", "AHT_BRUTO", "ATENDIDAS_20S",
+    "INTERACCIONES", "CONTESTADAS_AGENTE",
+]
+COLUMNAS_TRAFICO = ["INTERVALO","RECIBIDAS","CONTESTADAS","ABANDONADAS","ASA","AHT","ATENDIDAS_20S","PORC_ABA","PORC_SLA"]
+
+
+def _num(llamadas, col):
+    if col not in llamadas:
+        return np.zeros(len(llamadas))
+    return pd.to_numeric(llamadas[col], errors="coerce").fillna(0).to_numpy(dtype="float64")
+
+
+def _texto(llamadas, col):
+    if col not in llamadas:
+        return pd.Series([None] * len(llamadas), index=llamadas.index, dtype="object")
+    return llamadas[col]
+
+
+def medidas_llamadas(llamadas, campanas=None):
+    # llamadas: DataFrame (o dict de arreglos) con las columnas crudas de
+    # LLAMADAS_ESPECIALES_ECD; devuelve LLAVES + CAMPANA + MEDIDAS por llamada, ya con los
+    # filtros de cada vista aplicados como en las consultas SQL
+    llamadas = pd.DataFrame(llamadas)
+
+    entrante = (_texto(llamadas, "DIRECCION") == "ENTRANTE").to_numpy()
+    ivr = _num(llamadas, "TIEMPO_EN_IVR") != 0
+    dnis = _texto(llamadas, "DNIS").astype("string")
+    base = entrante & ivr & (dnis != DNIS_EXCLUIDO).fillna(True).to_numpy()
+    llamadas = llamadas[base]
+    dnis = dnis[base]
+
+    sub = _texto(llamadas, "SUB_CATEGORIA")
+    trafico = (
+        (_texto(llamadas, "FUERA_DE_HORARIO") == "Inside").to_numpy()
+        & (sub.isna() | ~sub.astype("string").str.contains("Llamada de Prueba", regex=False).fillna(False)).to_numpy()
+        & ~_texto(llamadas, "CAMPAÑA").isin(CAMPANAS_EXCLUIDAS_TRAFICO).to_numpy()
+    )
+    abandonada = _texto(llamadas, "LLAMADA_ABANDONADA")
+    contestada = (abandonada == "NO").to_numpy()
+    abandono = (abandonada == "SI").to_numpy()
+
+    asa = _num(llamadas, "TIEMPO_EN_COLA") + _num(llamadas, "TIEMPO_DE_TIMBRADO")
+    aht = _num(llamadas, "TIEMPO_DE_CONVERSACION") + _num(llamadas, "TIEMPO_DE_TIPIFICACIÓN")
+    contestada_trafico = trafico & contestada
+
+    if "CAMPANA" in llamadas:
+        campana = llamadas["CAMPANA"].to_numpy()
+    elif campanas is not None:
+        campana = dnis.map(campanas).fillna("SIN CAMPAÑA").to_numpy()
+    else:
+        campana = np.full(len(llamadas), "SIN CAMPAÑA", dtype=object)
+
+    return pd.DataFrame({
+        "INTERVALO": _texto(llamadas, "INTERVALO").to_numpy(),
+        "DNIS": dnis.to_numpy(),
+        "CAMPANA": campana,
+        "ULTIMO_AGENTE": _texto(llamadas, "ULTIMO_AGENTE").to_numpy(),
+        "RECIBIDAS": trafico.astype("int64"),
+        "CONTESTADAS": contestada_trafico.astype("int64"),
+        "ABANDONADAS": (trafico & abandono).astype("int64"),
+        "ASA_BRUTO": np.where(contestada_trafico, asa, 0.0),
+        "AHT_BRUTO": np.where(trafico, aht, 0.0),
+        "ATENDIDAS_20S": (contestada_trafico & (asa <= UMBRAL_SLA_S)).astype("int64"),
+        "INTERACCIONES": np.ones(len(llamadas), dtype="int64"),
+        "CONTESTADAS_AGENTE": contestada.astype("int64"),
+    })
+
+
+def sumar(medidas, por):
+    return medidas.groupby(por, dropna=False, sort=True, observed=True)[MEDIDAS].sum().reset_index()
+
+
+def _dividir(a, b):
+    a = np.asarray(a, dtype="float64")
+    b = np.asarray(b, dtype="float64")
+    return np.divide(a, b, out=np.full(a.shape, np.nan), where=b > 0)
+
+
+def derivar_ratios(sumas):
+    # razones a partir de sumas aditivas (NaN cuando el denominador es 0, como en SQL)
+    sumas = sumas.copy()
+    sumas["ASA"] = _dividir(sumas["ASA_BRUTO"], sumas["CONTESTADAS"])
+    sumas["AHT"] = _dividir(sumas["AHT_BRUTO"], sumas["CONTESTADAS"])
+    sumas["PORC_ABA"] = _dividir(sumas["ABANDONADAS"], sumas["RECIBIDAS"])
+    sumas["PORC_SLA"] = _dividir(sumas["ATENDIDAS_20S"], sumas["CONTESTADAS"])
+    sumas["PORC_ATENCION"] = _dividir(sumas["CONTESTADAS"], sumas["RECIBIDAS"])
+    return sumas
+
+
+def kpis_por(llamadas, por, campanas=None):
+    # de registros de llamadas a KPIs por cualquier agrupación, sin SQL
+    return derivar_ratios(sumar(medidas_llamadas(llamadas, campanas), por))
+
+
+def vista_trafico(sumas):
+    trafico = sumas.groupby("INTERVALO", dropna=False, sort=True)[
+        ["RECIBIDAS","CONTESTADAS","ABANDONADAS","ASA_BRUTO","AHT_BRUTO","ATENDIDAS_20S"]
+    ].sum().reset_index()
+    trafico = derivar_ratios(trafico[trafico["RECIBIDAS"] > 0])
+    return trafico[COLUMNAS_TRAFICO].reset_index(drop=True)
+
+
+def vista_campanas(sumas):
+    campanas = sumas.groupby("DNIS", dropna=False)["INTERACCIONES"].sum().reset_index()
+    campanas = campanas[campanas["INTERACCIONES"] > 0].sort_values("INTERACCIONES", ascending=True)
+    return campanas[["DNIS","INTERACCIONES"]].reset_index(drop=True)
+
+
+def vista_agentes(sumas):
+    agentes = sumas.groupby("ULTIMO_AGENTE", dropna=False)["CONTESTADAS_AGENTE"].sum().reset_index()
+    agentes = agentes.rename(columns={"CONTESTADAS_AGENTE": "INTERACCIONES"})
+    agentes = agentes[agentes["INTERACCIONES"] > 0].sort_values("INTERACCIONES", ascending=False)
+    return agentes[["ULTIMO_AGENTE","INTERACCIONES"]].reset_index(drop=True)
+
+
+def vistas_desde_sumas(sumas):
+    # sumas: una fila por LLAVES (o más fino) con las MEDIDAS aditivas
+    return {
+        "trafico": vista_trafico(sumas),
+        "campanas": vista_campanas(sumas),
+        "agentes": vista_agentes(sumas),
+    }
+
+
+def a_fraccion(serie):
+    # porcentajes como fracción 0..1; acepta números o texto tipo "12.5%"
+    serie = pd.Series(serie)
+    if pd.api.types.is_numeric_dtype(serie):
+        return pd.to_numeric(serie, errors="coerce").fillna(0.0).astype("float64")
+    texto = serie.astype("string").str.strip()
+    valores = pd.to_numeric(texto.str.rstrip("%"), errors="coerce").fillna(0.0).astype("float64")
+    return valores.where(~texto.str.endswith("%").fillna(False), valores / 100.0)
+
+
+def totales(trafico):
+    # KPIs globales de las tarjetas a partir de la vista de tráfico por intervalo;
+    # ASA y AHT ponderados por contestadas
+    recibidas = int(pd.to_numeric(trafico["RECIBIDAS"], errors="coerce").fillna(0).sum())
+    contestadas_s = pd.to_numeric(trafico["CONTESTADAS"], errors="coerce").fillna(0)
+    contestadas = int(contestadas_s.sum())
+    abandonadas = int(pd.to_numeric(trafico["ABANDONADAS"], errors="coerce").fillna(0).sum())
+    atendidas_20 = int(pd.to_numeric(trafico["ATENDIDAS_20S"], errors="coerce").fillna(0).sum())
+    asa_bruto = (pd.to_numeric(trafico["ASA"], errors="coerce").fillna(0) * contestadas_s).sum()
+    aht_bruto = (pd.to_numeric(trafico["AHT"], errors="coerce").fillna(0) * contestadas_s).sum()
+
+    return {
+        "recibidas": recibidas,
+        "contestadas": contestadas,
+        "abandonadas": abandonadas,
+        "porc_aba": (abandonadas / recibidas) * 100 if recibidas > 0 else 0,
+        "porc_atencion": (contestadas / recibidas) * 100 if recibidas > 0 else 0,
+        "porc_sla": (atendidas_20 / contestadas) * 100 if contestadas > 0 else 0,
+        "asa": round(asa_bruto / contestadas, 0) if contestadas > 0 else 0,
+        "aht": round(aht_bruto / contestadas, 0) if contestadas > 0 else 0,
+    }
@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+# rollup.py
+# Almacén local de agregados diarios (día x INTERVALO x DNIS x agente) para los
+# días cerrados, que ya no cambian. Cada día se llena una sola vez desde SQL
+# Server; después cualquier rango se arma leyendo el archivo local y solo el día
+# en curso se consulta en vivo.
+
+import os
+import sqlite3
+import tempfile
+import threading
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+
+import pandas as pd
+
+from motor_kpis import LLAVES, MEDIDAS
+
+RUTA_ROLLUP = os.environ.get(
+    "ROLLUP_DB", os.path.join(tempfile.gettempdir(), "dashboard_especiales_rollup.sqlite")
+)
+
+COLUMNAS = ["DIA"] + LLAVES + MEDIDAS
+
+
+def _dias(desde, hasta):
+    dia = desde
+    while dia <= hasta:
+        yield dia
+        dia += timedelta(days=1)
+
+
+def _normalizar(df):
+    # llaves como texto (NULL se conserva) para que lo leído del archivo y lo
+    # consultado en vivo agrupen igual
+    df = df.copy()
+    df["DIA"] = pd.to_datetime(df["DIA"]).dt.date.astype(str)
+    for col in LLAVES:
+        df[col] = df[col].where(df[col].isna(), df[col].astype(str))
+    df[MEDIDAS] = df[MEDIDAS].apply(pd.to_numeric, errors="coerce").fillna(0)
+    conteos = [m for m in MEDIDAS if m not in ("ASA_BRUTO", "AHT_BRUTO")]
+    df[conteos] = df[conteos].astype("int64")
+    return df[COLUMNAS]
+
+
+def _tramos(dias):
+    # agrupa días consecutivos en (inicio, fin) para pedirlos en una sola consulta
+    tramos = []
+    for dia in sorted(dias):
+        if tramos and tramos[-1][1] + timedelta(days=1) == dia:
+            tramos[-1][1] = dia
+        else:
+            tramos.append([dia, dia])
+    return [tuple(t) for t in tramos]
+
+
+class AlmacenRollup:
+    # consultar(desde, hasta) -> DataFrame con COLUMNAS agregadas por día (rango inclusivo)
+    def __init__(self, consultar, ruta=RUTA_ROLLUP, margen_cierre=timedelta(hours=1), ejecutor=None):
+        self.consultar = consultar
+        self.ruta = ruta
+        self.margen_cierre = margen_cierre  # espera tras medianoche por filas tardías
+        self.ejecutor = ejecutor  # si hay, días cerrados y día abierto se piden a la vez
+        self._lock = threading.Lock()
+        with self._conectar() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS rollup ("
+                " DIA TEXT NOT NULL, INTERVALO TEXT, DNIS TEXT, ULTIMO_AGENTE TEXT, "
+                + ", ".join(f"{m} REAL NOT NULL DEFAULT 0" for m in MEDIDAS)
+                + ")"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_rollup_dia ON rollup (DIA)")
+            conn.execute("CREATE TABLE IF NOT EXISTS dias_cargados (DIA TEXT PRIMARY KEY, cargado TEXT NOT NULL)")
+
+    @contextmanager
+    def _conectar(self):
+        conn = sqlite3.connect(self.ruta, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def dias_cargados(self, desde, hasta):
+        with self._conectar() as conn:
+            filas = conn.execute(
+                "SELECT DIA FROM dias_cargados WHERE DIA BETWEEN ? AND ?", (desde.isoformat(), hasta.isoformat())
+            ).fetchall()
+        return {date.fromisoformat(f[0]) for f in filas}
+
+    def _guardar(self, df, dias):
+        # un día se marca y se inserta en la misma transacción; si otro proceso ya
+        # lo cargó, INSERT OR IGNORE no afecta filas y se omite
+        df = _normalizar(df)
+        por_dia = {d: g for d, g in df.groupby("DIA")}
+        ahora = datetime.now().isoformat(timespec="seconds")
+
+        with self._conectar() as conn:
+            for dia in dias:
+                clave = dia.isoformat()
+                cur = conn.execute("INSERT OR IGNORE INTO dias_cargados (DIA, cargado) VALUES (?, ?)", (clave, ahora))
+                if cur.rowcount == 0 or clave not in por_dia:
+                    continue
+                conn.executemany(
+                    f"INSERT INTO rollup ({', '.join(COLUMNAS)}) VALUES ({', '.join('?' * len(COLUMNAS))})",
+                    por_dia[clave][COLUMNAS].itertuples(index=False, name=None),
+                )
+
+    def completar(self, desde, hasta):
+        # carga desde SQL Server los días cerrados del rango que falten
+        faltantes = set(_dias(desde, hasta)) - self.dias_cargados(desde, hasta)
+        if not faltantes:
+            return
+        with self._lock:
+            for inicio, fin in _tramos(faltantes - self.dias_cargados(desde, hasta)):
+                self._guardar(self.consultar(inicio, fin), list(_dias(inicio, fin)))
+
+    def leer(self, desde, hasta):
+        with self._conectar() as conn:
+            df = pd.read_sql_query(
+                f"SELECT {', '.join(COLUMNAS)} FROM rollup WHERE DIA BETWEEN ? AND ?",
+                conn, params=(desde.isoformat(), hasta.isoformat()),
+            )
+        return df
+
+    def _cerrados(self, desde, hasta):
+        self.completar(desde, hasta)
+        return self.leer(desde, hasta)
+
+    def ultimo_dia_cerrado(self, ahora=None):
+        ahora = ahora or datetime.now()
+        return (ahora - self.margen_cierre).date() - timedelta(days=1)
+
+    def medidas(self, desde, hasta, ahora=None):
+        # días cerrados desde el archivo local; los abiertos (hoy), en vivo
+        ultimo_cerrado = self.ultimo_dia_cerrado(ahora)
+        tareas = {}
+        cierre = min(hasta, ultimo_cerrado)
+        if desde <= cierre:
+            tareas["rollup_cerrados"] = lambda: self._cerrados(desde, cierre)
+        inicio_vivo = max(desde, ultimo_cerrado + timedelta(days=1))
+        if inicio_vivo <= hasta:
+            tareas["rollup_vivo"] = lambda: self.consultar(inicio_vivo, hasta)
+
+        if self.ejecutor is not None and len(tareas) > 1:
+            resultados = self.ejecutor.ejecutar(tareas)
+            for resultado in resultados.values():
+                if isinstance(resultado, Exception):
+                    raise resultado
+            partes = [resultados[nombre] for nombre in tareas]
+        else:
+            partes = [tarea() for tarea in tareas.values()]
+
+        partes = [_normalizar(p) for p in partes if not p.empty]
+        if not partes:
+            return pd.DataFrame(columns=COLUMNAS)
+        return pd.concat(partes, ignore_index=True)
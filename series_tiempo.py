@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+# series_tiempo.py
+# Reducción de series de tiempo del lado del servidor: a la gráfica solo viajan
+# unos cuantos puntos por pixel. LTTB (Largest-Triangle-Three-Buckets) conserva
+# la forma de las líneas; min-max conserva picos y valles de los conteos. Al
+# hacer zoom se recorta la ventana y se vuelve a reducir, hasta resolución
+# completa cuando la ventana ya cabe en el ancho de la gráfica.
+
+import numpy as np
+import pandas as pd
+
+CUBETAS_MINUTOS = (5, 15, 30, 60, 1440)
+
+
+def objetivo_puntos(ancho_px, puntos_por_px=1.0, minimo=100, maximo=4000):
+    # puntos a enviar según el ancho (px) de la gráfica en el navegador
+    try:
+        ancho = float(ancho_px)
+    except (TypeError, ValueError):
+        ancho = 800.0
+    return int(min(maximo, max(minimo, ancho * puntos_por_px)))
+
+
+def _numerico(x):
+    x = pd.Series(x)
+    if pd.api.types.is_datetime64_any_dtype(x):
+        return x.astype("int64").to_numpy(dtype="float64")
+    return pd.to_numeric(x, errors="coerce").fillna(0).to_numpy(dtype="float64")
+
+
+def lttb(x, y, objetivo):
+    # índices de los puntos elegidos (incluye primero y último)
+    n = len(y)
+    if objetivo >= n or objetivo < 3:
+        return np.arange(n)
+    x = _numerico(x)
+    y = np.nan_to_num(np.asarray(y, dtype="float64"))
+
+    # objetivo - 2 cubos para los puntos intermedios [1, n - 1)
+    bordes = np.linspace(1, n - 1, objetivo - 1).astype("int64")
+    indices = np.empty(objetivo, dtype="int64")
+    indices[0], indices[-1] = 0, n - 1
+    a = 0
+    for i in range(objetivo - 2):
+        inicio, fin = bordes[i], bordes[i + 1]
+        # vértice C: promedio del cubo siguiente (o el último punto)
+        sig_fin = bordes[i + 2] if i + 2 < len(bordes) else n
+        xc, yc = x[fin:sig_fin].mean(), y[fin:sig_fin].mean()
+        areas = np.abs((x[a] - xc) * (y[inicio:fin] - y[a]) - (x[a] - x[inicio:fin]) * (yc - y[a]))
+        a = inicio + int(np.argmax(areas))
+        indices[i + 1] = a
+    return indices
+
+
+def min_max(y, objetivo):
+    # mínimo y máximo de cada cubo (dos puntos por cubo), vectorizado
+    n = len(y)
+    if objetivo >= n or objetivo < 4:
+        return np.arange(n)
+    y = np.nan_to_num(np.asarray(y, dtype="float64"))
+    cubos = objetivo // 2
+    bordes = np.linspace(0, n, cubos + 1).astype("int64")
+    cubo = np.repeat(np.arange(cubos), np.diff(bordes))
+    orden = np.lexsort((y, cubo))  # por cubo y, dentro, por valor
+    return np.unique(np.concatenate([orden[bordes[:-1]], orden[bordes[1:] - 1], [0, n - 1]]))
+
+
+def reducir(x, y, objetivo, metodo="lttb"):
+    # (x, y) reducidos a ~objetivo puntos
+    x = pd.Series(x).reset_index(drop=True)
+    y = pd.Series(y).reset_index(drop=True)
+    indices = lttb(x, y, objetivo) if metodo == "lttb" else min_max(y, objetivo)
+    return x.iloc[indices], y.iloc[indices]
+
+
+def ventana(df, columna, rango):
+    # filas dentro de rango=(inicio, fin) del eje x (zoom); None: todo
+    if not rango:
+        return df
+    inicio, fin = pd.Timestamp(rango[0]), pd.Timestamp(rango[1])
+    x = df[columna]
+    return df[(x >= inicio) & (x <= fin)]
+
+
+def _es_fecha(valor):
+    # plotly manda los extremos de un eje de fechas como texto; un eje de
+    # categorías manda posiciones numéricas (2.5, 10.5) que no son fechas
+    if not isinstance(valor, str):
+        return False
+    try:
+        pd.Timestamp(valor)
+    except ValueError:
+        return False
+    return True
+
+
+def rango_zoom(relayout):
+    # rango de fechas del eje x en relayoutData; None si es vista completa, no hay
+    # zoom o el zoom quedó de la gráfica por intervalo (eje de categorías)
+    relayout = relayout or {}
+    if "xaxis.range[0]" in relayout and "xaxis.range[1]" in relayout:
+        rango = relayout["xaxis.range[0]"], relayout["xaxis.range[1]"]
+    elif "xaxis.range" in relayout:
+        rango = tuple(relayout["xaxis.range"][:2])
+    else:
+        return None
+    return rango if len(rango) == 2 and all(_es_fecha(v) for v in rango) else None
@@ -0,0 +1,198 @@
+# -*- coding: utf-8 -*-
+# snapshots.py
+# Snapshots versionados en un archivo SQLite local, legibles por todos los workers
+# de gunicorn. Un refrescador en segundo plano construye los DataFrames en cada
+# intervalo; un candado de archivo garantiza que solo un proceso consulte SQL Server.
+# La versión solo sube si el contenido cambió: un refresco con los mismos datos
+# únicamente renueva la hora 'generado', así los avisos SSE no disparan recargas vacías.
+
+import hashlib
+import os
+import pickle
+import sqlite3
+import tempfile
+import threading
+import time
+from collections import namedtuple
+from contextlib import contextmanager
+from datetime import datetime
+
+import pandas as pd
+
+from metricas import registrar_error, registro
+
+try:
+    import fcntl
+except ImportError:  # Windows: sin candado entre procesos (servidor de desarrollo)
+    fcntl = None
+
+RUTA_SNAPSHOTS = os.environ.get(
+    "SNAPSHOT_DB", os.path.join(tempfile.gettempdir(), "dashboard_especiales_snapshots.sqlite")
+)
+
+Snapshot = namedtuple("Snapshot", ["version", "generado", "desde", "hasta", "tablas"])
+
+
+def huella_tablas(tablas):
+    # resumen del contenido (columnas y valores) de cada tabla, en orden de nombre
+    h = hashlib.blake2b(digest_size=16)
+    for nombre in sorted(tablas):
+        df = tablas[nombre]
+        h.update(nombre.encode("utf-8"))
+        h.update(repr(list(df.columns)).encode("utf-8"))
+        h.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return h.hexdigest()
+
+
+class AlmacenSnapshots:
+    def __init__(self, ruta=RUTA_SNAPSHOTS, conservar=3):
+        self.ruta = ruta
+        self.conservar = conservar
+        self._ultimo = None  # último snapshot deserializado en este proceso
+        self._lock = threading.Lock()
+        with self._conectar() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS versiones ("
+                " version INTEGER PRIMARY KEY AUTOINCREMENT,"
+                " generado TEXT NOT NULL, desde TEXT NOT NULL, hasta TEXT NOT NULL, huella TEXT)"
+            )
+            columnas = [fila[1] for fila in conn.execute("PRAGMA table_info(versiones)")]
+            if "huella" not in columnas:  # archivo creado por una versión anterior
+                conn.execute("ALTER TABLE versiones ADD COLUMN huella TEXT")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS tablas ("
+                " version INTEGER NOT NULL, nombre TEXT NOT NULL, datos BLOB NOT NULL,"
+                " PRIMARY KEY (version, nombre))"
+            )
+
+    @contextmanager
+    def _conectar(self):
+        conn = sqlite3.connect(self.ruta, timeout=10)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def publicar(self, desde, hasta, tablas, generado=None):
+        # devuelve la versión vigente: nueva si el contenido cambió, la misma si no
+        generado = generado or datetime.now()
+        huella = huella_tablas(tablas)
+        with self._conectar() as conn:
+            ultima = conn.execute(
+                "SELECT version, desde, hasta, huella FROM versiones ORDER BY version DESC LIMIT 1"
+            ).fetchone()
+            if ultima is not None and tuple(ultima[1:]) == (str(desde), str(hasta), huella):
+                conn.execute(
+                    "UPDATE versiones SET generado = ? WHERE version = ?",
+                    (generado.isoformat(timespec="seconds"), ultima[0]),
+                )
+                registro.contar("snapshot_sin_cambios_total", ayuda="Refrescos con el mismo contenido (sin versión nueva)")
+                return ultima[0]
+            cur = conn.execute(
+                "INSERT INTO versiones (generado, desde, hasta, huella) VALUES (?, ?, ?, ?)",
+                (generado.isoformat(timespec="seconds"), str(desde), str(hasta), huella),
+            )
+            version = cur.lastrowid
+            conn.executemany(
+                "INSERT INTO tablas (version, nombre, datos) VALUES (?, ?, ?)",
+                [(version, nombre, pickle.dumps(df, protocol=pickle.HIGHEST_PROTOCOL)) for nombre, df in tablas.items()],
+            )
+            conn.execute("DELETE FROM tablas WHERE version <= ?", (version - self.conservar,))
+            conn.execute("DELETE FROM versiones WHERE version <= ?", (version - self.conservar,))
+        return version
+
+    def version_actual(self):
+        with self._conectar() as conn:
+            fila = conn.execute("SELECT MAX(version) FROM versiones").fetchone()
+        return fila[0]
+
+    def leer_ultimo(self):
+        with self._conectar() as conn:
+            fila = conn.execute(
+                "SELECT version, generado, desde, hasta FROM versiones ORDER BY version DESC LIMIT 1"
+            ).fetchone()
+        if fila is None:
+            return None
+        version, generado, desde, hasta = fila
+        with self._lock:
+            if self._ultimo is not None and self._ultimo.version == version:
+                # misma versión; 'generado' pudo renovarse con un refresco sin cambios
+                if self._ultimo.generado != datetime.fromisoformat(generado):
+                    self._ultimo = self._ultimo._replace(generado=datetime.fromisoformat(generado))
+                return self._ultimo
+
+        with self._conectar() as conn:
+            filas = conn.execute("SELECT nombre, datos FROM tablas WHERE version = ?", (version,)).fetchall()
+
+        snapshot = Snapshot(
+            version=version,
+            generado=datetime.fromisoformat(generado),
+            desde=desde,
+            hasta=hasta,
+            tablas={nombre: pickle.loads(datos) for nombre, datos in filas},
+        )
+        with self._lock:
+            self._ultimo = snapshot
+        return snapshot
+
+
+class RefrescadorSnapshots:
+    # construir() -> dict nombre: DataFrame; se ejecuta solo en el proceso líder
+    def __init__(self, almacen, construir, desde, hasta, intervalo=60):
+        self.almacen = almacen
+        self.construir = construir
+        self.desde = desde
+        self.hasta = hasta
+        self.intervalo = intervalo
+        self.ruta_candado = almacen.ruta + ".lock"
+        self._pid = None
+        self._archivo_candado = None
+        self._lock = threading.Lock()
+
+    def iniciar(self):
+        # idempotente y seguro tras fork: un hilo por proceso
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._archivo_candado = None
+            threading.Thread(target=self._ciclo, name="refrescador-snapshots", daemon=True).start()
+
+    def es_lider(self):
+        return self._archivo_candado is not None
+
+    def _tomar_candado(self):
+        if fcntl is None:
+            self._archivo_candado = True
+            return True
+        archivo = open(self.ruta_candado, "a")
+        try:
+            fcntl.flock(archivo.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            archivo.close()
+            return False
+        self._archivo_candado = archivo  # se libera solo al morir el proceso
+        return True
+
+    def refrescar(self):
+        tablas = self.construir(self.desde, self.hasta)
+        return self.almacen.publicar(self.desde, self.hasta, tablas)
+
+    def _ciclo(self):
+        while not self.es_lider():
+            if self._tomar_candado():
+                break
+            time.sleep(self.intervalo)
+
+        while True:
+            inicio = time.monotonic()
+            try:
+                with registro.medir("snapshot_refresco_segundos", ayuda="Duración de cada refresco del líder"):
+                    self.refrescar()
+            except Exception as e:
+                registrar_error("refrescador_snapshots", e)
+            time.sleep(max(1.0, self.intervalo - (time.monotonic() - inicio)))
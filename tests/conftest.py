@@ -0,0 +1,40 @@
+# -*- coding: utf-8 -*-
+# Los módulos viven en la raíz del repositorio (sin paquete): se agregan al path.
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class Reloj:
+    # time.monotonic controlable: las pruebas adelantan 'ahora' a mano
+    def __init__(self):
+        self.ahora = 1000.0
+
+    def __call__(self):
+        return self.ahora
+
+
+@pytest.fixture
+def reloj(monkeypatch):
+    import time
+
+    reloj = Reloj()
+    monkeypatch.setattr(time, "monotonic", reloj)
+    return reloj
+
+
+@pytest.fixture(scope="session")
+def dashboard(tmp_path_factory):
+    # el módulo lee SNAPSHOT_DB y ROLLUP_DB al importarse: el entorno se fija antes
+    # del primer import y todas las pruebas comparten ese único módulo
+    ruta = tmp_path_factory.mktemp("dashboard")
+    mp = pytest.MonkeyPatch()
+    mp.setenv("SNAPSHOT_DB", str(ruta / "snapshots.sqlite"))
+    mp.setenv("ROLLUP_DB", str(ruta / "rollup.sqlite"))
+    import dashboard_especiales
+
+    yield dashboard_especiales
+    mp.undo()
@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+# Cache de consultas: TTL, single-flight, stale-while-revalidate y memoria acotada
+
+import threading
+import time
+
+import pandas as pd
+import pytest
+
+from cache_consultas import CacheConsultas
+from cubo import Cubo
+from motor_kpis import MEDIDAS
+
+
+class Contador:
+    def __init__(self, valor="v", error=None, pausa=None):
+        self.llamadas = 0
+        self.valor = valor
+        self.error = error
+        self.pausa = pausa
+
+    def __call__(self):
+        self.llamadas += 1
+        if self.pausa is not None:
+            self.pausa.wait(5)
+        if self.error is not None:
+            raise self.error
+        return f"{self.valor}{self.llamadas}"
+
+
+def test_ttl(reloj):
+    cache = CacheConsultas(ttl=10)
+    cargar = Contador()
+    assert cache.obtener("k", cargar) == "v1"
+    reloj.ahora += 9
+    assert cache.obtener("k", cargar) == "v1"
+    reloj.ahora += 1
+    assert cache.consultar("k") is None
+    assert cache.obtener("k", cargar) == "v2"
+    assert cache.obtener("otra", cargar, ttl=0) == "v3"
+    assert cache.obtener("otra", cargar, ttl=0) == "v4"
+    estado = cache.estado()
+    assert (estado["aciertos"], estado["fallos"]) == (1, 4)
+
+
+def test_error_no_se_guarda():
+    cache = CacheConsultas(ttl=10)
+    with pytest.raises(ValueError):
+        cache.obtener("k", Contador(error=ValueError("base")))
+    assert cache.obtener("k", Contador()) == "v1"
+    assert cache.estado()["errores"] == 1
+
+
+def test_single_flight():
+    cache = CacheConsultas(ttl=10)
+    pausa = threading.Event()
+    cargar = Contador(pausa=pausa)
+    resultados = []
+    hilos = [threading.Thread(target=lambda: resultados.append(cache.obtener("k", cargar))) for _ in range(8)]
+    for hilo in hilos:
+        hilo.start()
+    while len(cache._vuelos) == 0 or cache.estado()["coalescidas"] < 7:
+        time.sleep(0.001)
+    pausa.set()
+    for hilo in hilos:
+        hilo.join(5)
+    assert cargar.llamadas == 1
+    assert resultados == ["v1"] * 8
+
+
+def test_single_flight_propaga_el_error():
+    cache = CacheConsultas(ttl=10)
+    pausa = threading.Event()
+    cargar = Contador(error=ConnectionError("caída"), pausa=pausa)
+    errores = []
+
+    def pedir():
+        try:
+            cache.obtener("k", cargar)
+        except ConnectionError as e:
+            errores.append(e)
+
+    hilos = [threading.Thread(target=pedir) for _ in range(4)]
+    for hilo in hilos:
+        hilo.start()
+    while cache.estado()["coalescidas"] < 3:
+        time.sleep(0.001)
+    pausa.set()
+    for hilo in hilos:
+        hilo.join(5)
+    assert cargar.llamadas == 1
+    assert len(errores) == 4
+
+
+def esperar_recarga(cache, clave):
+    for _ in range(500):
+        if clave not in cache._vuelos:
+            return
+        time.sleep(0.01)
+
+
+def test_obsoleto_se_sirve_mientras_recarga(reloj):
+    cache = CacheConsultas(ttl=10, obsoleto=60)
+    cargar = Contador()
+    assert cache.obtener("k", cargar) == "v1"
+    reloj.ahora += 30
+    assert cache.obtener("k", cargar) == "v1"  # al instante, sin esperar la recarga
+    esperar_recarga(cache, "k")
+    assert cache.obtener("k", cargar) == "v2"
+    assert cache.estado()["obsoletas"] == 1
+
+
+def test_obsoleto_conserva_el_valor_si_la_recarga_falla(reloj):
+    cache = CacheConsultas(ttl=10, obsoleto=60)
+    cache.obtener("k", Contador())
+    reloj.ahora += 30
+    assert cache.obtener("k", Contador(error=ConnectionError("caída"))) == "v1"
+    esperar_recarga(cache, "k")
+    assert cache.obtener("k", Contador(error=ConnectionError("caída"))) == "v1"
+    reloj.ahora += 60  # fuera de la ventana: ya no se sirve
+    with pytest.raises(ConnectionError):
+        cache.obtener("k", Contador(error=ConnectionError("caída")))
+
+
+def test_expulsion_por_entradas_y_bytes():
+    cache = CacheConsultas(ttl=60, max_entradas=2)
+    for clave in "abc":
+        cache.guardar(clave, clave)
+    assert cache.consultar("a") is None and cache.consultar("c") == "c"
+
+    df = pd.DataFrame({"x": range(1000)})
+    cache = CacheConsultas(ttl=60, max_bytes=int(1.5 * df.memory_usage(deep=True).sum()))
+    cache.guardar("uno", df)
+    cache.guardar("dos", df)
+    assert cache.consultar("uno") is None
+    assert cache.estado()["expulsiones"] == 1
+
+
+def test_cubo_se_mide_por_memoria():
+    hechos = pd.DataFrame({"DIA": ["2024-01-01"] * 3, "INTERVALO": ["08:00", "08:30", "09:00"],
+                           "CAMPANA": ["ATC"] * 3, "AGENTE": ["Ana"] * 3, **{m: [1, 2, 3] for m in MEDIDAS}})
+    cubo = Cubo(hechos)
+    cache = CacheConsultas()
+    cache.guardar("cubo", {"cubo": cubo})
+    assert cache.estado()["bytes"] == cubo.memoria()
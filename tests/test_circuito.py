@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+# Máquina de estados del interruptor de circuito
+
+import pytest
+from sqlalchemy.exc import OperationalError, ProgrammingError
+
+from circuito import ABIERTO, CERRADO, SEMIABIERTO, Circuito, CircuitoAbierto
+
+
+def falla_conexion():
+    return OperationalError("SELECT 1", {}, Exception("conexión rechazada"))
+
+
+def test_abre_tras_fallas_seguidas(reloj):
+    c = Circuito("prueba", fallas=3, enfriamiento=30)
+    for _ in range(2):
+        c.permitir()
+        c.falla(falla_conexion())
+    assert c.estado == CERRADO
+    c.permitir()
+    c.falla(falla_conexion())
+    assert c.estado == ABIERTO
+    assert not c.disponible()
+    with pytest.raises(CircuitoAbierto):
+        c.permitir()
+
+
+def test_exito_reinicia_la_cuenta(reloj):
+    c = Circuito("prueba", fallas=2)
+    c.falla(falla_conexion())
+    c.exito()
+    c.falla(falla_conexion())
+    assert c.estado == CERRADO
+
+
+def test_error_de_consulta_no_abre(reloj):
+    c = Circuito("prueba", fallas=1)
+    c.falla(ProgrammingError("SELEC", {}, Exception("sintaxis")))
+    c.falla(ValueError("dato"))
+    assert c.estado == CERRADO
+
+
+def test_una_sola_prueba_tras_enfriamiento(reloj):
+    c = Circuito("prueba", fallas=1, enfriamiento=30)
+    c.falla(falla_conexion())
+    reloj.ahora += 29
+    with pytest.raises(CircuitoAbierto):
+        c.permitir()
+    reloj.ahora += 1
+    assert c.disponible()
+    c.permitir()
+    assert c.estado == SEMIABIERTO
+    assert not c.disponible()
+    with pytest.raises(CircuitoAbierto):
+        c.permitir()  # la segunda espera el resultado de la primera
+
+
+def test_prueba_exitosa_cierra(reloj):
+    c = Circuito("prueba", fallas=1, enfriamiento=30)
+    c.falla(falla_conexion())
+    reloj.ahora += 30
+    c.permitir()
+    c.exito()
+    assert c.estado == CERRADO
+    c.permitir()
+
+
+def test_prueba_fallida_reabre(reloj):
+    c = Circuito("prueba", fallas=5, enfriamiento=30)
+    for _ in range(5):
+        c.falla(falla_conexion())
+    reloj.ahora += 30
+    c.permitir()
+    c.falla(falla_conexion())  # una sola falla en semiabierto basta
+    assert c.estado == ABIERTO
+    assert c.abierto_desde == reloj.ahora
+    with pytest.raises(CircuitoAbierto):
+        c.permitir()
+
+
+def test_prueba_con_error_ajeno_a_la_base_libera(reloj):
+    c = Circuito("prueba", fallas=1, enfriamiento=30)
+    c.falla(falla_conexion())
+    reloj.ahora += 30
+    c.permitir()
+    c.falla(ImportError("sin driver"))
+    assert not c._prueba_en_curso
+    c.permitir()
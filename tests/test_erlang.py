@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+# Erlang C: valores de referencia y consistencia del dimensionamiento vectorizado
+
+import numpy as np
+import pytest
+
+from erlang import carga_erlangs, dimensionar, erlang_c
+
+
+def test_carga_erlangs():
+    # 100 llamadas de 180 s en media hora = 10 Erlangs
+    assert carga_erlangs(100, 180, minutos=30) == pytest.approx(10.0)
+    assert carga_erlangs(0, np.nan) == 0.0
+
+
+def test_erlang_c_valores_conocidos():
+    np.testing.assert_allclose(erlang_c(10, [11, 12, 15]), [0.6821, 0.4494, 0.1020], atol=5e-4)
+    np.testing.assert_allclose(erlang_c(2, 3), 4 / 9)  # forma cerrada: A^N/N!·N/(N-A) / suma
+    # sin suficientes agentes la cola crece sin límite: siempre se espera
+    assert erlang_c(10, [0, 5, 10]).tolist() == [1.0, 1.0, 1.0]
+    assert erlang_c(0, 3) == 0.0
+
+
+def test_dimensionar_caso_de_libro():
+    r = dimensionar(100, 180, minutos=30, objetivo_segundos=20, objetivo_nivel=0.8)
+    assert int(r["agentes"]) == 14
+    assert float(r["nivel_servicio"]) >= 0.8
+    assert float(r["ocupacion"]) == pytest.approx(10 / 14)
+    # con un agente menos no se llega al objetivo
+    c = erlang_c(10, 13)
+    assert 1 - c * np.exp(-(13 - 10) * 20 / 180) < 0.8
+
+
+def test_dimensionar_vectorizado_igual_a_celda_por_celda():
+    rng = np.random.default_rng(7)
+    volumen = rng.integers(0, 300, (4, 12)).astype(float)
+    aht = rng.integers(60, 400, (4, 12)).astype(float)
+    r = dimensionar(volumen, aht)
+    for i, j in np.ndindex(volumen.shape):
+        celda = dimensionar(volumen[i, j], aht[i, j])
+        for clave in ("agentes", "nivel_servicio", "probabilidad_espera"):
+            assert r[clave][i, j] == pytest.approx(float(celda[clave]))
+    np.testing.assert_allclose(r["probabilidad_espera"], erlang_c(r["carga"], r["agentes"]))
+
+
+def test_dimensionar_sin_llamadas():
+    r = dimensionar([0, 50], [200, 0])
+    assert r["agentes"].tolist() == [0, 0]
+    assert r["nivel_servicio"].tolist() == [1.0, 1.0]
+    assert r["asa"].tolist() == [0.0, 0.0]
@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+# Flujo SSE de versiones: anuncio del rango cubierto, avisos y tope de conexiones
+
+import json
+
+from eventos import PublicadorVersiones
+
+
+def publicador(version=1, **opciones):
+    estado = {"version": version}
+    p = PublicadorVersiones(lambda: estado["version"], ("2025-12-01", "2025-12-08"), intervalo=0.01, **opciones)
+    return p, estado
+
+
+def evento(texto):
+    campos = dict(linea.split(": ", 1) for linea in texto.strip().splitlines())
+    return campos.get("event"), json.loads(campos["data"])
+
+
+def test_el_flujo_anuncia_el_rango_del_snapshot():
+    p, _ = publicador()
+    flujo = p.flujo()
+    assert next(flujo).startswith("retry: ")
+    assert evento(next(flujo)) == ("rango", {"desde": "2025-12-01", "hasta": "2025-12-08"})
+    flujo.close()
+
+
+def test_aviso_de_version_nueva():
+    p, estado = publicador(latido=5)
+    flujo = p.flujo()
+    next(flujo), next(flujo)
+    estado["version"] = 2
+    assert evento(next(flujo)) == ("version", {"version": 2})
+    flujo.close()
+
+
+def test_reconexion_recibe_la_version_perdida():
+    p, _ = publicador(version=3)
+    p.iniciar()
+    flujo = p.flujo(vista=1)
+    next(flujo), next(flujo)
+    assert evento(next(flujo)) == ("version", {"version": 3})
+    flujo.close()
+
+
+def test_tope_de_conexiones():
+    p, _ = publicador(max_conexiones=2)
+    assert p.reservar() and p.reservar()
+    assert not p.reservar()
+    p.liberar()
+    assert p.reservar()
+    assert p.conexiones == 2
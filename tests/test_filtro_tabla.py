@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+# filter_query de la DataTable -> filtros pandas
+
+import pandas as pd
+import pytest
+
+
+@pytest.fixture
+def d(dashboard):
+    return dashboard
+
+
+@pytest.fixture
+def tabla():
+    return pd.DataFrame({"INTERVALO": ["08:00", "08:30", "10:00"], "RECIBIDAS": [5, 12, 30]})
+
+
+@pytest.mark.parametrize("consulta, esperado", [
+    ("{RECIBIDAS} > 10", ["08:30", "10:00"]),
+    ("{RECIBIDAS} eq 12", ["08:30"]),
+    ("{INTERVALO} contains 08", ["08:00", "08:30"]),       # sin convertir a 8.0
+    ("{INTERVALO} datestartswith 10", ["10:00"]),
+    ("{INTERVALO} eq 08:30", ["08:30"]),
+    ("{RECIBIDAS} contains 12", ["08:30"]),
+    ('{INTERVALO} = "10:00" && {RECIBIDAS} ge 30', ["10:00"]),
+    ("{RECIBIDAS} > abc", ["08:00", "08:30", "10:00"]),   # tipo incompatible: se ignora
+    ("{NO_EXISTE} > 1", ["08:00", "08:30", "10:00"]),
+])
+def test_filtrar_tabla(d, tabla, consulta, esperado):
+    assert d.filtrar_tabla(tabla, consulta)["INTERVALO"].tolist() == esperado
+
+
+def test_separar_filtro_conserva_texto(d):
+    assert d.separar_filtro("{INTERVALO} contains '08'") == ("INTERVALO", "contains", "08")
+    assert d.separar_filtro("{RECIBIDAS} >= 3") == ("RECIBIDAS", "ge", "3")
+
+
+def test_pagina_fuera_de_rango_tras_filtrar(d, monkeypatch):
+    from datetime import date
+
+    from benchmark_especiales import generar_llamadas
+    from motor_kpis import COLUMNAS_TRAFICO, kpis_por
+
+    llamadas = generar_llamadas(2000, date(2024, 1, 1), 1, campanas=d.CAMPANAS_DNIS)
+    trafico = kpis_por(llamadas, ["INTERVALO"])[COLUMNAS_TRAFICO]
+    monkeypatch.setattr(d, "_datos", lambda *args: {"trafico": trafico, "version": 1})
+
+    filas, paginas, pagina, _, _ = d.actualizar_tabla(0, None, None, None, None, 2, 10, [], "", None)
+    assert (len(filas), paginas, pagina) == (6, 3, d.no_update)
+    # el filtro deja una sola página: la 3 ya no existe y el paginador vuelve a la 1
+    filas, paginas, pagina, _, _ = d.actualizar_tabla(0, None, None, None, None, 2, 10, [], "{INTERVALO} contains 08", None)
+    assert (len(filas), paginas, pagina) == (2, 1, 0)
@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+# Ingesta incremental contra la base SQLite del benchmark: filas que se escriben
+# tarde (FECHA anterior a la marca) deben contarse igual que en una consulta completa
+
+from datetime import date, datetime, timedelta
+
+import pandas as pd
+import pytest
+
+from incremental import AcumuladorIncremental
+from motor_kpis import LLAVES, MEDIDAS
+
+
+@pytest.fixture
+def base(dashboard, tmp_path):
+    import benchmark_especiales as b
+
+    d = dashboard
+    desde = date.today() - timedelta(days=1)
+    engine = b.cargar_sqlite(
+        str(tmp_path / "llamadas.sqlite"), 2000, desde, 2, d.CAMPANAS_DNIS, d.CATALOGO_AGENTES["ID_CONEXION"]
+    )
+    anterior = d._engine
+    d.usar_engine(engine)
+    yield d, engine, desde, desde + timedelta(days=1)
+    d.usar_engine(anterior)
+    engine.dispose()
+
+
+def insertar(engine, d, *fechas):
+    # llamadas contestadas que entran en todas las vistas, con la FECHA dada
+    from benchmark_especiales import generar_llamadas
+
+    filas = generar_llamadas(len(fechas), date.today(), 1, semilla=99, campanas=d.CAMPANAS_DNIS)
+    filas["FECHA"] = [f.strftime("%Y-%m-%d %H:%M:%S") for f in fechas]
+    filas["INTERVALO"] = [f"{f.hour:02d}:{30 * (f.minute // 30):02d}" for f in fechas]
+    filas["DIRECCION"] = "ENTRANTE"
+    filas["DNIS"] = next(iter(d.CAMPANAS_DNIS))
+    filas["CAMPAÑA"] = "ATC"
+    filas["FUERA_DE_HORARIO"] = "Inside"
+    filas["SUB_CATEGORIA"] = None
+    filas["LLAMADA_ABANDONADA"] = "NO"
+    filas["TIEMPO_EN_IVR"] = 10
+    filas.to_sql("LLAMADAS_ESPECIALES_ECD", engine, if_exists="append", index=False)
+
+
+def sumas_completas(d, desde, hasta):
+    filas = d.consultar_medidas_delta(desde, hasta)
+    filas[MEDIDAS] = filas[MEDIDAS].apply(pd.to_numeric)
+    return filas.groupby(LLAVES, dropna=False)[MEDIDAS].sum()
+
+
+def assert_igual_a_completa(acumulador, d, desde, hasta):
+    obtenido = acumulador.sumas.groupby(LLAVES, dropna=False)[MEDIDAS].sum()
+    esperado = sumas_completas(d, desde, hasta)
+    pd.testing.assert_frame_equal(obtenido.sort_index(), esperado.sort_index(), check_dtype=False)
+
+
+def test_filas_tardias_dentro_del_margen(base):
+    d, engine, desde, hasta = base
+    acumulador = AcumuladorIncremental(d.consultar_medidas_delta, margen_minutos=60)
+    acumulador.actualizar(desde, hasta)
+    assert_igual_a_completa(acumulador, d, desde, hasta)
+    marca = acumulador.marca
+
+    # una llamada larga que termina después de otras: FECHA 3 min antes de la marca
+    insertar(engine, d, marca - timedelta(minutes=3), marca + timedelta(minutes=1))
+    recibidas = acumulador.sumas["RECIBIDAS"].sum()
+    acumulador.actualizar(desde, hasta)
+    assert acumulador.sumas["RECIBIDAS"].sum() == recibidas + 2
+    assert_igual_a_completa(acumulador, d, desde, hasta)
+
+    # empate en el segundo de la marca y otra tardía; la cola no se suma dos veces
+    marca = acumulador.marca
+    insertar(engine, d, marca, marca - timedelta(minutes=30))
+    acumulador.actualizar(desde, hasta)
+    acumulador.actualizar(desde, hasta)
+    assert_igual_a_completa(acumulador, d, desde, hasta)
+
+
+def test_la_base_congelada_avanza_sin_duplicar(base):
+    d, engine, desde, hasta = base
+    acumulador = AcumuladorIncremental(d.consultar_medidas_delta, margen_minutos=10)
+    acumulador.actualizar(desde, hasta)
+    inicio = acumulador.marca
+    for paso in range(1, 6):
+        insertar(engine, d, inicio + timedelta(minutes=15 * paso), inicio + timedelta(minutes=15 * paso - 12))
+        acumulador.actualizar(desde, hasta)
+        assert acumulador.corte is not None
+        assert_igual_a_completa(acumulador, d, desde, hasta)
+    assert acumulador.corte > inicio
+    assert not acumulador.base.empty
+
+
+def test_fila_mas_tardia_que_el_margen_la_recoge_la_resincronizacion(base):
+    d, engine, desde, hasta = base
+    acumulador = AcumuladorIncremental(d.consultar_medidas_delta, margen_minutos=5)
+    acumulador.actualizar(desde, hasta)
+    insertar(engine, d, acumulador.marca + timedelta(minutes=1))
+    acumulador.actualizar(desde, hasta)  # congela todo lo anterior a marca - 5 min
+    insertar(engine, d, datetime.combine(desde, datetime.min.time()) + timedelta(hours=9))
+    acumulador.actualizar(desde, hasta)
+    assert acumulador.sumas["RECIBIDAS"].sum() == sumas_completas(d, desde, hasta)["RECIBIDAS"].sum() - 1
+    acumulador.resincronizar_cada = 0
+    acumulador.actualizar(desde, hasta)
+    assert_igual_a_completa(acumulador, d, desde, hasta)
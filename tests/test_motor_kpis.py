@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+# Motor de KPIs: definiciones de las razones, filtros por llamada y equivalencia
+# con el camino SQL del dashboard sobre la misma base.
+
+import math
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from motor_kpis import (
+    COLUMNAS_TRAFICO, a_fraccion, derivar_ratios, kpis_por, medidas_llamadas, sumar, totales, vista_trafico,
+)
+
+
+def llamada(**campos):
+    base = {
+        "INTERVALO": "08:00", "DIRECCION": "ENTRANTE", "DNIS": "5550059224", "CAMPAÑA": "ATC",
+        "FUERA_DE_HORARIO": "Inside", "SUB_CATEGORIA": None, "LLAMADA_ABANDONADA": "NO",
+        "TIEMPO_EN_IVR": 10, "TIEMPO_EN_COLA": 5, "TIEMPO_DE_TIMBRADO": 3,
+        "TIEMPO_DE_CONVERSACION": 100, "TIEMPO_DE_TIPIFICACIÓN": 20, "ULTIMO_AGENTE": "4245",
+    }
+    base.update(campos)
+    return base
+
+
+def test_derivar_ratios_definiciones():
+    sumas = pd.DataFrame({
+        "RECIBIDAS": [10, 0], "CONTESTADAS": [8, 0], "ABANDONADAS": [2, 0],
+        "ASA_BRUTO": [80.0, 0.0], "AHT_BRUTO": [1600.0, 0.0], "ATENDIDAS_20S": [6, 0],
+    })
+    r = derivar_ratios(sumas)
+    assert r.loc[0, "ASA"] == 10
+    assert r.loc[0, "AHT"] == 200
+    assert r.loc[0, "PORC_ABA"] == pytest.approx(0.2)
+    assert r.loc[0, "PORC_SLA"] == pytest.approx(6 / 8)  # sobre contestadas, no recibidas
+    assert r.loc[0, "PORC_ATENCION"] == pytest.approx(0.8)
+    # denominador cero: NaN como en SQL (no cero)
+    assert all(math.isnan(r.loc[1, c]) for c in ("ASA", "AHT", "PORC_ABA", "PORC_SLA"))
+
+
+def test_abandonada_rapida_no_cuenta_en_sla():
+    m = medidas_llamadas(pd.DataFrame([
+        llamada(),
+        llamada(LLAMADA_ABANDONADA="SI", TIEMPO_EN_COLA=2, TIEMPO_DE_TIMBRADO=0),
+        llamada(TIEMPO_EN_COLA=30),
+    ]))
+    assert m["RECIBIDAS"].sum() == 3
+    assert m["CONTESTADAS"].sum() == 2
+    assert m["ABANDONADAS"].sum() == 1
+    assert m["ATENDIDAS_20S"].sum() == 1
+    assert m["ASA_BRUTO"].sum() == 8 + 33  # solo contestadas
+
+
+def test_filtros_base_y_trafico():
+    m = medidas_llamadas(pd.DataFrame([
+        llamada(DNIS="5542112905"),           # EGLOBAL: fuera de todo
+        llamada(DIRECCION="SALIENTE"),        # fuera de todo
+        llamada(TIEMPO_EN_IVR=0),             # fuera de todo
+        llamada(CAMPAÑA="LIBERTAD"),          # fuera de tráfico, cuenta como interacción
+        llamada(FUERA_DE_HORARIO="Outside"),  # idem
+        llamada(SUB_CATEGORIA="Llamada de Prueba"),
+        llamada(),
+    ]))
+    assert len(m) == 4
+    assert m["INTERACCIONES"].sum() == 4
+    assert m["RECIBIDAS"].sum() == 1
+    assert m["CONTESTADAS_AGENTE"].sum() == 4
+
+
+def test_kpis_por_igual_a_vista_trafico():
+    llamadas = pd.DataFrame([llamada(INTERVALO=i, TIEMPO_EN_COLA=c) for i, c in
+                             [("08:00", 5), ("08:00", 40), ("08:30", 1), ("09:00", 25)]])
+    directo = kpis_por(llamadas, ["INTERVALO"])
+    vista = vista_trafico(sumar(medidas_llamadas(llamadas), ["INTERVALO"]))
+    pd.testing.assert_frame_equal(directo[COLUMNAS_TRAFICO].reset_index(drop=True), vista)
+
+
+def test_totales_ponderados_por_contestadas():
+    trafico = pd.DataFrame({
+        "RECIBIDAS": [10, 30], "CONTESTADAS": [10, 20], "ABANDONADAS": [0, 10],
+        "ATENDIDAS_20S": [10, 10], "ASA": [10, 40], "AHT": [100, 200],
+    })
+    t = totales(trafico)
+    assert t["asa"] == 30  # (10*10 + 40*20) / 30
+    assert t["aht"] == round((100 * 10 + 200 * 20) / 30)
+    assert t["porc_aba"] == 25
+    assert t["porc_sla"] == pytest.approx(20 / 30 * 100)
+
+
+def test_a_fraccion():
+    assert a_fraccion(pd.Series(["12.5%", "0.3"])).tolist() == [0.125, 0.3]
+    assert a_fraccion(pd.Series([0.5, None])).tolist() == [0.5, 0.0]
+
+
+@pytest.fixture(scope="module")
+def base_local(dashboard, tmp_path_factory):
+    # el dashboard contra la base SQLite del benchmark
+    import benchmark_especiales as b
+
+    d = dashboard
+    ruta = tmp_path_factory.mktemp("kpis")
+    desde = date.today() - timedelta(days=3)
+    engine = b.cargar_sqlite(
+        str(ruta / "llamadas.sqlite"), 3000, desde, 3, d.CAMPANAS_DNIS, d.CATALOGO_AGENTES["ID_CONEXION"]
+    )
+    anterior = d._engine
+    d.usar_engine(engine)
+    llamadas = b.generar_llamadas(3000, desde, 3, semilla=0, campanas=d.CAMPANAS_DNIS, agentes=d.CATALOGO_AGENTES["ID_CONEXION"])
+    yield d, desde, desde + timedelta(days=2), llamadas
+    d.usar_engine(anterior)
+
+
+def test_caminos_sql_iguales_al_motor(base_local):
+    d, desde, hasta, llamadas = base_local
+    esperado = kpis_por(llamadas, ["INTERVALO"])
+    esperado = esperado[esperado["RECIBIDAS"] > 0][COLUMNAS_TRAFICO].reset_index(drop=True)
+    for obtenido in (d.obtener_trafico(desde, hasta), d.agregados_desde_medidas(desde, hasta)["trafico"]):
+        obtenido = obtenido[COLUMNAS_TRAFICO].reset_index(drop=True)
+        assert obtenido["INTERVALO"].tolist() == esperado["INTERVALO"].tolist()
+        for col in COLUMNAS_TRAFICO[1:]:
+            np.testing.assert_allclose(
+                pd.to_numeric(obtenido[col]).to_numpy(dtype=float),
+                esperado[col].to_numpy(dtype=float), rtol=1e-9, err_msg=col,
+            )
@@ -0,0 +1,151 @@
+# -*- coding: utf-8 -*-
+# Almacén de agregados diarios: cierre de días, tramos contiguos, carga única por
+# día y unión de días cerrados (archivo local) con el día abierto (en vivo)
+
+from datetime import date, datetime, timedelta
+
+import pandas as pd
+import pytest
+
+from motor_kpis import LLAVES, MEDIDAS
+from rollup import COLUMNAS, AlmacenRollup, _tramos
+
+D = date(2024, 3, 1)
+
+
+def dia(n):
+    return D + timedelta(days=n)
+
+
+def filas_dia(desde, hasta, recibidas=1):
+    # una fila por día del rango, como la consulta diaria
+    dias = pd.date_range(desde, hasta, freq="D").date
+    df = pd.DataFrame({"DIA": [d.isoformat() for d in dias], "INTERVALO": "08:00", "DNIS": "5550059224", "ULTIMO_AGENTE": "4245"})
+    for m in MEDIDAS:
+        df[m] = recibidas
+    return df[COLUMNAS]
+
+
+class Consulta:
+    def __init__(self):
+        self.llamadas = []
+
+    def __call__(self, desde, hasta):
+        self.llamadas.append((desde, hasta))
+        return filas_dia(desde, hasta)
+
+
+@pytest.fixture
+def consulta():
+    return Consulta()
+
+
+@pytest.fixture
+def almacen(consulta, tmp_path):
+    return AlmacenRollup(consulta, ruta=str(tmp_path / "rollup.sqlite"))
+
+
+def test_tramos_contiguos():
+    assert _tramos([dia(3), dia(0), dia(1), dia(5), dia(6)]) == [(dia(0), dia(1)), (dia(3), dia(3)), (dia(5), dia(6))]
+    assert _tramos([]) == []
+
+
+def test_margen_de_cierre():
+    almacen = AlmacenRollup(Consulta(), ruta=":memory:", margen_cierre=timedelta(hours=1))
+    # pasada la medianoche, ayer sigue abierto hasta cumplir el margen
+    assert almacen.ultimo_dia_cerrado(datetime(2024, 3, 5, 0, 30)) == date(2024, 3, 3)
+    assert almacen.ultimo_dia_cerrado(datetime(2024, 3, 5, 1, 0)) == date(2024, 3, 4)
+
+
+def test_completar_pide_solo_tramos_faltantes(almacen, consulta):
+    almacen.completar(dia(1), dia(2))
+    almacen.completar(dia(5), dia(5))
+    assert consulta.llamadas == [(dia(1), dia(2)), (dia(5), dia(5))]
+    consulta.llamadas.clear()
+
+    almacen.completar(dia(0), dia(6))
+    assert consulta.llamadas == [(dia(0), dia(0)), (dia(3), dia(4)), (dia(6), dia(6))]
+    consulta.llamadas.clear()
+    almacen.completar(dia(0), dia(6))
+    assert consulta.llamadas == []
+    assert len(almacen.leer(dia(0), dia(6))) == 7
+
+
+class ConsultaVacia(Consulta):
+    def __call__(self, desde, hasta):
+        super().__call__(desde, hasta)
+        return pd.DataFrame(columns=COLUMNAS)
+
+
+def test_dia_sin_datos_queda_cargado(tmp_path):
+    consulta = ConsultaVacia()
+    almacen = AlmacenRollup(consulta, ruta=str(tmp_path / "rollup.sqlite"))
+    almacen.completar(dia(0), dia(0))
+    almacen.completar(dia(0), dia(0))
+    assert len(consulta.llamadas) == 1
+    assert almacen.leer(dia(0), dia(0)).empty
+
+
+def test_dos_procesos_no_duplican_un_dia(tmp_path):
+    # dos workers con el mismo archivo: el segundo en guardar no inserta de nuevo
+    ruta = str(tmp_path / "rollup.sqlite")
+    uno, otro = AlmacenRollup(Consulta(), ruta=ruta), AlmacenRollup(Consulta(), ruta=ruta)
+    uno._guardar(filas_dia(dia(0), dia(1)), [dia(0), dia(1)])
+    otro._guardar(filas_dia(dia(0), dia(1), recibidas=5), [dia(0), dia(1)])
+    leido = uno.leer(dia(0), dia(1))
+    assert len(leido) == 2
+    assert leido["RECIBIDAS"].tolist() == [1, 1]
+
+
+def test_medidas_une_cerrados_y_vivo(almacen, consulta):
+    ahora = datetime.combine(dia(5), datetime.min.time()) + timedelta(hours=3)
+    df = almacen.medidas(dia(2), dia(5), ahora=ahora)
+    assert consulta.llamadas == [(dia(2), dia(4)), (dia(5), dia(5))]
+    assert df["DIA"].tolist() == [dia(n).isoformat() for n in (2, 3, 4, 5)]
+    # el día abierto no se guarda: el siguiente refresco lo vuelve a pedir en vivo
+    consulta.llamadas.clear()
+    almacen.medidas(dia(2), dia(5), ahora=ahora)
+    assert consulta.llamadas == [(dia(5), dia(5))]
+
+
+@pytest.fixture
+def base(dashboard, tmp_path):
+    # dos días en la base SQLite del benchmark, con llamadas a ambos lados de la medianoche
+    import benchmark_especiales as b
+
+    d = dashboard
+    ayer = date.today() - timedelta(days=1)
+    engine = b.cargar_sqlite(
+        str(tmp_path / "llamadas.sqlite"), 3000, ayer, 2, d.CAMPANAS_DNIS, d.CATALOGO_AGENTES["ID_CONEXION"]
+    )
+    medianoche = datetime.combine(date.today(), datetime.min.time())
+    extra = b.generar_llamadas(4, ayer, 1, semilla=5, campanas=d.CAMPANAS_DNIS)
+    extra["FECHA"] = [(medianoche + timedelta(seconds=s)).strftime("%Y-%m-%d %H:%M:%S") for s in (-61, -1, 0, 59)]
+    extra["INTERVALO"] = ["23:30", "23:30", "00:00", "00:00"]
+    extra.to_sql("LLAMADAS_ESPECIALES_ECD", engine, if_exists="append", index=False)
+    anterior = d._engine
+    d.usar_engine(engine)
+    yield d, ayer, medianoche
+    d.usar_engine(anterior)
+    engine.dispose()
+
+
+@pytest.mark.parametrize("horas_tras_medianoche", [0.5, 2])
+def test_cerrados_mas_vivo_igual_a_consulta_directa(base, tmp_path, horas_tras_medianoche):
+    d, ayer, medianoche = base
+    hoy = medianoche.date()
+    almacen = AlmacenRollup(d.obtener_medidas_diarias, ruta=str(tmp_path / "r.sqlite"), margen_cierre=timedelta(hours=1))
+    ahora = medianoche + timedelta(hours=horas_tras_medianoche)
+
+    for _ in range(2):  # en frío y ya con el archivo cargado
+        obtenido = almacen.medidas(ayer, hoy, ahora=ahora)
+        directo = d.obtener_medidas_diarias(ayer, hoy)
+        directo[MEDIDAS] = directo[MEDIDAS].apply(pd.to_numeric)
+        por = ["DIA"] + LLAVES
+        obtenido = obtenido.groupby(por, dropna=False)[MEDIDAS].sum().sort_index()
+        directo = directo.assign(DIA=pd.to_datetime(directo["DIA"]).dt.date.astype(str))
+        directo = directo.groupby(por, dropna=False)[MEDIDAS].sum().sort_index()
+        pd.testing.assert_frame_equal(obtenido, directo, check_dtype=False)
+
+    cargados = almacen.dias_cargados(ayer, hoy)
+    assert cargados == ({ayer} if horas_tras_medianoche >= 1 else set())
@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+# Series de tiempo: zoom, ventana y reducción de puntos
+
+import numpy as np
+import pandas as pd
+
+from series_tiempo import lttb, min_max, objetivo_puntos, reducir, rango_zoom, ventana
+
+
+def test_rango_zoom_de_eje_de_fechas():
+    assert rango_zoom({"xaxis.range[0]": "2024-01-01 08:00:00.5", "xaxis.range[1]": "2024-01-01 12:00"}) == (
+        "2024-01-01 08:00:00.5", "2024-01-01 12:00"
+    )
+    assert rango_zoom({"xaxis.range": ["2024-01-01", "2024-01-02"]}) == ("2024-01-01", "2024-01-02")
+    assert rango_zoom({"xaxis.autorange": True}) is None
+    assert rango_zoom(None) is None
+
+
+def test_zoom_de_la_grafica_por_intervalo_se_ignora():
+    # posiciones del eje de categorías: leídas como fechas dejarían la serie vacía
+    assert rango_zoom({"xaxis.range[0]": 2.5, "xaxis.range[1]": 10.5}) is None
+    assert rango_zoom({"xaxis.range": [-0.5, 25.5]}) is None
+
+
+def test_ventana():
+    df = pd.DataFrame({"FECHA": pd.date_range("2024-01-01", periods=48, freq="30min"), "V": range(48)})
+    assert len(ventana(df, "FECHA", None)) == 48
+    assert ventana(df, "FECHA", ("2024-01-01 08:00", "2024-01-01 09:00"))["V"].tolist() == [16, 17, 18]
+
+
+def test_objetivo_puntos():
+    assert objetivo_puntos(800) == 800
+    assert objetivo_puntos(None) == 800
+    assert objetivo_puntos(10) == 100
+    assert objetivo_puntos(1e6) == 4000
+
+
+def test_lttb_conserva_extremos_y_picos():
+    x = np.arange(1000)
+    y = np.zeros(1000)
+    y[437] = 50.0   # un pico aislado debe sobrevivir a la reducción
+    y[812] = -20.0
+    indices = lttb(x, y, 100)
+    assert len(indices) == 100
+    assert indices[0] == 0 and indices[-1] == 999
+    assert np.all(np.diff(indices) > 0)
+    assert 437 in indices and 812 in indices
+
+
+def test_lttb_sin_reducir():
+    assert lttb(np.arange(50), np.ones(50), 100).tolist() == list(range(50))
+    assert lttb(np.arange(50), np.ones(50), 2).tolist() == list(range(50))
+
+
+def test_lttb_acepta_fechas():
+    x = pd.Series(pd.date_range("2024-01-01", periods=500, freq="min"))
+    y = np.sin(np.arange(500) / 20)
+    indices = lttb(x, y, 50)
+    assert len(indices) == 50 and indices[-1] == 499
+
+
+def test_min_max_conserva_minimo_y_maximo_de_cada_cubo():
+    rng = np.random.default_rng(3)
+    y = rng.integers(0, 100, 1000).astype(float)
+    indices = min_max(y, 100)
+    assert indices[0] == 0 and indices[-1] == 999
+    bordes = np.linspace(0, 1000, 51).astype(int)
+    for inicio, fin in zip(bordes[:-1], bordes[1:]):
+        dentro = indices[(indices >= inicio) & (indices < fin)]
+        assert y[dentro].max() == y[inicio:fin].max()
+        assert y[dentro].min() == y[inicio:fin].min()
+    assert len(indices) <= 102
+
+
+def test_reducir():
+    x = pd.date_range("2024-01-01", periods=2000, freq="min")
+    y = pd.Series(np.arange(2000.0))
+    rx, ry = reducir(x, y, 200)
+    assert len(rx) == len(ry) == 200
+    rx, ry = reducir(x, y, 200, metodo="min_max")
+    assert ry.iloc[0] == 0 and ry.iloc[-1] == 1999